@@ -4,6 +4,19 @@ import numpy as np
 # Camera Size
 PREVIEW_SIZE = (1280, 960)
 
+# Capture on a background thread and always hand out the newest frame
+CAMERA_THREADED = True
+CAMERA_BUFFER_SIZE = 3  # Ring buffer slots (min 3: newest, in use, being written)
+# Pixel format of the main stream. "RGB888" is BGR in memory, so frames need
+# no cvtColor; None keeps picamera2's default (XBGR8888, converted per frame).
+CAMERA_FORMAT = "RGB888"
+
+# Multi-resolution: trackers run on a smaller image, overlays use full size.
+# Set CAMERA_LORES_SIZE to use picamera2's "lores" stream instead of resizing
+# (same aspect ratio as PREVIEW_SIZE); it overrides DETECT_SCALE.
+DETECT_SCALE = 0.5
+CAMERA_LORES_SIZE = None  # e.g. (640, 480)
+
 # Change the colour that you want to track
 # NOTE: Red wraps around hue=0, so we include both red bands for stability.
 COLOR_RANGES = {
@@ -23,16 +36,86 @@ ACTIVE_COLORS = ["cb132b_red"]  # Changes the active colours
 
 # Detection tuning
 MIN_AREA = 1000   # Minimum area(px) of an object for detection
+BLOB_CENTROID = "weighted"  # Colour target centre: "weighted" (by saturation), "mean" or "bbox"
+BLOB_MAX = 16     # Most blobs reported per frame (largest first)
+# "contours": ~0.1-0.4 ms on a cleaned mask, speckled masks switch to components
+# "components": ~2.7 ms at 640x480 whatever the mask, pixel-exact areas
+BLOB_ENGINE = "contours"
 DEADBAND_PX = 0   # The error from the crosshair to the centre of the object
 
 # Servo usage
 USE_SERVO = True
-TRACK_MODE = "face"  # "person" | "colour" | "face"
+TRACK_MODE = "face"  # "person" | "colour" | "face" | "dnn" | "fused"
+
+# Detect-then-track (face / person modes)
+# Runs the full detector every N frames (or when lock is lost) and follows
+# the target with a cheap tracker in between.
+HYBRID_TRACKING = True
+DETECT_EVERY_N = 5            # Full detection at least every N frames
+TRACK_FOLLOWER = "auto"       # "auto" | "kcf" | "csrt" | "template"
+TRACK_MIN_CONFIDENCE = 0.5    # Re-detect when follower confidence drops below this
+
+# Multi-target tracking
+# Keeps IDs for every detection across frames so the lock doesn't jump
+# between people when they cross.
+MULTI_TARGET = True
+MOT_POLICY = "sticky"   # "sticky" | "largest" | "nearest" | "oldest"
+MOT_MIN_IOU = 0.2       # Overlap that counts as the same target
+MOT_GATE_PX = 120       # ...or centre distance (px, detection image) below this
+MOT_MIN_HITS = 2        # Frames before a new track can be chosen
+MOT_MAX_MISSES = 10     # Frames a track survives without a detection
+
+# Motion gating
+# Skip detection (reuse the last result) while the scene is static, and
+# search only where something moved when no target is locked.
+MOTION_GATE = False            # Off until it shows no found-rate loss on your footage
+MOTION_GATE_SIZE = (160, 120)  # Thumbnail used for differencing (all 3 channels)
+MOTION_THRESHOLD = 18          # Per-pixel change (0-255) that counts as motion
+MOTION_MIN_PIXELS = 20         # Changed thumbnail pixels needed to run detection
+MOTION_MAX_SKIP = 15           # Re-run detection at least this often anyway
+MOTION_BG_ALPHA = 0.05         # Background running-average rate
+MOTION_ROI_PAD = 0.5           # Grow the changed region by this fraction per side
+MOTION_LOCK_STILL_PX = 2.0     # Locked target moving more than this (px/detection) is never skipped
+
+# Parallel detection (face / person modes)
+# Pipelines consecutive frames over worker processes via shared memory.
+# 0 = off (single process). Results lag capture by up to this many frames,
+# so HYBRID_TRACKING is not used in these modes while it is on.
+PARALLEL_WORKERS = 0   # e.g. 3 on a quad-core Pi
+
+# Adaptive quality governor
+# Coarsens detector settings, then detection resolution, to hold a target
+# FPS; restores quality when there is headroom or the SoC cools down.
+GOVERNOR = True
+GOV_TARGET_FPS = 15
+GOV_INTERVAL_FRAMES = 15       # Frames between decisions
+GOV_HEADROOM = 0.7             # Raise quality when loop < budget * this
+GOV_THERMAL_C = 75.0           # Degrade above this SoC temperature (None = off)
+GOV_SCALE_STEPS = [1.0, 0.75, 0.5]  # Multipliers of DETECT_SCALE (unused with CAMERA_LORES_SIZE)
+
+# Region-of-interest search
+# Once a target is found, only search a window around it on the next frame.
+ROI_SEARCH = True
+ROI_EXPAND = 1.0          # Window = bbox grown by this fraction on each side
+ROI_MOTION_GAIN = 2.0     # Extra padding per px/frame of target motion
+ROI_MAX_MISSES = 3        # Fall back to a full-frame search after this many misses
+ROI_MIN_SIZE = (192, 192) # Smallest window (w, h); HOG needs at least 64x128
+ROI_FULL_EVERY = 10       # With MULTI_TARGET: full-frame search every N frames, so policies see every candidate (0 = off)
 
 # Servo pins
 PAN_PIN = 18
 TILT_PIN = 13
 
+# Servo output backend:
+#   "pigpio"  pigpiod (both axes in one call per tick)
+#   "lgpio"   no daemon, software-timed pulses
+#   "sysfs"   kernel hardware PWM (dtoverlay=pwm-2chan, GPIO18/13 -> pwm0/1)
+#   "mock"    no hardware
+SERVO_BACKEND = "pigpio"
+SERVO_LGPIO_CHIP = 0
+SERVO_PWM_CHIP = 0
+SERVO_PWM_CHANNELS = {18: 0, 13: 1}  # GPIO -> PWM channel (sysfs)
+
 # ----------------------------
 # pigpio servo settings (µs)
 # ----------------------------
@@ -49,13 +132,33 @@ TILT_US_CENTER = 1500
 # How often to apply a servo update (seconds)
 SERVO_UPDATE_S = 0.02
 
-# Proportional tuning: converts pixel error -> microseconds change
-# Bigger KP => more movement for the same error.
-SERVO_KP_PAN = 0.35
-SERVO_KP_TILT = 0.35
+# Run servo control on its own thread, decoupled from vision FPS. It ticks at
+# SERVO_RATE_HZ while the servos move and sleeps until the next error once settled.
+SERVO_THREADED = True
+SERVO_RATE_HZ = 50     # Control/pigpio write rate
+SERVO_HOLD_S = 0.5     # Stop correcting if no new error for this long
+
+# PID + feedforward: pixel error -> pulse-width setpoint (µs)
+# KP: µs per px of error (~1.1 for a Pi camera on 180° servos moves onto
+# the target in one step; lower is calmer). KI: µs per px*s, removes lag on
+# moving targets. KD: µs per px/s, damping. KFF: µs/s per px/s of tracked
+# target velocity (needs KALMAN_ENABLED).
+# Tune offline with: python -m servo.tune
+SERVO_KP_PAN = 0.9
+SERVO_KI_PAN = 3.038
+SERVO_KD_PAN = 0.009
+SERVO_KFF_PAN = 0.133
+SERVO_KP_TILT = 0.9
+SERVO_KI_TILT = 3.038
+SERVO_KD_TILT = 0.009
+SERVO_KFF_TILT = 0.133
+SERVO_I_LIMIT = 100.0   # Integral clamp (px*s)
+SERVO_I_ZONE_PX = 40.0  # Only integrate this close to centre
+SERVO_D_ALPHA = 0.5     # Derivative low-pass (1 = unfiltered)
 
-# Cap how much to change per update (microseconds)
-SERVO_MAX_STEP_US = 16  # changed
+# Motion limits for the commanded pulse width
+SERVO_MAX_SPEED_US_S = 2000.0    # Slew rate (µs/s)
+SERVO_MAX_ACCEL_US_S2 = 20000.0  # Acceleration (µs/s^2)
 
 # Flip directions if camera is mirrored or not
 PAN_INVERT = False
@@ -70,14 +173,99 @@ CLOSE_ITERS = 1  # Fills holes (1-2), dilate -> erode
 CENTER_SMOOTH_ALPHA = 1  # Controls the smoothing of the center
 ERROR_SMOOTH_ALPHA = 1   # Controls the smoothing of the error signal
 
+# Predictive motion model (constant-velocity Kalman filter)
+# Leads the target by the measured capture -> servo latency and coasts
+# through short detection drop-outs.
+KALMAN_ENABLED = True
+KALMAN_PROCESS_NOISE = 800.0     # Expected target acceleration (px/s^2)
+KALMAN_MEASUREMENT_NOISE = 6.0   # Detector centre jitter (px)
+KALMAN_LEAD_S = 0.03             # Extra lead for servo actuation (s)
+KALMAN_MAX_COAST = 5             # Frames to predict through without a detection
+
 # Distance calculations
 # For face mode: treat KNOWN_TARGET_WIDTH_CM as "typical face width" (rough),
 # OR calibrate with your own face at CALIB_DISTANCE_CM for consistent results.
 KNOWN_TARGET_WIDTH_CM = 16.0     # Typical face width ~14-16cm; tune for YOU
 CALIB_DISTANCE_CM = 50.0         # Calibration distance measurement (measure from lens!)
 FOCAL_LENGTH_PX = None           # Will be computed when you press "c"
+KNOWN_TARGET_HEIGHT_CM = None    # Optional; calibrating sets it from the box shape
 
 DIST_SMOOTH_ALPHA = 0.25         # 0.15-0.35 good range (higher = more responsive)
+DIST_OUTLIER_RATIO = 1.4         # Width/height estimates further apart than this: trust the nearer
+DIST_MAX_JUMP = 0.35             # Reading this far (fraction) from the smoothed value is an outlier...
+DIST_MAX_REJECTS = 5             # ...unless it repeats this many frames in a row
+DIST_STATE_TTL = 30              # Frames to keep smoothing state for a lost target
+
+# Calibration profiles per tracker mode and target class (colour name in
+# colour mode, else DIST_CLASS), written by "c" and python -m distance.calibrate
+DIST_PROFILES = "distance_profiles.json"
+DIST_CLASS = None                # e.g. "alice" to use/save a per-person face profile
+
+# Live tuning (runtime_config.py)
+# Saving config.py applies the changed values between frames; values that
+# can't change live (camera, mode, pins, ...) report "restart needed".
+RUNTIME_CONFIG = True
+RUNTIME_CONFIG_POLL_S = 1.0       # How often config.py's mtime is checked
+RUNTIME_CONFIG_SOCKET = None      # e.g. "/tmp/person-tracker.sock" for python -m runtime_config set ...
+
+# Performance profiling
+# Times each stage of the main loop and inside the trackers.
+# Costs close to nothing when PROFILE is False.
+PROFILE = False
+PROFILE_HUD = True       # Draw the timing table on the video
+PROFILE_WINDOW = 120     # Rolling window (frames) for the percentiles
+PROFILE_CSV = None       # e.g. "perf.csv" to append summaries periodically
+PROFILE_DUMP_S = 10.0    # How often to append to PROFILE_CSV
+
+# Headless / network preview
+# HEADLESS skips cv.imshow/waitKey; commands (c = calibrate, q = quit) come
+# from stdin or a POST to http://<pi>:STREAM_PORT/cmd/<key>. STREAM_PORT = None
+# disables the MJPEG server; frames are only encoded while a client is connected.
+HEADLESS = False
+STREAM_PORT = None         # e.g. 8080
+STREAM_HOST = "127.0.0.1"  # No authentication: "0.0.0.0" exposes quit/calibrate to the whole network
+STREAM_MAX_FPS = 10
+STREAM_JPEG_QUALITY = 70
+OVERLAY_SCALE = 1.0        # Display/stream image size relative to the frame (overlays drawn at that size)
+OVERLAY_HUD_REFRESH_S = 0.5  # How often the timing HUD numbers are redrawn
+
+# DNN detector (TRACK_MODE = "dnn")
+# "yunet": OpenCV YuNet face model (face_detection_yunet_2023mar.onnx)
+# "ssd":   SSD-style model, e.g. res10_300x300_ssd_iter_140000.caffemodel
+#          + deploy.prototxt (faces) or MobileNet-SSD (people, DNN_CLASS_ID = 15)
+DNN_MODEL = "yunet"
+DNN_MODEL_PATH = None           # Path to .onnx / .caffemodel / .pb
+DNN_CONFIG_PATH = None          # .prototxt / .pbtxt for Caffe/TF models
+DNN_RUNTIME = "opencv"          # "opencv" (cv.dnn) | "onnxruntime" (ssd only)
+DNN_INPUT_SIZE = (320, 240)     # Network input (w, h); smaller = faster
+DNN_THREADS = 4                 # CPU threads for inference (0 = library default); with cv.dnn
+                                # only while the network runs, other OpenCV calls keep theirs
+DNN_CONF_THRESHOLD = 0.6
+DNN_NMS_THRESHOLD = 0.3
+DNN_CLASS_ID = None             # Keep only this class (ssd); None = any
+DNN_MEAN = (104.0, 177.0, 123.0)  # ssd blob mean (res10 face values)
+DNN_PIXEL_SCALE = 1.0           # ssd blob scale (MobileNet-SSD: 0.007843)
+DNN_SWAP_RB = False
+
+# Fused tracking (TRACK_MODE = "fused")
+# Detectors run in order, each only inside the previous one's detections,
+# sharing one set of gray/HSV/downscaled images per frame.
+FUSED_CHAIN = ["colour", "face"]   # Any of "colour", "face", "person", "dnn"
+FUSED_SCALES = {"colour": 0.5}     # Pyramid level per detector (default 1.0)
+FUSED_PAD = 0.5                    # Grow each gate box by this fraction per side
+FUSED_MAX_REGIONS = 3              # Candidates passed on to the next detector
+FUSED_REQUIRE_ALL = False          # Only report targets every detector confirmed
+
+# Session recording (replay with: python -m perf.replay <file>)
+SESSION_LOG = None             # e.g. "sessions/%Y%m%d-%H%M%S.ptsl" (strftime)
+SESSION_VIDEO = False          # Also save raw frames next to the log (needed for replay)
+SESSION_VIDEO_FOURCC = "MJPG"
+SESSION_VIDEO_FPS = 15         # Nominal rate written into the video file
+SESSION_VIDEO_QUEUE = 8        # Frames waiting for the encoder before new ones are dropped
+
+# Startup
+STARTUP_PARALLEL = True    # Bring up camera, detector and servos at the same time
+DETECTOR_WARMUP = True     # Run one blank frame through the detector during bring-up
 
 # Face cascade path
 # IMPORTANT: We DON'T hardcode /usr/share/... because it varies.
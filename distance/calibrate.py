@@ -1,4 +1,125 @@
 '''
-Docstring for distance.
+Docstring for distance.calibrate
+calibration profiles from the command line
 
-'''
\ No newline at end of file
+    python -m distance.calibrate --list
+    python -m distance.calibrate --mode face --class alice --distance 50
+    python -m distance.calibrate --mode colour --class cb132b_red --bbox 180 140
+    python -m distance.calibrate --remove face alice
+
+With a camera, stand the target --distance cm from the lens; the tracker
+collects --frames boxes and the median width/height sets the profile. With
+--bbox the box size is given directly (e.g. measured on a saved frame).
+Profiles go to config.DIST_PROFILES and are loaded by main.py at startup.
+'''
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import config
+from distance.estimator import DistanceEstimator
+from distance.profiles import ProfileStore
+
+
+def collect_boxes(mode, frames, timeout_s):
+    """Bboxes of the tracked target from the live camera (up to frames of them)."""
+    import main
+    from vision.tracker import close_tracker
+
+    camera = main.open_camera()
+    tracker = main.open_tracker(mode)
+    boxes, seen = [], 0
+    t_end = time.monotonic() + timeout_s
+    try:
+        while len(boxes) < frames and time.monotonic() < t_end:
+            frame, small = camera.read_pair()
+            result = main.track(tracker, frame, small)
+            seen += 1
+            bbox = result.get("bbox")
+            if result.get("found") and isinstance(bbox, (tuple, list)) and len(bbox) == 4:
+                boxes.append(bbox)
+    finally:
+        close_tracker(tracker)
+        camera.close()
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4), seen
+
+
+def print_profiles(store):
+    rows = list(store.items())
+    if not rows:
+        print(f"no profiles in {store.path}")
+        return
+    for mode, target_class, p in rows:
+        height = p.get("known_height_cm")
+        height = f"{height:.1f}" if height else "-"
+        print(
+            f"{mode:<8}{target_class:<16} focal {p['focal_px']:8.1f}px  "
+            f"width {p['known_width_cm']:.1f}cm  height {height}cm  "
+            f"at {p.get('calib_distance_cm', 0):.0f}cm  {p.get('updated', '')}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate distance estimation profiles.")
+    parser.add_argument("--mode", default=config.TRACK_MODE, help="tracker mode (default TRACK_MODE)")
+    parser.add_argument("--class", dest="target_class", default=getattr(config, "DIST_CLASS", None),
+                        help="target class, e.g. a person's name or colour (default: the mode's default)")
+    parser.add_argument("--distance", type=float, default=getattr(config, "CALIB_DISTANCE_CM", 50.0),
+                        help="target distance from the lens (cm)")
+    parser.add_argument("--width", type=float, help="real target width (cm, default KNOWN_TARGET_WIDTH_CM)")
+    parser.add_argument("--bbox", nargs=2, type=float, metavar=("W", "H"), help="box size (px) instead of the camera")
+    parser.add_argument("--frames", type=int, default=30, help="boxes to collect from the camera")
+    parser.add_argument("--timeout", type=float, default=20.0, help="give up on the camera after this (s)")
+    parser.add_argument("--profiles", default=None, help="profiles file (default DIST_PROFILES)")
+    parser.add_argument("--list", action="store_true", help="show saved profiles")
+    parser.add_argument("--remove", nargs="+", metavar=("MODE", "CLASS"), help="delete a profile")
+    args = parser.parse_args(argv)
+
+    store = ProfileStore(args.profiles)
+    if store.path is None:
+        print("no profiles file: set DIST_PROFILES or pass --profiles", file=sys.stderr)
+        return 1
+
+    if args.list:
+        print_profiles(store)
+        return 0
+
+    if args.remove:
+        mode, target_class = args.remove[0], (args.remove[1] if len(args.remove) > 1 else None)
+        if not store.remove(mode, target_class):
+            print(f"no profile {mode}/{target_class or 'default'}", file=sys.stderr)
+            return 1
+        store.save()
+        print(f"removed {mode}/{target_class or 'default'}")
+        return 0
+
+    est = DistanceEstimator(args.mode, target_class=args.target_class, store=store)
+    if args.width:
+        est.known_width_cm = args.width
+
+    if args.bbox:
+        boxes = np.array([[0, 0, args.bbox[0], args.bbox[1]]])
+    else:
+        print(f"tracking {args.mode} target at {args.distance:.0f}cm ...")
+        boxes, seen = collect_boxes(args.mode, args.frames, args.timeout)
+        print(f"target found in {len(boxes)}/{seen} frames")
+        if len(boxes) >= 2:
+            spread = np.std(boxes[:, 2]) / np.mean(boxes[:, 2])
+            print(f"box width {np.median(boxes[:, 2]):.1f}px +/- {100 * spread:.1f}%")
+            if spread > 0.1:
+                print("boxes vary by more than 10%: hold the target still and check the lighting")
+
+    profile = est.calibrate(boxes, args.distance, save=False)
+    if profile is None:
+        print("no target boxes: nothing calibrated", file=sys.stderr)
+        return 1
+    store.save()
+    print(f"saved {args.mode}/{args.target_class or 'default'} to {store.path}")
+    print_profiles(store)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,41 +3,186 @@ Docstring for distance.estimator
 estimates the distance away from the camera
 """
 
+import time
+
+import numpy as np
 import config
+from distance.profiles import ProfileStore
+
+_NAN = float("nan")
+
 
 class DistanceEstimator:
     """
-    Monocular distance using pinhole model:
-        distance_cm = (known_width_cm * focal_px) / bbox_width_px
+    Monocular distance using pinhole model, from both box dimensions:
+        d_w = (known_width_cm * focal_px) / bbox_width_px
+        d_h = (known_height_cm * focal_px) / bbox_height_px
 
-    focal_px is calibrated once from a known distance:
+    When d_w and d_h agree (ratio <= DIST_OUTLIER_RATIO) they are averaged.
+    Otherwise the nearer one wins: a box cut off by the frame edge or a
+    partial detection shrinks in one dimension, which only ever reads farther.
+
+    Each target id keeps its own EMA. A reading more than DIST_MAX_JUMP
+    (fraction) away from it is dropped as an outlier, unless it repeats for
+    DIST_MAX_REJECTS frames in a row (then the target really moved).
+
+    focal_px is calibrated from a known distance:
         focal_px = (bbox_width_px * calib_distance_cm) / known_width_cm
+    and the box height at that moment gives known_height_cm, so the two
+    estimates agree by construction. Profiles are kept per tracker mode and
+    target class (distance.profiles) and loaded at startup.
     """
 
-    def __init__(self):
-        self.known_width_cm = float(getattr(config, "KNOWN_TARGET_WIDTH_CM", 16.0))
+    def __init__(self, mode=None, target_class=None, store=None):
+        self.mode = mode or config.TRACK_MODE
+        self.store = store if store is not None else ProfileStore()
         self.calib_distance_cm = float(getattr(config, "CALIB_DISTANCE_CM", 50.0))
-        self.focal_px = getattr(config, "FOCAL_LENGTH_PX", None)
 
         self.alpha = float(getattr(config, "DIST_SMOOTH_ALPHA", 0.25))
-        self._smoothed = None
+        self.outlier_ratio = float(getattr(config, "DIST_OUTLIER_RATIO", 1.4))
+        self.max_jump = float(getattr(config, "DIST_MAX_JUMP", 0.35))
+        self.max_rejects = int(getattr(config, "DIST_MAX_REJECTS", 5))
+        self.state_ttl = int(getattr(config, "DIST_STATE_TTL", 30))
 
-    def calibrate(self, bbox_width_px: int):
-        if bbox_width_px <= 0:
-            return None
-        self.focal_px = (float(bbox_width_px) * self.calib_distance_cm) / self.known_width_cm
-        self._smoothed = None
-        return self.focal_px
+        # target id -> [smoothed_cm, rejects in a row, last call seen]
+        self._state = {}
+        self._calls = 0
+        self.target_class = None
+        self.use_class(target_class)
 
-    def estimate_cm(self, bbox_width_px: int):
-        if self.focal_px is None or bbox_width_px <= 0:
-            return None
+    def reconfigure(self, changed=None):
+        """Re-reads the tuning values after a live config change (runtime_config)."""
+        self.calib_distance_cm = float(getattr(config, "CALIB_DISTANCE_CM", 50.0))
+        self.alpha = float(getattr(config, "DIST_SMOOTH_ALPHA", 0.25))
+        self.outlier_ratio = float(getattr(config, "DIST_OUTLIER_RATIO", 1.4))
+        self.max_jump = float(getattr(config, "DIST_MAX_JUMP", 0.35))
+        self.max_rejects = int(getattr(config, "DIST_MAX_REJECTS", 5))
+        fallback = ("KNOWN_TARGET_WIDTH_CM", "KNOWN_TARGET_HEIGHT_CM", "FOCAL_LENGTH_PX")
+        if changed is None or any(n in changed for n in fallback):
+            # Config values are the fallback under the profiles: reload the active one
+            self.use_class(self.target_class)
 
-        dist = (self.known_width_cm * float(self.focal_px)) / float(bbox_width_px)
+    def use_class(self, target_class):
+        """Switches to the profile for target_class (falls back to the mode's default, then config)."""
+        self.target_class = target_class
+        profile = self.store.get(self.mode, target_class) or {}
+        known_width_cm = float(profile.get("known_width_cm", getattr(config, "KNOWN_TARGET_WIDTH_CM", 16.0)))
+        height = profile.get("known_height_cm", getattr(config, "KNOWN_TARGET_HEIGHT_CM", None))
+        known_height_cm = float(height) if height else None
 
-        if self._smoothed is None:
-            self._smoothed = dist
+        focal = profile.get("focal_px", getattr(config, "FOCAL_LENGTH_PX", None))
+        size = profile.get("frame_size")
+        if focal is not None and size and size[0] != config.PREVIEW_SIZE[0]:
+            # Calibrated at another resolution: focal length in px scales with it
+            focal = float(focal) * config.PREVIEW_SIZE[0] / float(size[0])
+        focal_px = float(focal) if focal is not None else None
+
+        geometry = (known_width_cm, known_height_cm, focal_px)
+        if geometry != getattr(self, "_geometry", None):
+            # Smoothed values are only comparable under the same profile
+            self.known_width_cm, self.known_height_cm, self.focal_px = geometry
+            self._geometry = geometry
+            self._state.clear()
+
+    def reset(self, target_id=None):
+        if target_id is None:
+            self._state.clear()
         else:
-            self._smoothed = (1 - self.alpha) * self._smoothed + self.alpha * dist
+            self._state.pop(target_id, None)
+
+    def last(self, target_id=0):
+        """Current smoothed distance (cm) for target_id, or None; changes no state."""
+        s = self._state.get(target_id)
+        return s[0] if s else None
+
+    def measure(self, bboxes):
+        """Raw (unsmoothed) distances for an (N, 4) array of x, y, w, h boxes; NaN where unknown."""
+        b = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        if self.focal_px is None or len(b) == 0:
+            return np.full(len(b), np.nan)
+
+        w, h = b[:, 2], b[:, 3]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            d_w = np.where(w > 0, self.known_width_cm * self.focal_px / w, np.nan)
+            if self.known_height_cm:
+                d_h = np.where(h > 0, self.known_height_cm * self.focal_px / h, np.nan)
+            else:
+                d_h = np.full(len(b), np.nan)
+            ratio = np.maximum(d_w, d_h) / np.minimum(d_w, d_h)
+            # NaN ratio (one side unknown) falls to fmin, which ignores NaN
+            return np.where(ratio <= self.outlier_ratio, 0.5 * (d_w + d_h), np.fmin(d_w, d_h))
+
+    def estimate_batch(self, bboxes, ids=None):
+        """
+        Smoothed distances (cm) for many boxes at once, one EMA per id
+        (ids default to 0..N-1). Returns a float array, NaN where unknown.
+        """
+        dist = self.measure(bboxes)
+        n = len(dist)
+        ids = list(range(n)) if ids is None else list(ids)
+        self._calls += 1
+
+        states = [self._state.get(i) for i in ids]
+        prev = np.array([s[0] if s else _NAN for s in states])
+        rejects = np.array([s[1] if s else 0 for s in states])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            outlier = np.abs(dist - prev) > self.max_jump * prev
+        # Repeated "outliers" are a real move: start over from the new reading
+        restart = np.isnan(prev) | (outlier & (rejects + 1 >= self.max_rejects))
+        rejected = outlier & ~restart
+        smoothed = np.where(restart, dist, (1 - self.alpha) * prev + self.alpha * dist)
+        # Rejected or missing reading: hold the last estimate
+        smoothed = np.where(rejected | np.isnan(dist), prev, smoothed)
+        rejects = np.where(rejected, rejects + 1, 0)
+
+        for i, target_id in enumerate(ids):
+            if not np.isnan(smoothed[i]):
+                self._state[target_id] = [float(smoothed[i]), int(rejects[i]), self._calls]
+
+        if self._calls % self.state_ttl == 0:
+            # Forget targets not seen for a while (ids are never reused, so this only frees memory)
+            old = self._calls - self.state_ttl
+            self._state = {k: s for k, s in self._state.items() if s[2] > old}
+        return smoothed
+
+    def estimate(self, bbox, target_id=0):
+        """Smoothed distance (cm) for one x, y, w, h box, or None."""
+        d = self.estimate_batch([bbox], [target_id])[0]
+        return None if np.isnan(d) else float(d)
+
+    def calibrate(self, bboxes, distance_cm=None, save=True):
+        """
+        Sets focal_px (and the box height in cm) from one box, or the median
+        of many, taken at distance_cm (default CALIB_DISTANCE_CM). Saves the
+        profile for the current mode and class. Returns the profile or None.
+        """
+        b = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        b = b[(b[:, 2] > 0) & (b[:, 3] > 0)]
+        if len(b) == 0:
+            return None
+        distance_cm = float(distance_cm or self.calib_distance_cm)
+        w = float(np.median(b[:, 2]))
+        h = float(np.median(b[:, 3]))
+
+        self.focal_px = w * distance_cm / self.known_width_cm
+        self.known_height_cm = h * distance_cm / self.focal_px
+        self._geometry = (self.known_width_cm, self.known_height_cm, self.focal_px)
+        self._state.clear()
 
-        return self._smoothed
+        profile = {
+            "focal_px": self.focal_px,
+            "known_width_cm": self.known_width_cm,
+            "known_height_cm": self.known_height_cm,
+            "calib_distance_cm": distance_cm,
+            "frame_size": list(config.PREVIEW_SIZE),
+            "samples": len(b),
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.store.put(self.mode, self.target_class, profile)
+        if save:
+            try:
+                self.store.save()
+            except OSError as e:
+                print(f"[distance] could not save profiles: {e}")
+        return profile
@@ -0,0 +1,77 @@
+"""
+Docstring for distance.profiles
+calibration profiles saved to disk, per tracker mode and target class
+"""
+
+import json
+import os
+
+import config
+
+# File layout (config.DIST_PROFILES):
+#   {"version": 1,
+#    "profiles": {"face": {"default": {...}, "alice": {...}},
+#                 "colour": {"cb132b_red": {...}}}}
+# A profile holds focal_px, known_width_cm, known_height_cm,
+# calib_distance_cm, frame_size [w, h], samples and updated.
+VERSION = 1
+
+
+class ProfileStore:
+    def __init__(self, path=None):
+        if path is None:
+            path = getattr(config, "DIST_PROFILES", None)
+        # No path: profiles live in memory only (benchmarks, tests)
+        self.path = os.path.expanduser(path) if path else None
+        self.profiles = self._load()
+
+    def _load(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"[distance] ignoring {self.path}: {e}")
+            return {}
+        if data.get("version") != VERSION:
+            print(f"[distance] ignoring {self.path}: unsupported version {data.get('version')}")
+            return {}
+        return data.get("profiles", {})
+
+    def get(self, mode, target_class=None):
+        """Profile for (mode, class), else the mode's "default", else None."""
+        by_class = self.profiles.get(mode, {})
+        profile = by_class.get(target_class) if target_class else None
+        if profile is None:
+            profile = by_class.get("default")
+        return dict(profile) if profile is not None else None
+
+    def put(self, mode, target_class, profile):
+        self.profiles.setdefault(mode, {})[target_class or "default"] = dict(profile)
+
+    def remove(self, mode, target_class=None):
+        by_class = self.profiles.get(mode, {})
+        removed = by_class.pop(target_class or "default", None) is not None
+        if not by_class:
+            self.profiles.pop(mode, None)
+        return removed
+
+    def items(self):
+        for mode, by_class in sorted(self.profiles.items()):
+            for target_class, profile in sorted(by_class.items()):
+                yield mode, target_class, profile
+
+    def save(self):
+        if self.path is None:
+            return False
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # Write then rename, so an interrupted save keeps the old profiles
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": VERSION, "profiles": self.profiles}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+        return True
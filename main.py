@@ -1,77 +1,323 @@
 # main.py
-import cv2 as cv
+import math
+import time
+
+T_START = time.monotonic()  # for time-to-first-tracked-frame
+
 import config
 
 from distance.estimator import DistanceEstimator
-from vision.camera import Camera
-from ui.overlay import draw_crosshair, draw_tracking_overlay
-from vision.tracker import make_tracker
+from perf.profiler import PROFILER
+from vision.tracker import make_tracker, close_tracker, reconfigure_tracker
+
+# cv2, picamera2, pigpio and the detector modules are imported on demand
+# (see bring_up()), so only the selected mode's dependencies get loaded.
+
+def track(tracker, frame, small=None):
+    if small is not None and getattr(tracker, "takes_small", False):
+        # Detect on the lores stream, results come back in frame coordinates
+        return tracker.process(frame, small=small)
+    return tracker.process(frame)  # must return dict
+
+
+def predict_motion(result, predictor, frame, latency_s):
+    # Kalman-filter the centre and lead it by the capture -> now latency
+    if predictor is None or result.get("skipped"):
+        # A reused (motion-gated) result is not a new measurement
+        return result
+    H, W = frame.shape[:2]
+    return predictor.filter(result, (W, H), latency_s)
+
+
+def target_class(result):
+    # Which calibration profile applies: the colour seen, else config.DIST_CLASS
+    return result.get("color") or getattr(config, "DIST_CLASS", None)
+
+
+def add_distance(result, dist_est):
+    # Distance from bbox width and height, per tracked target
+    result["distance_cm"] = None
+    tracks = result.get("tracks")
+    if result.get("skipped"):
+        # Same detection as before: show the held estimates, don't smooth it in twice
+        for t in tracks or ():
+            t["distance_cm"] = dist_est.last(t["id"])
+        if result.get("found"):
+            result["distance_cm"] = dist_est.last(result.get("target_id", 0))
+        return
+
+    # Switch profile only on a hit: a miss has no colour and says nothing about the class
+    if result.get("found"):
+        cls = target_class(result)
+        if cls != dist_est.target_class:
+            dist_est.use_class(cls)
+
+    if tracks:
+        # Every live track in one call; each keeps its own smoothing
+        dists = dist_est.estimate_batch([t["bbox"] for t in tracks], [t["id"] for t in tracks])
+        for t, d in zip(tracks, dists):
+            t["distance_cm"] = None if math.isnan(d) else float(d)
+            if t["id"] == result.get("target_id") and result.get("found"):
+                result["distance_cm"] = t["distance_cm"]
+        return
+
+    bbox = result.get("bbox")
+    if result.get("found") and isinstance(bbox, (tuple, list)) and len(bbox) == 4:
+        result["distance_cm"] = dist_est.estimate(bbox, result.get("target_id", 0))
+
+
+def apply_config_changes(runtime, tracker, controller, dist_est, predictor=None):
+    # Live config edits land here, between frames, all at once
+    changed = runtime.take_pending()
+    if not changed:
+        return
+    reconfigure_tracker(tracker, changed)
+    if predictor is not None:
+        predictor.reconfigure(changed)
+    if controller is not None:
+        controller.reconfigure(changed)
+    dist_est.reconfigure(changed)
+
+
+def drive_servos(result, controller):
+    # Servo control
+    if controller is not None and result.get("found") and result.get("error") and not result.get("skipped"):
+        error_x, error_y = result["error"]
+        # Target velocity (Kalman) feeds forward; latency lines the error up with the servo history
+        controller.update(
+            error_x, error_y,
+            velocity=result.get("velocity"),
+            latency_s=result.get("latency_s", 0.0),
+        )
+
+
+def draw_overlays(compositor, frame, result):
+    # Overlays go on a separate display image; frame stays as analysed
+    summary = None
+    if PROFILER.enabled and getattr(config, "PROFILE_HUD", True):
+        summary = PROFILER.summary()
+    return compositor.render(frame, result, summary)
+
+
+def print_governor_decision(d):
+    print(
+        f"[governor] level {d['from']} -> {d['level']} ({d['reason']}): "
+        f"quality {d['detector_quality']}, scale {d['detect_scale']:.2f}, "
+        f"loop {d['loop_ms']:.1f}ms, temp {d['temp_c']}"
+    )
+
+
+def open_camera():
+    from vision.camera import Camera
+    return Camera()
 
-PanTiltController = None
-if config.USE_SERVO:
+
+def open_tracker(mode):
+    tracker = make_tracker(mode)
+    if getattr(config, "DETECTOR_WARMUP", True):
+        from vision.warmup import warm_up
+        warm_up(tracker)
+    return tracker
+
+
+def open_controller():
+    if not config.USE_SERVO:
+        return None
     try:
         from servo.controller import PanTiltController
+        return PanTiltController()
     except Exception:
-        PanTiltController = None
+        return None
 
-def main():
-    camera = Camera()
-    dist_est = DistanceEstimator()
 
-    # Choose tracker from config (single mode)
-    tracker = make_tracker(config.TRACK_MODE)
+def bring_up(mode):
+    """
+    Starts camera, tracker and servos, in parallel with STARTUP_PARALLEL
+    (picamera2 start, model loading and the pigpiod connection mostly wait
+    on I/O or release the GIL). Returns (camera, tracker, controller, timings).
+    """
+    steps = [("camera", open_camera), ("tracker", lambda: open_tracker(mode)), ("servo", open_controller)]
+    timings = {}
 
-    controller = None
-    if config.USE_SERVO and PanTiltController is not None:
+    def timed(name, fn):
+        t0 = time.monotonic()
         try:
-            controller = PanTiltController()
-        except Exception:
-            controller = None
+            return fn()
+        finally:
+            timings[name] = time.monotonic() - t0
+
+    done, error = {}, None
+    if getattr(config, "STARTUP_PARALLEL", True):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=len(steps)) as pool:
+            futures = {name: pool.submit(timed, name, fn) for name, fn in steps}
+        for name, future in futures.items():
+            try:
+                done[name] = future.result()
+            except Exception as e:
+                done[name] = None
+                error = error or e
+    else:
+        for name, fn in steps:
+            try:
+                done[name] = timed(name, fn)
+            except Exception as e:
+                done[name] = None
+                error = e
+                break
+
+    if error is not None:
+        # Don't leave worker processes, the camera or the servos running
+        if done.get("tracker") is not None:
+            close_tracker(done["tracker"])
+        if done.get("camera") is not None:
+            done["camera"].close()
+        if done.get("servo") is not None:
+            done["servo"].close()
+        raise error
+
+    # Warm-up timings are not part of the run
+    PROFILER.reset()
+    return done["camera"], done["tracker"], done["servo"], timings
+
+
+def print_startup(timings, first_frame_s):
+    parts = ", ".join(f"{name} {t:.2f}s" for name, t in timings.items())
+    print(f"[startup] {parts}; first tracked frame {first_frame_s:.2f}s after launch")
+
 
+def main():
+    # Camera, tracker (from config, single mode) and servos
+    camera, tracker, controller, startup = bring_up(config.TRACK_MODE)
+    dist_est = DistanceEstimator(config.TRACK_MODE)
+
+    # Trade detector quality for frame rate at runtime
+    governor = None
+    if getattr(config, "GOVERNOR", False):
+        from perf.governor import QualityGovernor
+        governor = QualityGovernor(tracker, on_change=print_governor_decision)
+
+    # Per-frame session log (and optional video) for perf.replay
+    recorder = None
+    if getattr(config, "SESSION_LOG", None):
+        from perf.session_log import SessionRecorder
+        recorder = SessionRecorder(time.strftime(config.SESSION_LOG), mode=config.TRACK_MODE)
+
+    predictor = None
+    if getattr(config, "KALMAN_ENABLED", False):
+        from vision.motion_model import MotionPredictor
+        predictor = MotionPredictor()
+
+    # Tuning without a restart: config.py edits and/or socket commands
+    runtime = None
+    if getattr(config, "RUNTIME_CONFIG", False) or getattr(config, "RUNTIME_CONFIG_SOCKET", None):
+        from runtime_config import RuntimeConfig
+        runtime = RuntimeConfig().start()
+
+    # Headless: no windows; keys come from the control channel instead
+    headless = getattr(config, "HEADLESS", False)
+    if not headless:
+        import cv2 as cv
+    stream = None
+    control = None
+    if headless or getattr(config, "STREAM_PORT", None):
+        from ui.stream import ControlChannel, MjpegServer
+        control = ControlChannel()
+        control.start_stdin()
+        if getattr(config, "STREAM_PORT", None):
+            stream = MjpegServer(control=control).start()
+
+    # Only built when something will show its output
+    compositor = None
+    if not headless or stream is not None:
+        from ui.compositor import OverlayCompositor
+        compositor = OverlayCompositor()
+
+    first_frame = True
+    first_lock = True
     try:
         while True:
-            frame = camera.read()
-            result = tracker.process(frame)  # must return dict
-
-            # Distance from bbox width
-            result["distance_cm"] = None
-            bbox = result.get("bbox")
-            if result.get("found") and isinstance(bbox, (tuple, list)) and len(bbox) == 4:
-                w = int(bbox[2])
-                result["distance_cm"] = dist_est.estimate_cm(w)
-
-            # Servo control
-            if controller is not None and result.get("found") and result.get("error"):
-                error_x, error_y = result["error"]
-                controller.update(error_x, error_y)
-
-            # Overlays
-            draw_crosshair(frame)
-            draw_tracking_overlay(frame, result)
-
-            # Display
-            cv.imshow("Video", frame)
-            mask = result.get("mask")
-            if mask is not None:
-                cv.imshow("Mask", mask)
-
-            key = cv.waitKey(1) & 0xFF
-
-            # Calibrate focal length using current bbox width
+            if runtime is not None:
+                apply_config_changes(runtime, tracker, controller, dist_est, predictor)
+            t_loop = time.monotonic()
+            with PROFILER.stage("loop"):
+                with PROFILER.stage("capture"):
+                    frame, small = camera.read_pair()
+                    t_read = time.monotonic()
+                with PROFILER.stage("track"):
+                    result = track(tracker, frame, small)
+                if recorder is not None:
+                    recorder.add_frame(frame)
+                with PROFILER.stage("predict"):
+                    # Capture time of the frame the result belongs to: pipelined
+                    # detectors answer for a frame sent pipeline_delay_s earlier
+                    t_capture = t_read - camera.last_frame_age_s - result.get("pipeline_delay_s", 0.0)
+                    latency_s = time.monotonic() - t_capture
+                    result["latency_s"] = latency_s
+                    predict_motion(result, predictor, frame, latency_s)
+                with PROFILER.stage("distance"):
+                    add_distance(result, dist_est)
+                with PROFILER.stage("servo"):
+                    drive_servos(result, controller)
+
+                # Overlays (skipped when nobody is watching)
+                streaming = stream is not None and stream.wants_frames
+                display = None
+                if not headless or streaming:
+                    with PROFILER.stage("overlay"):
+                        display = draw_overlays(compositor, frame, result)
+
+                # Display
+                with PROFILER.stage("display"):
+                    key = 0xFF
+                    if not headless:
+                        cv.imshow("Video", display)
+                        mask = result.get("mask")
+                        if mask is not None:
+                            cv.imshow("Mask", mask)
+                        key = cv.waitKey(1) & 0xFF
+                    if streaming:
+                        stream.publish(display)
+                    if key == 0xFF and control is not None:
+                        key = control.poll_key()
+            loop_s = time.monotonic() - t_loop
+            if recorder is not None:
+                recorder.record(result, controller, loop_s)
+            PROFILER.frame_done()
+            if first_frame:
+                first_frame = False
+                print_startup(startup, time.monotonic() - T_START)
+            if first_lock and result.get("found"):
+                first_lock = False
+                print(f"[startup] first target lock {time.monotonic() - T_START:.2f}s after launch")
+            if governor is not None:
+                governor.update(loop_s)
+
+            # Calibrate focal length using current bbox (saved to DIST_PROFILES)
             if key == ord("c"):
                 bbox = result.get("bbox")
                 if result.get("found") and isinstance(bbox, (tuple, list)) and len(bbox) == 4:
-                    w = int(bbox[2])
-                    dist_est.calibrate(w)
+                    profile = dist_est.calibrate(bbox)
+                    if profile is not None:
+                        print(f"[distance] {config.TRACK_MODE}/{dist_est.target_class or 'default'}: "
+                              f"focal {profile['focal_px']:.1f}px")
 
             elif key == ord("q"):
                 break
 
     finally:
+        close_tracker(tracker)
         camera.close()
         if controller is not None:
             controller.close()
-        cv.destroyAllWindows()
+        if recorder is not None:
+            recorder.close()
+        if runtime is not None:
+            runtime.close()
+        if stream is not None:
+            stream.close()
+        if not headless:
+            cv.destroyAllWindows()
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+# perf package
\ No newline at end of file
@@ -0,0 +1,344 @@
+# perf/bench.py
+"""
+Benchmark harness: replays video files or synthetic frames through the
+trackers and the main pipeline, with no camera, pigpio or GUI
+(servos run through servo.sim.FakePi).
+
+    python -m perf.bench --modes colour face person dnn fused pipeline --frames 300
+    python -m perf.bench --video clip.mp4 --out results.json
+    python -m perf.bench --out new.json --baseline old.json --tolerance 0.15
+
+Reports per-stage latency percentiles, FPS and memory, and writes JSON.
+With --baseline it exits non-zero when a p50 regresses past --tolerance.
+"""
+
+import argparse
+import json
+import math
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+import cv2 as cv
+import numpy as np
+import config
+
+
+# ----------------------------
+# Frame sources (same read_pair() API as vision.camera.Camera)
+# ----------------------------
+class VideoSource:
+    def __init__(self, path, max_frames=None, loop=False):
+        self.path = path
+        self.max_frames = max_frames
+        self.loop = loop
+        self._cap = cv.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"Could not open video: {path}")
+        self._count = 0
+
+    def read_pair(self):
+        if self.max_frames is not None and self._count >= self.max_frames:
+            return None, None
+        ok, frame = self._cap.read()
+        if not ok and self.loop and self._count > 0:
+            self._cap.set(cv.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._cap.read()
+        if not ok:
+            return None, None
+        self._count += 1
+        return frame, None
+
+    def close(self):
+        self._cap.release()
+
+
+class SyntheticSource:
+    """
+    Noisy static background with a red disc moving on a Lissajous path.
+    Exercises the colour path end to end; face/person detectors see no
+    targets, so use recorded video for their hit-rate, not just cost.
+    """
+
+    def __init__(self, max_frames=300, size=None, radius=60, seed=0):
+        self.max_frames = max_frames
+        W, H = size or config.PREVIEW_SIZE
+        self.size = (W, H)
+        self.radius = radius
+        rng = np.random.default_rng(seed)
+        self._background = rng.integers(40, 120, size=(H, W, 3), dtype=np.uint8)
+        self._count = 0
+
+    def target_center(self, i):
+        W, H = self.size
+        t = i / 30.0
+        cx = W / 2 + (W / 3) * math.sin(1.3 * t)
+        cy = H / 2 + (H / 3) * math.sin(0.9 * t + 0.5)
+        return int(cx), int(cy)
+
+    def read_pair(self):
+        if self._count >= self.max_frames:
+            return None, None
+        frame = self._background.copy()
+        cv.circle(frame, self.target_center(self._count), self.radius, (43, 19, 203), -1)  # cb132b
+        self._count += 1
+        return frame, None
+
+    def close(self):
+        pass
+
+
+# ----------------------------
+# Timing helpers
+# ----------------------------
+def summarize(samples_s):
+    if not samples_s:
+        return {"n": 0}
+    ms = np.asarray(samples_s, dtype=np.float64) * 1000.0
+    return {
+        "n": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def _max_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _run(source, stages, warmup, trace_alloc=False):
+    """
+    Runs frames from source through stages [(name, fn(frame, small, state))].
+    Returns per-stage summaries, FPS and memory.
+
+    trace_alloc turns on tracemalloc (Python + NumPy allocations); it slows
+    the Python parts of the loop, so leave it off when comparing latency.
+    """
+    timings = {"capture": []}
+    timings.update({name: [] for name, _ in stages})
+    totals = []
+    found = 0
+    frames = 0
+    state = {}
+
+    peak = 0
+    if trace_alloc:
+        tracemalloc.start()
+    try:
+        while True:
+            t0 = time.perf_counter()
+            frame, small = source.read_pair()
+            t1 = time.perf_counter()
+            if frame is None:
+                break
+
+            state["result"] = None
+            times = [("capture", t1 - t0)]
+            t_prev = t1
+            for name, fn in stages:
+                fn(frame, small, state)
+                t_now = time.perf_counter()
+                times.append((name, t_now - t_prev))
+                t_prev = t_now
+
+            frames += 1
+            if frames <= warmup:
+                continue
+            for name, dt in times:
+                timings[name].append(dt)
+            # Loop time excludes capture (source decode cost is not ours)
+            totals.append(t_prev - t1)
+            if state["result"] is not None and state["result"].get("found"):
+                found += 1
+
+        if trace_alloc:
+            _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if trace_alloc:
+            tracemalloc.stop()
+        source.close()
+
+    measured = max(0, frames - warmup)
+    total_s = sum(totals)
+    return {
+        "frames": measured,
+        "found_rate": found / measured if measured else 0.0,
+        "fps": measured / total_s if total_s > 0 else 0.0,
+        "loop": summarize(totals),
+        "stages": {name: summarize(v) for name, v in timings.items()},
+        "py_alloc_peak_mb": peak / (1024 * 1024) if trace_alloc else None,
+        "max_rss_mb": _max_rss_mb(),
+    }
+
+
+def bench_tracker(mode, source, warmup=10, trace_alloc=False):
+    from vision.tracker import make_tracker, close_tracker
+
+    tracker = make_tracker(mode)
+
+    def run_tracker(frame, small, state):
+        state["result"] = tracker.process(frame)
+
+    try:
+        return _run(source, [("track", run_tracker)], warmup, trace_alloc)
+    finally:
+        # Parallel mode: stop the workers and free the shared memory
+        close_tracker(tracker)
+
+
+def bench_pipeline(mode, source, warmup=10, trace_alloc=False):
+    """The main.py per-frame path with servos stubbed and no window."""
+    import main
+    from distance.estimator import DistanceEstimator
+    from distance.profiles import ProfileStore
+    from vision.tracker import make_tracker, close_tracker
+    from servo.controller import PanTiltController
+    from servo.sim import FakePi
+    from ui.compositor import OverlayCompositor
+
+    tracker = make_tracker(mode)
+    # Default profile, in memory only: a benchmark shouldn't depend on local calibration
+    dist_est = DistanceEstimator(mode, store=ProfileStore(path=""))
+    # Real control law on a fake pigpio, so the servo stage costs what it does on the Pi
+    controller = PanTiltController(threaded=False, pi=FakePi())
+    compositor = OverlayCompositor()
+    predictor = None
+    if getattr(config, "KALMAN_ENABLED", False):
+        from vision.motion_model import MotionPredictor
+        predictor = MotionPredictor()
+
+    def run_track(frame, small, state):
+        state["t_read"] = time.monotonic()
+        state["result"] = main.track(tracker, frame, small)
+
+    def run_predict(frame, small, state):
+        # Synthetic/video frames are fresh when read; pipelined results are older
+        latency_s = time.monotonic() - state["t_read"] + state["result"].get("pipeline_delay_s", 0.0)
+        main.predict_motion(state["result"], predictor, frame, latency_s)
+
+    def run_distance(frame, small, state):
+        main.add_distance(state["result"], dist_est)
+
+    def run_servo(frame, small, state):
+        main.drive_servos(state["result"], controller)
+
+    def run_overlay(frame, small, state):
+        main.draw_overlays(compositor, frame, state["result"])
+
+    try:
+        return _run(source, [
+            ("track", run_track),
+            ("predict", run_predict),
+            ("distance", run_distance),
+            ("servo", run_servo),
+            ("overlay", run_overlay),
+        ], warmup, trace_alloc)
+    finally:
+        close_tracker(tracker)
+        controller.close()
+
+
+# ----------------------------
+# CLI
+# ----------------------------
+def _make_source(args):
+    if args.video:
+        return VideoSource(args.video, max_frames=args.frames)
+    return SyntheticSource(max_frames=args.frames)
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of regressions: loop p50 slower than baseline by > tolerance."""
+    regressions = []
+    for name, res in results["runs"].items():
+        base = baseline.get("runs", {}).get(name)
+        if not base or "loop" not in base or "loop" not in res:
+            continue
+        new_p50 = res["loop"].get("p50_ms")
+        old_p50 = base["loop"].get("p50_ms")
+        if new_p50 and old_p50 and new_p50 > old_p50 * (1 + tolerance):
+            regressions.append(f"{name}: loop p50 {old_p50:.2f}ms -> {new_p50:.2f}ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark trackers and the main loop offline.")
+    parser.add_argument("--modes", nargs="+", default=["colour", "face", "person", "dnn", "fused", "pipeline"],
+                        help="tracker modes, plus 'pipeline' for the full main.py loop")
+    parser.add_argument("--pipeline-mode", default=None, help="tracker used by 'pipeline' (default TRACK_MODE)")
+    parser.add_argument("--video", help="video file to replay (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--profile", action="store_true", help="include per-stage tracker timings (perf.profiler)")
+    parser.add_argument("--trace-alloc", action="store_true", help="track peak Python/NumPy allocations (slower)")
+    parser.add_argument("--out", help="write JSON results here")
+    parser.add_argument("--baseline", help="JSON from a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    results = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "opencv": cv.__version__,
+            "machine": platform.machine(),
+            "source": args.video or "synthetic",
+            "frames": args.frames,
+        },
+        "runs": {},
+    }
+
+    if args.profile:
+        from perf.profiler import PROFILER
+        PROFILER.enabled = True
+
+    for mode in args.modes:
+        source = _make_source(args)
+        if args.profile:
+            PROFILER.reset()
+        try:
+            if mode == "pipeline":
+                res = bench_pipeline(args.pipeline_mode or config.TRACK_MODE, source, args.warmup, args.trace_alloc)
+            else:
+                res = bench_tracker(mode, source, args.warmup, args.trace_alloc)
+        except RuntimeError as e:
+            # e.g. no DNN model configured: skip the mode, keep the rest
+            source.close()
+            print(f"{mode:>10}: skipped ({e})")
+            results["runs"][mode] = {"skipped": str(e)}
+            continue
+        if args.profile:
+            res["profile"] = PROFILER.summary()
+        results["runs"][mode] = res
+
+        loop = res["loop"]
+        print(
+            f"{mode:>10}: {res['fps']:7.1f} fps  "
+            f"p50 {loop.get('p50_ms', 0):7.2f}ms  p99 {loop.get('p99_ms', 0):7.2f}ms  "
+            f"found {res['found_rate']:.0%}  rss {res['max_rss_mb']:.0f}MB"
+        )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
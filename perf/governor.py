@@ -0,0 +1,110 @@
+# perf/governor.py
+"""
+Adaptive quality governor.
+
+Measures loop time and walks a single quality ladder to hold
+GOV_TARGET_FPS: level 0 is full quality; each step up first coarsens the
+detector knobs (Haar scaleFactor/minNeighbors/minSize, HOG stride/scale,
+colour morphology) and then drops detection resolution (GOV_SCALE_STEPS,
+not with CAMERA_LORES_SIZE, whose size is fixed by the camera).
+It steps down again when there is headroom, and treats a hot SoC
+(GOV_THERMAL_C) as over budget so the Pi sheds load before it throttles.
+
+Every change is kept in .history (and passed to on_change) for logging.
+"""
+
+import time
+from collections import deque
+
+import config
+from vision.scaled import ScaledTracker
+
+THERMAL_PATH = "/sys/class/thermal/thermal_zone0/temp"
+
+
+def _walk(tracker):
+    while tracker is not None:
+        yield tracker
+        tracker = getattr(tracker, "tracker", None)
+
+
+def read_soc_temp_c(path=THERMAL_PATH):
+    try:
+        with open(path) as f:
+            return int(f.read().strip()) / 1000.0
+    except (OSError, ValueError):
+        return None
+
+
+class QualityGovernor:
+    def __init__(self, tracker, target_fps=None, on_change=None):
+        self.target_fps = float(target_fps or getattr(config, "GOV_TARGET_FPS", 15))
+        self.budget_s = 1.0 / self.target_fps
+        self.interval = int(getattr(config, "GOV_INTERVAL_FRAMES", 15))
+        self.headroom = float(getattr(config, "GOV_HEADROOM", 0.7))
+        self.thermal_c = getattr(config, "GOV_THERMAL_C", 75.0)
+        self.on_change = on_change
+
+        # Knob owners in the tracker chain
+        chain = list(_walk(tracker))
+        self._detectors = [t for t in chain if hasattr(t, "set_quality")]
+        self._scaler = next((t for t in chain if isinstance(t, ScaledTracker)), None)
+        self._base_scale = self._scaler.scale if self._scaler is not None else 1.0
+
+        detector_levels = max((len(d.QUALITY_LEVELS) for d in self._detectors), default=1)
+        scale_steps = list(getattr(config, "GOV_SCALE_STEPS", [1.0, 0.75, 0.5])) if self._scaler else [1.0]
+        if getattr(config, "CAMERA_LORES_SIZE", None):
+            # The camera delivers the detection image at a fixed size
+            scale_steps = [1.0]
+        # Ladder: detector levels at full resolution, then lower resolutions at the coarsest knobs
+        self.ladder = [(q, scale_steps[0]) for q in range(detector_levels)]
+        self.ladder += [(detector_levels - 1, s) for s in scale_steps[1:]]
+
+        self.level = 0
+        self._ema = None
+        self._frames = 0
+        self.temp_c = None
+        self.history = deque(maxlen=200)
+        self.last_decision = None
+
+    def _apply(self, level, reason):
+        quality, scale_mult = self.ladder[level]
+        for d in self._detectors:
+            d.set_quality(quality)
+        if self._scaler is not None:
+            self._scaler.set_scale(self._base_scale * scale_mult)
+
+        decision = {
+            "time": time.time(),
+            "from": self.level,
+            "level": level,
+            "detector_quality": quality,
+            "detect_scale": self._base_scale * scale_mult,
+            "loop_ms": (self._ema or 0.0) * 1000.0,
+            "temp_c": self.temp_c,
+            "reason": reason,
+        }
+        self.level = level
+        self.last_decision = decision
+        self.history.append(decision)
+        if self.on_change is not None:
+            self.on_change(decision)
+
+    def update(self, loop_s):
+        """Feed one loop time (seconds); may change the quality level."""
+        self._ema = loop_s if self._ema is None else 0.8 * self._ema + 0.2 * loop_s
+        self._frames += 1
+        if self._frames % self.interval:
+            return
+
+        self.temp_c = read_soc_temp_c()
+        hot = self.thermal_c is not None and self.temp_c is not None and self.temp_c >= self.thermal_c
+
+        if (hot or self._ema > self.budget_s) and self.level < len(self.ladder) - 1:
+            self._apply(self.level + 1, "thermal" if hot else "over budget")
+        elif not hot and self._ema < self.budget_s * self.headroom and self.level > 0:
+            self._apply(self.level - 1, "headroom")
+        else:
+            return
+        # Measure the new level from scratch
+        self._ema = None
@@ -0,0 +1,137 @@
+# perf/profiler.py
+"""
+Lightweight per-stage timing.
+
+    from perf.profiler import PROFILER
+
+    with PROFILER.stage("colour.blur"):
+        ...
+
+When config.PROFILE is False, stage() hands back a shared no-op context
+manager, so instrumented code costs one method call per stage. A consumer
+that needs this frame's times anyway (perf.session_log) sets keep_current:
+stages are then timed into .current only, without the rolling window.
+"""
+
+import csv
+import os
+import time
+from collections import deque
+
+import config
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("_profiler", "_name", "_t0")
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._profiler.record(self._name, time.perf_counter() - self._t0)
+        return False
+
+
+class _CurrentStage(_Stage):
+    __slots__ = ()
+
+    def __exit__(self, *exc):
+        self._profiler.current[self._name] = time.perf_counter() - self._t0
+        return False
+
+
+def _percentile(sorted_vals, q):
+    if not sorted_vals:
+        return 0.0
+    i = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+    return sorted_vals[i]
+
+
+class Profiler:
+    """Keeps a rolling window of durations per stage (seconds)."""
+
+    def __init__(self, enabled=None, window=None, csv_path=None, dump_every_s=None):
+        self.enabled = bool(enabled if enabled is not None else getattr(config, "PROFILE", False))
+        self.window = int(window or getattr(config, "PROFILE_WINDOW", 120))
+        self.csv_path = csv_path if csv_path is not None else getattr(config, "PROFILE_CSV", None)
+        self.dump_every_s = float(dump_every_s or getattr(config, "PROFILE_DUMP_S", 10.0))
+
+        self._samples = {}  # name -> deque of durations (insertion order = first seen)
+        self.current = {}   # name -> duration in the frame in progress (perf.session_log)
+        self.keep_current = False  # fill .current even when disabled
+        self._last_dump = time.monotonic()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _CurrentStage(self, name) if self.keep_current else _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.window)
+        samples.append(seconds)
+        self.current[name] = seconds
+
+    def reset(self):
+        self._samples.clear()
+
+    def summary(self):
+        """{stage: {last_ms, mean_ms, p50_ms, p90_ms, p99_ms, n}} over the rolling window."""
+        out = {}
+        for name, samples in self._samples.items():
+            if not samples:
+                continue
+            vals = sorted(samples)
+            out[name] = {
+                "n": len(vals),
+                "last_ms": samples[-1] * 1000.0,
+                "mean_ms": sum(vals) / len(vals) * 1000.0,
+                "p50_ms": _percentile(vals, 0.50) * 1000.0,
+                "p90_ms": _percentile(vals, 0.90) * 1000.0,
+                "p99_ms": _percentile(vals, 0.99) * 1000.0,
+            }
+        return out
+
+    def frame_done(self):
+        """Call once per loop iteration; writes the CSV every dump_every_s."""
+        self.current.clear()
+        if not self.enabled or not self.csv_path:
+            return
+        now = time.monotonic()
+        if now - self._last_dump >= self.dump_every_s:
+            self._last_dump = now
+            self.dump_csv(self.csv_path)
+
+    def dump_csv(self, path):
+        new_file = not os.path.exists(path)
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with open(path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(["time", "stage", "n", "mean_ms", "p50_ms", "p90_ms", "p99_ms"])
+            for name, s in self.summary().items():
+                writer.writerow([
+                    stamp, name, s["n"],
+                    f"{s['mean_ms']:.3f}", f"{s['p50_ms']:.3f}", f"{s['p90_ms']:.3f}", f"{s['p99_ms']:.3f}",
+                ])
+
+
+# Shared instance used by main.py and the trackers
+PROFILER = Profiler()
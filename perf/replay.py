@@ -0,0 +1,187 @@
+# perf/replay.py
+"""
+Replays a recorded session (perf.session_log) through the current tracker.
+
+    python -m perf.replay sessions/20250101-120000.ptsl --info
+    python -m perf.replay sessions/20250101-120000.ptsl
+    python -m perf.replay run.ptsl --mode face --recorded-config --out cmp.json
+
+Frames come from the session's video (record with SESSION_VIDEO = True),
+in order, one tracker call per frame and with PARALLEL_WORKERS = 0, so the
+same code always gives the same results. Reports how the new results
+compare with the recorded tracker output (found agreement, bbox IoU,
+centre error; frames the Kalman predictor coasted through count as misses)
+and the new tracker time against the recorded "track" stage.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import config
+from perf.bench import summarize
+from perf.session_log import read_session
+
+
+def _bbox_center(b):
+    return b[0] + b[2] / 2.0, b[1] + b[3] / 2.0
+
+
+def _tracker_found(rec):
+    # main records after MotionPredictor: a coasting record is a frame the
+    # tracker missed, with a predicted bbox filled in. Otherwise the bbox is
+    # the tracker's own (only "center" is led), so it compares as-is
+    return rec["found"] and not rec["coasting"]
+
+
+def _px_summary(values):
+    if not values:
+        return {"n": 0}
+    vals = sorted(values)
+    return {
+        "n": len(vals),
+        "mean": sum(vals) / len(vals),
+        "p50": vals[len(vals) // 2],
+        "p90": vals[min(len(vals) - 1, int(0.9 * len(vals)))],
+        "max": vals[-1],
+    }
+
+
+def _apply_config(snapshot):
+    # JSON turned tuples into lists and dict keys into strings; undo what we can
+    for name, value in snapshot.items():
+        current = getattr(config, name, None)
+        if isinstance(value, dict):
+            continue
+        if isinstance(current, tuple) and isinstance(value, list):
+            value = tuple(value)
+        setattr(config, name, value)
+
+
+def _stage_summary(records, stage):
+    samples = [r["stages_ms"][stage] / 1000.0 for r in records if stage in r["stages_ms"]]
+    return summarize(samples)
+
+
+def session_info(path):
+    header, records = read_session(path)
+    records = list(records)
+    found = sum(1 for r in records if r["found"])
+    info = {
+        "mode": header["mode"],
+        "started": header["started"],
+        "frame_size": header["frame_size"],
+        "frames": len(records),
+        "video_frames": sum(1 for r in records if r["video"]),
+        "found_rate": found / len(records) if records else 0.0,
+        "duration_s": records[-1]["t"] - records[0]["t"] if records else 0.0,
+        "loop": summarize([r["loop_ms"] / 1000.0 for r in records]),
+        "stages": {s: _stage_summary(records, s) for s in header["stages"]},
+    }
+    if records:
+        info["pan_us"] = [min(r["pan_us"] for r in records), max(r["pan_us"] for r in records)]
+        info["tilt_us"] = [min(r["tilt_us"] for r in records), max(r["tilt_us"] for r in records)]
+    return info
+
+
+def replay(path, mode=None, recorded_config=False, max_frames=None):
+    import cv2 as cv
+    import main
+    from vision.multi_target import iou
+    from vision.tracker import make_tracker, close_tracker
+
+    header, records = read_session(path)
+    if not header.get("video"):
+        raise RuntimeError(f"{path} has no video (record with SESSION_VIDEO = True)")
+
+    if recorded_config:
+        # Rebuild the run's settings (minus anything that isn't JSON, e.g. colour ranges)
+        _apply_config(header["config"])
+    # Pipelined workers return results frames late; replay must be deterministic
+    config.PARALLEL_WORKERS = 0
+
+    video_path = os.path.join(os.path.dirname(path), header["video"])
+    cap = cv.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video: {video_path}")
+
+    tracker = make_tracker(mode or header["mode"])
+    track_s, recorded_track_s = [], []
+    frames = agree = new_found = old_found = 0
+    ious, center_err = [], []
+    try:
+        for rec in records:
+            if not rec["video"]:
+                continue
+            ok, frame = cap.read()
+            if not ok:
+                break
+
+            t0 = time.perf_counter()
+            result = main.track(tracker, frame)
+            track_s.append(time.perf_counter() - t0)
+            if "track" in rec["stages_ms"]:
+                recorded_track_s.append(rec["stages_ms"]["track"] / 1000.0)
+
+            frames += 1
+            found = bool(result.get("found"))
+            new_found += found
+            rec_found = _tracker_found(rec)
+            old_found += rec_found
+            agree += found == rec_found
+            if found and rec_found and result.get("bbox"):
+                ious.append(iou(rec["bbox"], result["bbox"]))
+                (ax, ay), (bx, by) = _bbox_center(rec["bbox"]), _bbox_center(result["bbox"])
+                center_err.append(math.hypot(ax - bx, ay - by))
+
+            if max_frames is not None and frames >= max_frames:
+                break
+    finally:
+        close_tracker(tracker)
+        cap.release()
+
+    return {
+        "session": path,
+        "mode": mode or header["mode"],
+        "frames": frames,
+        "found_rate": {"recorded": old_found / frames if frames else 0.0,
+                       "replay": new_found / frames if frames else 0.0},
+        "found_agreement": agree / frames if frames else 0.0,
+        "mean_iou": sum(ious) / len(ious) if ious else None,
+        "center_err_px": _px_summary(center_err),
+        "track": {"recorded": summarize(recorded_track_s), "replay": summarize(track_s)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded session through the current tracker.")
+    parser.add_argument("session", help=".ptsl file written with SESSION_LOG")
+    parser.add_argument("--info", action="store_true", help="only summarise the recording")
+    parser.add_argument("--mode", help="tracker mode to replay with (default: the recorded one)")
+    parser.add_argument("--recorded-config", action="store_true", help="use the config snapshot from the recording")
+    parser.add_argument("--frames", type=int, help="stop after this many frames")
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args(argv)
+
+    if args.info:
+        out = session_info(args.session)
+    else:
+        try:
+            out = replay(args.session, args.mode, args.recorded_config, args.frames)
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            return 1
+
+    text = json.dumps(out, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+# perf/session_log.py
+"""
+Compact binary session log.
+
+SessionRecorder appends one struct-packed record per frame (tracker result,
+servo pulse widths, stage timings) and, optionally, the raw frames as
+compressed video. Packing happens in the caller (a few µs); file and video
+writes happen on a background thread, so the main loop never waits on the
+SD card. If the writer falls behind, records/frames are dropped and counted.
+
+File layout (little-endian):
+
+    b"PTSL", u16 version, u32 header_len, header JSON
+    then per frame: u16 record_len, record (see RECORD / read_session())
+
+The header holds the tracker mode, frame size, stage names, video file
+name and a snapshot of config.py, so perf.replay can rebuild the run.
+"""
+
+import json
+import math
+import os
+import queue
+import struct
+import threading
+import time
+
+import config
+from perf.profiler import PROFILER
+
+MAGIC = b"PTSL"
+VERSION = 1
+STAGES = ("capture", "track", "predict", "distance", "servo", "overlay", "display", "loop")
+
+# frame, t, latency_s, loop_ms, flags, bbox(4), center(2), error(2),
+# target_id, confidence, distance_cm, pan_us, tilt_us
+RECORD = struct.Struct("<IdffB4h2h2hiff2H")
+STAGE_TIMES = struct.Struct(f"<{len(STAGES)}f")
+LENGTH = struct.Struct("<H")
+HEADER = struct.Struct("<4sHI")
+DET = struct.Struct("<4h")
+MAX_DETECTIONS = 32
+
+FLAG_FOUND = 1
+FLAG_COASTING = 2
+FLAG_SKIPPED = 4
+FLAG_VIDEO = 8
+
+_NAN = float("nan")
+
+
+def _i16(v):
+    return max(-32768, min(32767, int(v)))
+
+
+def _config_snapshot():
+    # Everything in config.py that survives JSON (numpy arrays are left out)
+    snap = {}
+    for name in dir(config):
+        if not name.isupper():
+            continue
+        value = getattr(config, name)
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        snap[name] = value
+    return snap
+
+
+def pack_record(index, t, result, pan_us=0, tilt_us=0, loop_s=0.0, stage_times=None, video=False):
+    bbox = result.get("bbox") if result.get("found") else None
+    bbox = bbox if isinstance(bbox, (tuple, list)) and len(bbox) == 4 else (0, 0, 0, 0)
+    center = result.get("center") or (0, 0)
+    error = result.get("error") or (0, 0)
+    target_id = result.get("target_id")
+    confidence = result.get("confidence")
+    distance = result.get("distance_cm")
+
+    flags = 0
+    if result.get("found"):
+        flags |= FLAG_FOUND
+    if result.get("coasting"):
+        flags |= FLAG_COASTING
+    if result.get("skipped"):
+        flags |= FLAG_SKIPPED
+    if video:
+        flags |= FLAG_VIDEO
+
+    fixed = RECORD.pack(
+        index, t, float(result.get("latency_s", 0.0)), loop_s * 1000.0, flags,
+        *(_i16(v) for v in bbox), *(_i16(v) for v in center), *(_i16(v) for v in error),
+        -1 if target_id is None else int(target_id),
+        _NAN if confidence is None else float(confidence),
+        _NAN if distance is None else float(distance),
+        int(pan_us), int(tilt_us),
+    )
+    stage_times = stage_times or {}
+    stages = STAGE_TIMES.pack(*(stage_times[s] * 1000.0 if s in stage_times else _NAN for s in STAGES))
+
+    dets = result.get("detections") or []
+    dets = dets[:MAX_DETECTIONS]
+    body = b"".join([fixed, stages, bytes([len(dets)])] + [DET.pack(*(_i16(v) for v in d)) for d in dets])
+    return LENGTH.pack(len(body)) + body
+
+
+def unpack_record(body):
+    (index, t, latency_s, loop_ms, flags, bx, by, bw, bh, cx, cy, ex, ey,
+     target_id, confidence, distance, pan_us, tilt_us) = RECORD.unpack_from(body, 0)
+    off = RECORD.size
+    stage_ms = STAGE_TIMES.unpack_from(body, off)
+    off += STAGE_TIMES.size
+    n = body[off]
+    off += 1
+    dets = [DET.unpack_from(body, off + i * DET.size) for i in range(n)]
+
+    found = bool(flags & FLAG_FOUND)
+    return {
+        "frame": index,
+        "t": t,
+        "latency_s": latency_s,
+        "loop_ms": loop_ms,
+        "found": found,
+        "coasting": bool(flags & FLAG_COASTING),
+        "skipped": bool(flags & FLAG_SKIPPED),
+        "video": bool(flags & FLAG_VIDEO),
+        "bbox": (bx, by, bw, bh) if found else None,
+        "center": (cx, cy) if found else None,
+        "error": (ex, ey),
+        "target_id": None if target_id < 0 else target_id,
+        "confidence": None if math.isnan(confidence) else confidence,
+        "distance_cm": None if math.isnan(distance) else distance,
+        "pan_us": pan_us,
+        "tilt_us": tilt_us,
+        "stages_ms": {s: v for s, v in zip(STAGES, stage_ms) if not math.isnan(v)},
+        "detections": dets,
+    }
+
+
+def read_session(path):
+    """Returns (header, iterator of record dicts)."""
+    f = open(path, "rb")
+    magic, version, header_len = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        f.close()
+        raise ValueError(f"{path} is not a session log")
+    if version != VERSION:
+        f.close()
+        raise ValueError(f"{path}: unsupported session log version {version}")
+    header = json.loads(f.read(header_len).decode())
+
+    def records():
+        with f:
+            while True:
+                raw = f.read(LENGTH.size)
+                if len(raw) < LENGTH.size:
+                    return
+                (n,) = LENGTH.unpack(raw)
+                body = f.read(n)
+                if len(body) < n:
+                    return  # truncated by a power cut: keep what is complete
+                yield unpack_record(body)
+
+    return header, records()
+
+
+class SessionRecorder:
+    def __init__(self, path, mode=None, video=None, queue_size=256):
+        self.path = path
+        self.video = bool(video if video is not None else getattr(config, "SESSION_VIDEO", False))
+        self.fourcc = getattr(config, "SESSION_VIDEO_FOURCC", "MJPG")
+        self.video_fps = float(getattr(config, "SESSION_VIDEO_FPS", 15))
+        self.video_path = os.path.splitext(path)[0] + ".avi" if self.video else None
+        self.max_queued_frames = int(getattr(config, "SESSION_VIDEO_QUEUE", 8))
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "wb")
+        header = json.dumps({
+            "version": VERSION,
+            "mode": mode or config.TRACK_MODE,
+            "frame_size": list(config.PREVIEW_SIZE),
+            "stages": list(STAGES),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "video": os.path.basename(self.video_path) if self.video else None,
+            "config": _config_snapshot(),
+        }).encode()
+        self._file.write(HEADER.pack(MAGIC, VERSION, len(header)) + header)
+
+        self._writer = None  # cv.VideoWriter, opened on the first frame
+        self._t0 = time.monotonic()
+        self._index = 0
+        self._pending_frame = None
+        self._queued_frames = 0  # frames handed to the writer thread, not yet encoded
+        self._frames_lock = threading.Lock()
+        self.records = 0
+        self.frames = 0
+        self.dropped_records = 0
+        self.dropped_frames = 0
+
+        # Stage timings for every record, whether or not PROFILE is on
+        PROFILER.keep_current = True
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._write_loop, name="session-log", daemon=True)
+        self._thread.start()
+
+    def add_frame(self, frame_bgr):
+        """Queues a copy of the (overlay-free) frame for the video; call before record()."""
+        if not self.video:
+            return False
+        if self._queued_frames >= self.max_queued_frames:
+            # Encoder is behind: skip this frame rather than stall the loop
+            self.dropped_frames += 1
+            return False
+        # Copy: the camera reuses its buffers
+        self._pending_frame = frame_bgr.copy()
+        return True
+
+    def record(self, result, controller=None, loop_s=0.0):
+        pan_us = controller.pan.us if controller is not None else 0
+        tilt_us = controller.tilt.us if controller is not None else 0
+        frame, self._pending_frame = self._pending_frame, None
+        data = pack_record(
+            self._index, time.monotonic() - self._t0, result, pan_us, tilt_us,
+            loop_s, PROFILER.current, frame is not None,
+        )
+        self._index += 1
+        # Record and its frame travel together, so the video never gets out of step
+        try:
+            self._queue.put_nowait((data, frame))
+        except queue.Full:
+            self.dropped_records += 1
+            if frame is not None:
+                self.dropped_frames += 1
+            return
+        if frame is not None:
+            with self._frames_lock:
+                self._queued_frames += 1
+
+    def _write_frame(self, frame):
+        if self._writer is None:
+            import cv2 as cv
+            h, w = frame.shape[:2]
+            self._writer = cv.VideoWriter(self.video_path, cv.VideoWriter_fourcc(*self.fourcc), self.video_fps, (w, h))
+        self._writer.write(frame)
+        self.frames += 1
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            data, frame = item
+            self._file.write(data)
+            self.records += 1
+            if frame is not None:
+                self._write_frame(frame)
+                with self._frames_lock:
+                    self._queued_frames -= 1
+            if self._queue.empty():
+                # Caught up: push to disk so a power cut loses little
+                self._file.flush()
+
+    def stats(self):
+        return {
+            "records": self.records,
+            "frames": self.frames,
+            "dropped_records": self.dropped_records,
+            "dropped_frames": self.dropped_frames,
+        }
+
+    def close(self):
+        PROFILER.keep_current = False
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+        self._file.close()
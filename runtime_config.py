@@ -0,0 +1,386 @@
+# runtime_config.py
+"""
+Live tuning: change config values while the tracker runs.
+
+Two ways in, both checked against RELOADABLE before anything is used:
+
+- Edit config.py and save. A background thread polls its mtime every
+  RUNTIME_CONFIG_POLL_S, re-runs the file and picks up the values that
+  changed since the last read. Values outside RELOADABLE are reported as
+  needing a restart; a file that doesn't run (half-saved, typo) is skipped.
+- With RUNTIME_CONFIG_SOCKET set, send one command per line over that Unix
+  socket (or use the client below):
+
+      python -m runtime_config set SERVO_KP_PAN 1.1
+      python -m runtime_config set ACTIVE_COLORS '["cb132b_red"]'
+      python -m runtime_config get MIN_AREA
+      python -m runtime_config list
+
+Accepted changes wait in one pending batch. The main loop calls
+take_pending() between frames, which writes the whole batch into config at
+once and returns the names, and then each component's reconfigure(names)
+rebuilds only what depends on them. A frame never sees half a change.
+"""
+
+import ast
+import os
+import runpy
+import socket
+import socketserver
+import sys
+import threading
+
+import numpy as np
+import config
+
+
+# ----------------------------
+# Validation
+# ----------------------------
+def _number(lo=None, hi=None, integer=False, low_open=False, optional=False):
+    def check(v):
+        if v is None and optional:
+            return None
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            raise ValueError("expected a number")
+        if integer:
+            if v != int(v):
+                raise ValueError("expected a whole number")
+            v = int(v)
+        if lo is not None and (v <= lo if low_open else v < lo):
+            raise ValueError(f"must be {'>' if low_open else '>='} {lo}")
+        if hi is not None and v > hi:
+            raise ValueError(f"must be <= {hi}")
+        return v
+    return check
+
+
+def _flag(v):
+    if not isinstance(v, bool):
+        raise ValueError("expected True or False")
+    return v
+
+
+def _choice(*options):
+    def check(v):
+        if v not in options:
+            raise ValueError(f"expected one of {', '.join(map(repr, options))}")
+        return v
+    return check
+
+
+def _optional_str(v):
+    if v is not None and not isinstance(v, str):
+        raise ValueError("expected a string or None")
+    return v
+
+
+def _kernel(v):
+    if not isinstance(v, (tuple, list)) or len(v) != 2:
+        raise ValueError("expected (width, height)")
+    return tuple(_number(1, 99, integer=True)(k) for k in v)
+
+
+def _colour_names(v):
+    if not isinstance(v, (tuple, list)) or not v or not all(isinstance(c, str) for c in v):
+        raise ValueError("expected a non-empty list of colour names")
+    return list(v)
+
+
+def _colour_ranges(v):
+    if not isinstance(v, dict):
+        raise ValueError("expected {name: [(lower, upper), ...]}")
+    out = {}
+    for name, ranges in v.items():
+        checked = []
+        for pair in ranges:
+            if len(pair) != 2:
+                raise ValueError(f"{name}: each range is (lower, upper)")
+            lower, upper = (np.asarray(b, dtype=np.int64).reshape(-1) for b in pair)
+            if lower.size != 3 or upper.size != 3:
+                raise ValueError(f"{name}: bounds are [H, S, V]")
+            if (lower < 0).any() or (upper > 255).any() or lower[0] > 179 or upper[0] > 179:
+                raise ValueError(f"{name}: H is 0-179, S and V 0-255")
+            if (lower > upper).any():
+                raise ValueError(f"{name}: lower bound above upper bound")
+            checked.append((lower.astype(np.uint8), upper.astype(np.uint8)))
+        out[name] = checked
+    return out
+
+
+_alpha = _number(0, 1, low_open=True)
+_gain = _number(0)
+
+# Everything that can change without a restart, and how it is checked
+RELOADABLE = {
+    # Every tracker layer and the motion predictor (reconfigure_tracker,
+    # MotionPredictor.reconfigure)
+    "DEADBAND_PX": _number(0),
+    # Colour tracking (ColourTracker.reconfigure)
+    "COLOR_RANGES": _colour_ranges,
+    "ACTIVE_COLORS": _colour_names,
+    "MIN_AREA": _number(0),
+    "BLOB_CENTROID": _choice("weighted", "mean", "bbox"),
+    "BLOB_MAX": _number(1, integer=True),
+    "MASK_KERNEL": _kernel,
+    "OPEN_ITERS": _number(0, 5, integer=True),
+    "CLOSE_ITERS": _number(0, 5, integer=True),
+    "CENTER_SMOOTH_ALPHA": _alpha,
+    "ERROR_SMOOTH_ALPHA": _alpha,
+    # Servo control (PanTiltController.reconfigure)
+    "SERVO_KP_PAN": _gain,
+    "SERVO_KI_PAN": _gain,
+    "SERVO_KD_PAN": _gain,
+    "SERVO_KFF_PAN": _gain,
+    "SERVO_KP_TILT": _gain,
+    "SERVO_KI_TILT": _gain,
+    "SERVO_KD_TILT": _gain,
+    "SERVO_KFF_TILT": _gain,
+    "SERVO_I_LIMIT": _number(0),
+    "SERVO_I_ZONE_PX": _number(0),
+    "SERVO_D_ALPHA": _alpha,
+    "SERVO_MAX_SPEED_US_S": _number(0, low_open=True),
+    "SERVO_MAX_ACCEL_US_S2": _number(0, low_open=True),
+    "SERVO_RATE_HZ": _number(1, 500),
+    "SERVO_HOLD_S": _number(0, low_open=True),
+    "SERVO_UPDATE_S": _number(0, 1),
+    "PAN_INVERT": _flag,
+    "TILT_INVERT": _flag,
+    # Distance (DistanceEstimator.reconfigure)
+    "KNOWN_TARGET_WIDTH_CM": _number(0, low_open=True),
+    "KNOWN_TARGET_HEIGHT_CM": _number(0, low_open=True, optional=True),
+    "FOCAL_LENGTH_PX": _number(0, low_open=True, optional=True),
+    "CALIB_DISTANCE_CM": _number(0, low_open=True),
+    "DIST_SMOOTH_ALPHA": _alpha,
+    "DIST_OUTLIER_RATIO": _number(1),
+    "DIST_MAX_JUMP": _number(0, low_open=True),
+    "DIST_MAX_REJECTS": _number(1, integer=True),
+    "DIST_CLASS": _optional_str,
+}
+
+
+def _plain(v):
+    # Comparable form: numpy arrays (colour bounds) become lists
+    if isinstance(v, np.ndarray):
+        return v.tolist()
+    if isinstance(v, dict):
+        return {k: _plain(x) for k, x in v.items()}
+    if isinstance(v, (tuple, list)):
+        return [_plain(x) for x in v]
+    return v
+
+
+def validate(changes, current=None):
+    """
+    Checks {name: value}; returns (accepted, errors). Cross-checks against
+    current (default: config) so e.g. ACTIVE_COLORS must name known colours.
+    """
+    accepted, errors = {}, {}
+    for name, value in changes.items():
+        check = RELOADABLE.get(name)
+        if check is None:
+            errors[name] = "not reloadable (restart to change it)"
+            continue
+        try:
+            accepted[name] = check(value)
+        except (TypeError, ValueError) as e:
+            errors[name] = str(e)
+
+    def value_of(name):
+        if name in accepted:
+            return accepted[name]
+        if current is not None and name in current:
+            return current[name]
+        return getattr(config, name, None)
+
+    if "ACTIVE_COLORS" in accepted or "COLOR_RANGES" in accepted:
+        ranges = value_of("COLOR_RANGES") or {}
+        missing = [c for c in value_of("ACTIVE_COLORS") or [] if c not in ranges]
+        if missing:
+            name = "ACTIVE_COLORS" if "ACTIVE_COLORS" in accepted else "COLOR_RANGES"
+            accepted.pop(name)
+            errors[name] = f"no COLOR_RANGES for {', '.join(missing)}"
+    return accepted, errors
+
+
+# ----------------------------
+# Service
+# ----------------------------
+class RuntimeConfig:
+    def __init__(self, path=None, socket_path=None, poll_s=None, watch=None):
+        watch = getattr(config, "RUNTIME_CONFIG", True) if watch is None else watch
+        self.path = (path or config.__file__) if watch else None
+        self.socket_path = socket_path or getattr(config, "RUNTIME_CONFIG_SOCKET", None)
+        self.poll_s = float(poll_s or getattr(config, "RUNTIME_CONFIG_POLL_S", 1.0))
+
+        self._lock = threading.Lock()
+        self._pending = {}        # validated, not yet applied
+        self._file_values = None  # config.py as last read, to see what an edit changed
+        self._stamp = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._server = None
+        self.applied = 0
+        self.rejected = 0
+
+    def start(self):
+        if self.path is not None:
+            self._stamp = self._file_stamp()
+            self._file_values = self._read_file()
+            t = threading.Thread(target=self._watch_loop, name="config-watch", daemon=True)
+            t.start()
+            self._threads.append(t)
+        if self.socket_path:
+            self._start_socket()
+        return self
+
+    # Producer side (watcher / socket threads)
+    def submit(self, changes, source="socket"):
+        """Validates and queues changes; returns {name: error} for the rejected ones."""
+        with self._lock:
+            accepted, errors = validate(changes, current=self._pending)
+            self._pending.update(accepted)
+        self.rejected += len(errors)
+        for name, err in errors.items():
+            print(f"[config] {source}: {name} rejected: {err}")
+        return errors
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _read_file(self):
+        try:
+            ns = runpy.run_path(self.path)
+        except Exception as e:
+            print(f"[config] {os.path.basename(self.path)} not applied: {type(e).__name__}: {e}")
+            return None
+        return {k: v for k, v in ns.items() if k.isupper()}
+
+    def reload(self):
+        """Re-reads the config file and queues whatever changed since the last read."""
+        values = self._read_file()
+        if values is None:
+            return {}
+        # The watcher thread and a socket "reload" can both get here
+        with self._lock:
+            previous = self._file_values or {}
+            self._file_values = values
+            changed = {k: v for k, v in values.items()
+                       if k not in previous or _plain(previous[k]) != _plain(v)}
+        restart = sorted(k for k in changed if k not in RELOADABLE)
+        if restart:
+            print(f"[config] restart needed for: {', '.join(restart)}")
+        reloadable = {k: v for k, v in changed.items() if k in RELOADABLE}
+        if not reloadable:
+            return {}
+        return self.submit(reloadable, source=os.path.basename(self.path))
+
+    def _watch_loop(self):
+        while not self._stop.wait(self.poll_s):
+            stamp = self._file_stamp()
+            if stamp is not None and stamp != self._stamp:
+                self._stamp = stamp
+                self.reload()
+
+    # Consumer side (main loop, between frames)
+    def take_pending(self):
+        """Writes the pending batch into config; returns the set of names changed (empty if none)."""
+        with self._lock:
+            if not self._pending:
+                return set()
+            batch, self._pending = self._pending, {}
+        for name, value in batch.items():
+            setattr(config, name, value)
+        self.applied += len(batch)
+        print(f"[config] applied: {', '.join(sorted(batch))}")
+        return set(batch)
+
+    # Socket commands
+    def handle_command(self, line):
+        parts = line.strip().split(None, 2)
+        if not parts:
+            return "error: empty command"
+        cmd = parts[0].lower()
+        if cmd == "list":
+            return " ".join(sorted(RELOADABLE))
+        if cmd == "reload":
+            if self.path is None:
+                return "error: not watching a config file"
+            errors = self.reload()
+            return "ok" if not errors else "error: " + "; ".join(f"{k}: {v}" for k, v in errors.items())
+        if cmd == "get" and len(parts) == 2:
+            name = parts[1]
+            with self._lock:
+                value = self._pending.get(name, getattr(config, name, None))
+            return repr(_plain(value))
+        if cmd == "set" and len(parts) == 3:
+            name, text = parts[1], parts[2]
+            try:
+                value = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                value = text  # bare word, e.g. set BLOB_CENTROID bbox
+            errors = self.submit({name: value})
+            return "ok" if not errors else f"error: {errors[name]}"
+        return "error: expected list | reload | get NAME | set NAME VALUE"
+
+    def _start_socket(self):
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    reply = service.handle_command(raw.decode(errors="replace"))
+                    self.wfile.write((reply + "\n").encode())
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # left over from a crashed run
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        t = threading.Thread(target=self._server.serve_forever, name="config-socket", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def close(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        for t in self._threads:
+            t.join(timeout=1.0)
+        self._threads = []
+
+
+def main(argv=None):
+    # Minimal client for RUNTIME_CONFIG_SOCKET
+    argv = sys.argv[1:] if argv is None else argv
+    path = getattr(config, "RUNTIME_CONFIG_SOCKET", None)
+    if not argv:
+        print("usage: python -m runtime_config list | reload | get NAME | set NAME VALUE", file=sys.stderr)
+        return 2
+    if not path:
+        print("RUNTIME_CONFIG_SOCKET is not set", file=sys.stderr)
+        return 1
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(path)
+        except OSError as e:
+            print(f"could not connect to {path}: {e}", file=sys.stderr)
+            return 1
+        s.sendall((" ".join(argv) + "\n").encode())
+        s.shutdown(socket.SHUT_WR)
+        reply = s.makefile().read().strip()
+    print(reply)
+    return 0 if not reply.startswith("error") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+# servo/backends.py
+"""
+Servo output layer.
+
+ServoOutput sits between Servo and the hardware: it drops writes of a pulse
+width the pin already has and sends whatever changed in one batch per
+control tick. Backends (config.SERVO_BACKEND):
+
+    "pigpio"  pigpiod over its socket; a batch of 2+ pins goes out as one
+              stored-script call instead of one round trip per pin (per-pin
+              writes when the script call fails)
+    "lgpio"   lgpio software-timed servo pulses, no daemon
+    "sysfs"   kernel hardware PWM (/sys/class/pwm, needs dtoverlay=pwm-2chan)
+    "mock"    records pulse widths, touches no hardware
+"""
+
+import os
+import time
+
+import config
+
+_SCRIPT_INITING = 0  # pigpio.PI_SCRIPT_INITING
+_MAX_SCRIPT_FAILURES = 3  # failed script runs in a row before giving up on it
+_MAX_SCRIPT_PINS = 5  # pigpio scripts take 10 parameters
+
+
+class PigpioBackend:
+    def __init__(self, pi, pins=()):
+        self.pi = pi
+        self.round_trips = 0
+        self._script = None
+        self._script_failures = 0
+        self._script_pins = min(len(pins), _MAX_SCRIPT_PINS)
+        if self._script_pins > 1 and hasattr(pi, "store_script"):
+            self._script = self._store_script(self._script_pins)
+
+    @property
+    def connected(self):
+        return self.pi.connected
+
+    def _store_script(self, n):
+        # "servo p0 p1 servo p2 p3 ...": params are pin, width pairs
+        text = " ".join(f"servo p{2 * i} p{2 * i + 1}" for i in range(n))
+        try:
+            sid = self.pi.store_script(text.encode())
+            deadline = time.monotonic() + 1.0
+            while self.pi.script_status(sid)[0] == _SCRIPT_INITING:
+                if time.monotonic() > deadline:
+                    return None
+                time.sleep(0.005)
+            return sid
+        except Exception:
+            return None  # old pigpiod / scripts disabled: per-pin writes
+
+    def set_pulses(self, pulses):
+        items = list(pulses.items())
+        if self._script is not None and 1 < len(items) <= self._script_pins:
+            # Pad with repeats of the last pair; writing it twice is harmless
+            items += [items[-1]] * (self._script_pins - len(items))
+            params = [v for pin, us in items for v in (pin, us)]
+            self.round_trips += 1
+            if self._run_script(params):
+                self._script_failures = 0
+                return
+            # Still running from the last tick, or gone (pigpiod restarted):
+            # send this batch pin by pin, and stop trying if it keeps failing
+            self._script_failures += 1
+            if self._script_failures >= _MAX_SCRIPT_FAILURES:
+                self._script = None
+            items = list(pulses.items())
+        for pin, us in items:
+            self.pi.set_servo_pulsewidth(pin, us)
+            self.round_trips += 1
+
+    def _run_script(self, params):
+        # pigpio returns a negative status, or raises pigpio.error (pigpio.exceptions)
+        try:
+            return self.pi.run_script(self._script, params) >= 0
+        except Exception:
+            return False
+
+    def close(self):
+        if self._script is not None:
+            try:
+                self.pi.delete_script(self._script)
+            except Exception:
+                pass
+            self._script = None
+        self.pi.stop()
+
+
+class LgpioBackend:
+    def __init__(self, pins=(), chip=None):
+        try:
+            import lgpio
+        except ImportError as e:
+            raise RuntimeError("SERVO_BACKEND = 'lgpio' but lgpio is not installed") from e
+        self._lgpio = lgpio
+        self._handle = lgpio.gpiochip_open(int(chip if chip is not None else getattr(config, "SERVO_LGPIO_CHIP", 0)))
+        for pin in pins:
+            lgpio.gpio_claim_output(self._handle, pin)
+        self.connected = True
+        self.round_trips = 0
+
+    def set_pulses(self, pulses):
+        for pin, us in pulses.items():
+            # 0 stops the pulses, as with pigpio
+            self._lgpio.tx_servo(self._handle, pin, int(us), 50)
+            self.round_trips += 1
+
+    def close(self):
+        self._lgpio.gpiochip_close(self._handle)
+        self.connected = False
+
+
+class SysfsPwmBackend:
+    PERIOD_NS = 20_000_000  # 50 Hz
+
+    def __init__(self, channels=None, chip=None):
+        channels = channels or getattr(config, "SERVO_PWM_CHANNELS", {18: 0, 13: 1})
+        chip = chip if chip is not None else getattr(config, "SERVO_PWM_CHIP", 0)
+        base = f"/sys/class/pwm/pwmchip{chip}"
+        if not os.path.isdir(base):
+            raise RuntimeError(f"{base} not found (enable hardware PWM: dtoverlay=pwm-2chan)")
+
+        self._duty = {}
+        self._paths = []
+        for pin, ch in channels.items():
+            path = f"{base}/pwm{ch}"
+            if not os.path.isdir(path):
+                self._write(f"{base}/export", ch)
+                # udev needs a moment to set permissions on the new channel
+                deadline = time.monotonic() + 1.0
+                while not os.access(f"{path}/period", os.W_OK) and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            self._write(f"{path}/period", self.PERIOD_NS)
+            self._write(f"{path}/enable", 1)
+            # Keep the duty file open: one write() per update
+            self._duty[pin] = os.open(f"{path}/duty_cycle", os.O_WRONLY)
+            self._paths.append(path)
+        self.connected = True
+        self.round_trips = 0
+
+    @staticmethod
+    def _write(path, value):
+        with open(path, "w") as f:
+            f.write(str(value))
+
+    def set_pulses(self, pulses):
+        for pin, us in pulses.items():
+            os.pwrite(self._duty[pin], b"%d" % (int(us) * 1000), 0)
+            self.round_trips += 1
+
+    def close(self):
+        for fd in self._duty.values():
+            os.close(fd)
+        for path in self._paths:
+            try:
+                self._write(f"{path}/enable", 0)
+            except OSError:
+                pass
+        self._duty = {}
+        self.connected = False
+
+
+class MockBackend:
+    def __init__(self):
+        self.connected = True
+        self.pulses = {}
+        self.round_trips = 0
+
+    def set_pulses(self, pulses):
+        self.pulses.update(pulses)
+        self.round_trips += 1
+
+    def close(self):
+        self.connected = False
+
+
+def make_backend(name=None, pins=()):
+    name = (name or getattr(config, "SERVO_BACKEND", "pigpio")).lower()
+    if name == "pigpio":
+        try:
+            import pigpio
+        except ImportError as e:
+            raise RuntimeError("SERVO_BACKEND = 'pigpio' but pigpio is not installed") from e
+        pi = pigpio.pi()
+        if not pi.connected:
+            raise RuntimeError(
+                "pigpio daemon not running (start with: sudo systemctl start pigpiod)"
+            )
+        return PigpioBackend(pi, pins)
+    if name == "lgpio":
+        return LgpioBackend(pins)
+    if name == "sysfs":
+        return SysfsPwmBackend()
+    if name == "mock":
+        return MockBackend()
+    raise ValueError(f"Unknown SERVO_BACKEND: {name}")
+
+
+class ServoOutput:
+    """Change-only, batched pulse widths for a set of pins."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._sent = {}
+        self._pending = {}
+        self.writes = 0
+        self.skipped = 0
+        self.flushes = 0
+
+    @property
+    def round_trips(self):
+        return self.backend.round_trips
+
+    def set(self, pin, us):
+        if self._sent.get(pin) == us:
+            # Back to what the pin already has: nothing to send
+            self._pending.pop(pin, None)
+            self.skipped += 1
+            return
+        self._pending[pin] = us
+
+    def flush(self):
+        if not self._pending:
+            return
+        self.backend.set_pulses(self._pending)
+        self._sent.update(self._pending)
+        self.writes += len(self._pending)
+        self.flushes += 1
+        self._pending = {}
+
+    def stop(self, pin):
+        # 0 disables servo pulses
+        self._pending.pop(pin, None)
+        self.backend.set_pulses({pin: 0})
+        self._sent[pin] = 0
+
+    def close(self):
+        self.backend.close()
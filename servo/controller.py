@@ -1,107 +1,292 @@
 # servo/controller.py
+import threading
 import time
-import pigpio
+from collections import deque
+
 import config
+from servo.backends import PigpioBackend, ServoOutput, make_backend
+from servo.pid import PidAxis, MotionProfile, clamp
 from servo.servos import Servo
 
 
-def clamp(v, vmin, vmax):
-    return max(vmin, min(vmax, v))
+def _pid_from_config(axis):
+    return PidAxis(
+        kp=getattr(config, f"SERVO_KP_{axis}", 0.9),
+        ki=getattr(config, f"SERVO_KI_{axis}", 0.0),
+        kd=getattr(config, f"SERVO_KD_{axis}", 0.0),
+        kff=getattr(config, f"SERVO_KFF_{axis}", 0.0),
+        i_limit=getattr(config, "SERVO_I_LIMIT", 100.0),
+        i_zone=getattr(config, "SERVO_I_ZONE_PX", 40.0),
+        d_alpha=getattr(config, "SERVO_D_ALPHA", 0.5),
+    )
 
 
 class PanTiltController:
     """
-    Mid-level control: error -> servo pulse width updates (pigpio).
+    Mid-level control: error -> servo pulse width updates (servo.backends).
 
-    Changes vs your version:
-    - Adds a "slow zone" so it moves fast when far away, but slows down near center
-      to prevent overshoot/oscillation.
+    - Each measurement goes through a per-axis PID with velocity feedforward
+      (servo.pid.PidAxis). The correction is applied to where the servo was
+      when the frame was captured, so pipeline latency doesn't cause overshoot.
+    - A slew/acceleration-limited profile (servo.pid.MotionProfile) moves the
+      servos toward that setpoint on every control tick.
+    - Both axes are written once per tick, in one batch, and only when a
+      pulse width actually changed (servo.backends.ServoOutput).
     - Keeps the same public API: update(error_x, error_y), close()
+    - With SERVO_THREADED, update() only drops the error into a single-slot
+      mailbox and wakes the control thread, which ticks at SERVO_RATE_HZ while
+      the servos are moving and sleeps until the next measurement once settled.
+
+    A pigpio-like pi (servo.sim.FakePi), a backend and the clock can be
+    injected to run offline.
     """
 
-    def __init__(self):
-        self.pi = pigpio.pi()
-        if not self.pi.connected:
-            raise RuntimeError(
-                "pigpio daemon not running (start with: sudo systemctl start pigpiod)"
-            )
+    def __init__(self, threaded=None, pi=None, clock=None, backend=None):
+        self.clock = clock or time.monotonic
+        pins = (config.PAN_PIN, config.TILT_PIN)
+        if backend is None:
+            backend = PigpioBackend(pi, pins) if pi is not None else make_backend(pins=pins)
+        if not backend.connected:
+            raise RuntimeError("servo backend not connected")
+        self.output = ServoOutput(backend)
 
         self.pan = Servo(
-            pi=self.pi,
+            output=self.output,
             pin=config.PAN_PIN,
             us_min=config.PAN_US_MIN,
             us_max=config.PAN_US_MAX,
             us_center=config.PAN_US_CENTER,
+            autoflush=False,
         )
 
         self.tilt = Servo(
-            pi=self.pi,
+            output=self.output,
             pin=config.TILT_PIN,
             us_min=config.TILT_US_MIN,
             us_max=config.TILT_US_MAX,
             us_center=config.TILT_US_CENTER,
+            autoflush=False,
         )
+        self.output.flush()
+
+        # Control law
+        max_speed = float(getattr(config, "SERVO_MAX_SPEED_US_S", 2000.0))
+        max_accel = float(getattr(config, "SERVO_MAX_ACCEL_US_S2", 20000.0))
+        self.pan_pid = _pid_from_config("PAN")
+        self.tilt_pid = _pid_from_config("TILT")
+        self.pan_profile = MotionProfile(self.pan.us, max_speed, max_accel)
+        self.tilt_profile = MotionProfile(self.tilt.us, max_speed, max_accel)
+        # Error sign -> pulse direction (subtracting moves toward reducing error)
+        self._pan_dir = 1.0 if config.PAN_INVERT else -1.0
+        self._tilt_dir = 1.0 if config.TILT_INVERT else -1.0
+
+        self.period = 1.0 / float(getattr(config, "SERVO_RATE_HZ", 50))
+        self.hold_s = float(getattr(config, "SERVO_HOLD_S", 0.5))
 
+        # Commanded positions over the last second or so, to look up "at capture"
+        self._history = deque(maxlen=128)
         self._last_update = 0.0
-        self._pan_acc = 0.0
-        self._tilt_acc = 0.0
-
-
-    def _scaled_max_step(self, error_x: int, error_y: int) -> float:
-        mag = max(abs(error_x), abs(error_y))
-
-        # Start fast when far
-        scale = 1.2
-        if mag > 250:
-            scale = 1.6   # was 1.4
-        elif mag > 150:
-            scale = 1.2   # was 1.0
-        elif mag > 80:
-            scale = 0.7   # was 0.6
-        else:
-            scale = 0.40  # was 0.35
-        return max(4, config.SERVO_MAX_STEP_US * scale)
-
-    def update(self, error_x: int, error_y: int):
-        now = time.time()
-        if now - self._last_update < config.SERVO_UPDATE_S:
-            return
-        self._last_update = now
+        self._last_measurement = None  # stamp of the last measurement used
+        self._last_tick = None
+
+        # Live config changes (reconfigure), taken up by the thread that runs the control law
+        self._pending_config = None
+        self._config_lock = threading.Lock()
 
-        if error_x == 0 and error_y == 0:
+        # Control thread state
+        if threaded is None:
+            threaded = getattr(config, "SERVO_THREADED", False)
+        self.threaded = bool(threaded)
+        self._mailbox = None  # (error_x, error_y, velocity, latency_s, stamp); replaced whole
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self.ticks = 0
+        self.late_ticks = 0
+        self.idle_waits = 0
+
+        if self.threaded:
+            self._running = True
+            self._thread = threading.Thread(target=self._control_loop, name="servo", daemon=True)
+            self._thread.start()
+
+    # ----------------------------
+    # Live config
+    # ----------------------------
+    def reconfigure(self, changed=None):
+        """
+        Picks up new gains/limits from config (runtime_config). They are
+        handed over whole and applied at the start of the next control step,
+        on the thread that runs it, so a step never mixes old and new values.
+        """
+        cfg = {
+            "pan": _pid_from_config("PAN"),
+            "tilt": _pid_from_config("TILT"),
+            "max_speed": float(getattr(config, "SERVO_MAX_SPEED_US_S", 2000.0)),
+            "max_accel": float(getattr(config, "SERVO_MAX_ACCEL_US_S2", 20000.0)),
+            "pan_dir": 1.0 if config.PAN_INVERT else -1.0,
+            "tilt_dir": 1.0 if config.TILT_INVERT else -1.0,
+            "period": 1.0 / float(getattr(config, "SERVO_RATE_HZ", 50)),
+            "hold_s": float(getattr(config, "SERVO_HOLD_S", 0.5)),
+        }
+        with self._config_lock:
+            self._pending_config = cfg
+        self._wake.set()
+
+    def _apply_pending_config(self):
+        with self._config_lock:
+            cfg, self._pending_config = self._pending_config, None
+        if cfg is None:
             return
+        # Gains change, the loop's integral/derivative state carries on
+        for pid, new in ((self.pan_pid, cfg["pan"]), (self.tilt_pid, cfg["tilt"])):
+            pid.kp, pid.ki, pid.kd, pid.kff = new.kp, new.ki, new.kd, new.kff
+            pid.i_limit, pid.i_zone, pid.d_alpha = new.i_limit, new.i_zone, new.d_alpha
+        for profile in (self.pan_profile, self.tilt_profile):
+            profile.max_speed = cfg["max_speed"]
+            profile.max_accel = cfg["max_accel"]
+        if (cfg["pan_dir"], cfg["tilt_dir"]) != (self._pan_dir, self._tilt_dir):
+            # Direction flipped: the integral now pushes the wrong way
+            self.pan_pid.reset()
+            self.tilt_pid.reset()
+        self._pan_dir, self._tilt_dir = cfg["pan_dir"], cfg["tilt_dir"]
+        self.period = cfg["period"]
+        self.hold_s = cfg["hold_s"]
+
+    # ----------------------------
+    # Control law
+    # ----------------------------
+    def _position_at(self, t):
+        # Latest commanded position at or before t
+        for stamp, pan_us, tilt_us in reversed(self._history):
+            if stamp <= t:
+                return pan_us, tilt_us
+        return self.pan_profile.position, self.tilt_profile.position
+
+    def _on_measurement(self, msg):
+        if self._pending_config is not None:
+            self._apply_pending_config()
+        error_x, error_y, velocity, latency_s, stamp = msg
+
+        dt = 0.0
+        if self._last_measurement is not None:
+            dt = stamp - self._last_measurement
+            if dt > self.hold_s:
+                # Target was lost in between: start the loop afresh
+                self.pan_pid.reset()
+                self.tilt_pid.reset()
+                dt = 0.0
+        self._last_measurement = stamp
+
+        vx, vy = velocity or (0.0, 0.0)
+        pan_at, tilt_at = self._position_at(stamp - latency_s)
 
-        # Convert pixel error -> microsecond delta (proportional)
-        d_pan = config.SERVO_KP_PAN * error_x
-        d_tilt = config.SERVO_KP_TILT * error_y
+        c_pan, ff_pan = self.pan_pid.step(
+            error_x, dt, vx, saturated=self.pan.us in (self.pan.us_min, self.pan.us_max)
+        )
+        c_tilt, ff_tilt = self.tilt_pid.step(
+            error_y, dt, vy, saturated=self.tilt.us in (self.tilt.us_min, self.tilt.us_max)
+        )
+
+        self.pan_profile.set_target(
+            clamp(pan_at + self._pan_dir * c_pan, self.pan.us_min, self.pan.us_max),
+            self._pan_dir * ff_pan,
+        )
+        self.tilt_profile.set_target(
+            clamp(tilt_at + self._tilt_dir * c_tilt, self.tilt.us_min, self.tilt.us_max),
+            self._tilt_dir * ff_tilt,
+        )
+
+    def _drive(self, servo, profile, dt):
+        us = profile.tick(dt)
+        if not servo.us_min <= us <= servo.us_max:
+            # Hit a hard limit: stop there instead of winding up
+            profile.position = clamp(us, servo.us_min, servo.us_max)
+            profile.hold()
+        servo.set_us(int(round(profile.position)))
+
+    @property
+    def settled(self):
+        return self.pan_profile.settled and self.tilt_profile.settled
+
+    def tick(self, now=None):
+        """Advance the servos by one control step."""
+        if self._pending_config is not None:
+            self._apply_pending_config()
+        now = self.clock() if now is None else now
+        dt = self.period if self._last_tick is None else min(now - self._last_tick, 0.1)
+        self._last_tick = now
 
-        # Cap per update, with slow-zone scaling near center
-        max_step = self._scaled_max_step(error_x, error_y)
-        d_pan = clamp(d_pan, -max_step, max_step)
-        d_tilt = clamp(d_tilt, -max_step, max_step)
+        if self._last_measurement is not None and now - self._last_measurement > self.hold_s:
+            # Target not seen for a while: hold position
+            self.pan_profile.hold()
+            self.tilt_profile.hold()
+            self._last_measurement = None
 
-        # Direction flips
-        if config.PAN_INVERT:
-            d_pan = -d_pan
-        if config.TILT_INVERT:
-            d_tilt = -d_tilt
+        self._drive(self.pan, self.pan_profile, dt)
+        self._drive(self.tilt, self.tilt_profile, dt)
+        self.output.flush()
+        self._history.append((now, self.pan_profile.position, self.tilt_profile.position))
+        self.ticks += 1
+
+    def update(self, error_x: int, error_y: int, velocity=None, latency_s: float = 0.0):
+        """
+        error_x, error_y  pixel error of the target from the frame centre
+        velocity          optional target velocity in the image (px/s), for feedforward
+        latency_s         capture -> now delay of the frame the error came from
+        """
+        now = self.clock()
+        msg = (error_x, error_y, velocity, latency_s, now)
+
+        if self.threaded:
+            # Single-slot mailbox: the control thread only ever sees the latest error
+            self._mailbox = msg
+            self._wake.set()
+            return
+
+        if now - self._last_update < config.SERVO_UPDATE_S:
+            return
+        self._last_update = now
 
-        # Apply: subtracting generally moves toward reducing error
-        # Accumulate fractional deltas so tiny movements still happen
-        self._pan_acc += d_pan
-        self._tilt_acc += d_tilt
+        self._on_measurement(msg)
+        self.tick(now)
 
-        step_pan = int(round(self._pan_acc))
-        step_tilt = int(round(self._tilt_acc))
+    def _control_loop(self):
+        seen = None  # stamp of the last consumed measurement
+        next_tick = self.clock()
+        while self._running:
+            msg = self._mailbox
+            if msg is not None and msg[4] != seen:
+                seen = msg[4]
+                self._on_measurement(msg)
 
-        self._pan_acc -= step_pan
-        self._tilt_acc -= step_tilt
+            self.tick()
 
-        self.pan.set_us(self.pan.us - step_pan)
-        self.tilt.set_us(self.tilt.us - step_tilt)
+            if self.settled:
+                # Nothing to do until the next measurement
+                self.idle_waits += 1
+                self._wake.wait()
+                self._wake.clear()
+                next_tick = self.clock()
+                continue
 
+            # Fixed-rate schedule while moving; a new measurement wakes us early
+            next_tick += self.period
+            delay = next_tick - self.clock()
+            if delay > 0:
+                if self._wake.wait(delay):
+                    next_tick = self.clock()
+            else:
+                self.late_ticks += 1
+                next_tick = self.clock()
+            self._wake.clear()
 
     def close(self):
+        if self._thread is not None:
+            self._running = False
+            self._wake.set()
+            self._thread.join(timeout=1.0)
+            self._thread = None
         self.pan.stop()
         self.tilt.stop()
-        self.pi.stop()
\ No newline at end of file
+        self.output.close()
@@ -0,0 +1,112 @@
+# servo/pid.py
+"""
+Per-axis servo control law.
+
+PidAxis turns a pixel error into a pulse-width correction (µs): PID on the
+error plus velocity feedforward from the tracked target. MotionProfile then
+moves the commanded pulse width toward the resulting setpoint under a
+slew-rate (µs/s) and acceleration (µs/s^2) limit, one control tick at a time.
+
+Pure Python, no pigpio, so the same code runs in servo.sim.
+"""
+
+import math
+
+
+def clamp(v, vmin, vmax):
+    return max(vmin, min(vmax, v))
+
+
+class PidAxis:
+    """
+    error (px) -> setpoint correction (µs) around the servo position at capture.
+
+    kp   µs per px of error (about the camera's µs/px moves onto the target in one go)
+    ki   µs per px*s, removes the lag on a steadily moving target; only
+         integrates within i_zone px of centre so big jumps don't wind it up
+    kd   µs per px/s, damps fast error changes (low-passed with d_alpha)
+    kff  µs/s per px/s of target velocity
+    """
+
+    def __init__(self, kp, ki=0.0, kd=0.0, kff=0.0, i_limit=100.0, i_zone=40.0, d_alpha=0.5):
+        self.kp = float(kp)
+        self.ki = float(ki)
+        self.kd = float(kd)
+        self.kff = float(kff)
+        self.i_limit = float(i_limit)  # px*s
+        self.i_zone = float(i_zone)    # px
+        self.d_alpha = float(d_alpha)
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self._prev_error = None
+        self._d = 0.0
+
+    def step(self, error, dt, target_velocity=0.0, saturated=False):
+        """
+        error            latest pixel error
+        dt               seconds since the previous measurement (0 = first one)
+        target_velocity  target velocity in the image (px/s)
+        saturated        servo at a limit: freeze the integral (anti-windup)
+
+        Returns (correction_us, feedforward_us_per_s).
+        """
+        if dt > 0 and self._prev_error is not None:
+            if not saturated and abs(error) <= self.i_zone:
+                self.integral = clamp(self.integral + error * dt, -self.i_limit, self.i_limit)
+            raw_d = (error - self._prev_error) / dt
+            self._d += self.d_alpha * (raw_d - self._d)
+        self._prev_error = error
+
+        correction = self.kp * error + self.ki * self.integral + self.kd * self._d
+        return correction, self.kff * target_velocity
+
+
+class MotionProfile:
+    """Slew- and acceleration-limited path from the commanded position to a setpoint."""
+
+    def __init__(self, position, max_speed, max_accel):
+        self.position = float(position)
+        self.velocity = 0.0
+        self.target = float(position)
+        self.ff_velocity = 0.0
+        self.max_speed = float(max_speed)  # µs/s
+        self.max_accel = float(max_accel)  # µs/s^2
+
+    def set_target(self, target, ff_velocity=0.0):
+        self.target = float(target)
+        self.ff_velocity = float(ff_velocity)
+
+    def hold(self):
+        # Stop where we are
+        self.target = self.position
+        self.velocity = 0.0
+        self.ff_velocity = 0.0
+
+    @property
+    def settled(self):
+        return (
+            self.ff_velocity == 0.0
+            and abs(self.velocity) < 1.0
+            and abs(self.target - self.position) < 0.5
+        )
+
+    def tick(self, dt):
+        if dt <= 0:
+            return self.position
+
+        # The setpoint keeps moving with the target between measurements
+        self.target += self.ff_velocity * dt
+        err = self.target - self.position
+
+        # Fastest approach that can still stop at the target (v^2 = 2 a d),
+        # and no faster than closing the gap this tick
+        approach = min(math.sqrt(2.0 * self.max_accel * abs(err)), abs(err) / dt)
+        desired = self.ff_velocity + math.copysign(approach, err)
+        desired = clamp(desired, -self.max_speed, self.max_speed)
+
+        dv = clamp(desired - self.velocity, -self.max_accel * dt, self.max_accel * dt)
+        self.velocity += dv
+        self.position += self.velocity * dt
+        return self.position
@@ -1,29 +1,32 @@
 # servo/servos.py
-import pigpio
-
 def clamp(v, vmin, vmax):
     return max(vmin, min(vmax, v))
 
 class Servo:
     """
-    Low-level pigpio servo driver.
+    Low-level servo driver.
     Uses pulse width in microseconds (µs).
+    output is a servo.backends.ServoOutput; with autoflush=False the caller
+    flushes it once per tick so several servos go out in one batch.
     """
 
-    def __init__(self, pi: pigpio.pi, pin: int, us_min: int, us_max: int, us_center: int):
-        self.pi = pi
+    def __init__(self, output, pin: int, us_min: int, us_max: int, us_center: int, autoflush: bool = True):
+        self.output = output
         self.pin = pin
         self.us_min = int(us_min)
         self.us_max = int(us_max)
         self.us = int(us_center)
+        self.autoflush = autoflush
 
         # Start at center
         self.set_us(self.us)
 
     def set_us(self, us: int):
+        # Unchanged widths are dropped by the output layer
         self.us = int(clamp(us, self.us_min, self.us_max))
-        self.pi.set_servo_pulsewidth(self.pin, self.us)
+        self.output.set(self.pin, self.us)
+        if self.autoflush:
+            self.output.flush()
 
     def stop(self):
-        # 0 disables servo pulses
-        self.pi.set_servo_pulsewidth(self.pin, 0)
+        self.output.stop(self.pin)
@@ -0,0 +1,269 @@
+# servo/sim.py
+"""
+Offline pan/tilt simulator: the real PanTiltController driving a modelled
+mount through a fake pigpio, in virtual time.
+
+    python -m servo.sim --scenario step ramp sine
+    python -m servo.sim --fps 15 --latency 0.1 --kp 0.8 --kd 0.03
+
+The plant is two hobby servos (slew-limited, first-order lag) carrying a
+camera; the "vision" samples the target's pixel error at --fps, adds noise
+and delivers it --latency seconds later, like the real pipeline. Reports
+settling time, overshoot, tracking error and controller CPU cost.
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+from collections import deque
+
+import config
+from servo.controller import PanTiltController
+
+FRAME_SIZE = (640, 480)
+FOV_DEG = (62.2, 48.8)      # Pi camera v2
+DEG_PER_US = 180.0 / 2000.0  # typical hobby servo
+SERVO_SPEED_DEG_S = 400.0    # ~0.15 s / 60 deg
+SERVO_TAU_S = 0.02
+
+
+class SimClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+class FakePi:
+    """
+    Stands in for pigpio.pi(): remembers pulse widths instead of driving GPIO.
+    Supports the stored "servo pX pY ..." scripts servo.backends batches with;
+    round_trips counts what would have been socket calls to pigpiod.
+    """
+
+    def __init__(self):
+        self.connected = True
+        self.pulses = {}
+        self.round_trips = 0
+        self._scripts = {}
+
+    def set_servo_pulsewidth(self, pin, us):
+        self.pulses[pin] = us
+        self.round_trips += 1
+
+    def store_script(self, text):
+        sid = len(self._scripts)
+        self._scripts[sid] = text
+        self.round_trips += 1
+        return sid
+
+    def script_status(self, sid):
+        return 1, []  # PI_SCRIPT_HALTED
+
+    def run_script(self, sid, params):
+        for pin, us in zip(params[0::2], params[1::2]):
+            self.pulses[pin] = us
+        self.round_trips += 1
+        return 0
+
+    def delete_script(self, sid):
+        self._scripts.pop(sid, None)
+
+    def get_servo_pulsewidth(self, pin):
+        return self.pulses.get(pin, 0)
+
+    def stop(self):
+        self.connected = False
+
+
+class ServoModel:
+    """Pulse width -> camera angle (deg), with slew limit and lag."""
+
+    def __init__(self, center_us, invert):
+        self.center_us = center_us
+        # Matches PanTiltController's sign convention for INVERT
+        self.sign = 1.0 if invert else -1.0
+        self.angle = 0.0
+
+    def step(self, dt, pulse_us):
+        if not pulse_us:
+            return self.angle  # pulses off: servo stays put
+        goal = self.sign * (pulse_us - self.center_us) * DEG_PER_US
+        rate = (goal - self.angle) / max(SERVO_TAU_S, dt)
+        rate = max(-SERVO_SPEED_DEG_S, min(SERVO_SPEED_DEG_S, rate))
+        self.angle += rate * dt
+        return self.angle
+
+
+class PanTiltPlant:
+    def __init__(self, pi):
+        self.pi = pi
+        self.pan = ServoModel(config.PAN_US_CENTER, config.PAN_INVERT)
+        self.tilt = ServoModel(config.TILT_US_CENTER, config.TILT_INVERT)
+        self.px_per_deg = (FRAME_SIZE[0] / FOV_DEG[0], FRAME_SIZE[1] / FOV_DEG[1])
+
+    def step(self, dt):
+        self.pan.step(dt, self.pi.get_servo_pulsewidth(config.PAN_PIN))
+        self.tilt.step(dt, self.pi.get_servo_pulsewidth(config.TILT_PIN))
+
+    def error_px(self, target):
+        # Where the target appears relative to the frame centre
+        return (
+            (target[0] - self.pan.angle) * self.px_per_deg[0],
+            (target[1] - self.tilt.angle) * self.px_per_deg[1],
+        )
+
+
+# ----------------------------
+# Target motion (world angles, deg)
+# ----------------------------
+STEP_AT_S = 0.1
+
+SCENARIOS = {
+    "step": lambda t: (20.0, -10.0) if t >= STEP_AT_S else (0.0, 0.0),
+    "ramp": lambda t: (30.0 * t, 0.0),
+    "sine": lambda t: (25.0 * math.sin(2 * math.pi * 0.5 * t), 10.0 * math.sin(2 * math.pi * 0.3 * t)),
+}
+
+
+def apply_gains(controller, gains):
+    """gains: PidAxis attributes (kp, ki, kd, kff, ...) and/or max_speed, max_accel."""
+    for key, value in (gains or {}).items():
+        if key in ("max_speed", "max_accel"):
+            setattr(controller.pan_profile, key, float(value))
+            setattr(controller.tilt_profile, key, float(value))
+        else:
+            setattr(controller.pan_pid, key, float(value))
+            setattr(controller.tilt_pid, key, float(value))
+
+
+def _step_metrics(times, errors, settle_px):
+    """Settling time and overshoot of one axis after the step at STEP_AT_S."""
+    after = [(t, e) for t, e in zip(times, errors) if t >= STEP_AT_S]
+    e0 = after[0][1]
+    band = max(settle_px, 0.02 * abs(e0))
+    settled_at = STEP_AT_S
+    for t, e in after:
+        if abs(e) > band:
+            settled_at = t
+    # Overshoot: how far the error went past zero, as % of the step
+    sign = 1.0 if e0 >= 0 else -1.0
+    overshoot = max(0.0, max(-sign * e for _, e in after))
+    return {
+        "settling_s": settled_at - STEP_AT_S,
+        "settled": abs(after[-1][1]) <= band,
+        "overshoot_pct": 100.0 * overshoot / abs(e0) if e0 else 0.0,
+    }
+
+
+def simulate(scenario="step", gains=None, duration=2.0, fps=30.0, latency_s=0.06,
+             noise_px=0.5, settle_px=4.0, physics_dt=0.001, seed=0):
+    target_fn = SCENARIOS[scenario]
+    rng = random.Random(seed)
+
+    clock = SimClock()
+    pi = FakePi()
+    controller = PanTiltController(threaded=False, pi=pi, clock=clock)
+    apply_gains(controller, gains)
+    plant = PanTiltPlant(pi)
+
+    frame_dt = 1.0 / fps
+    next_frame = 0.0
+    next_tick = 0.0
+    ticked = False  # update() already ticked in the current control period
+    pending = deque()  # (deliver_at, error_x, error_y, velocity)
+    prev_meas = None
+
+    times, err_x, err_y = [], [], []
+    update_s = tick_s = 0.0
+    updates = 0
+
+    for i in range(int(duration / physics_dt)):
+        t = i * physics_dt
+        clock.t = t
+        target = target_fn(t)
+        plant.step(physics_dt)
+        ex, ey = plant.error_px(target)
+
+        if t >= next_frame:
+            next_frame += frame_dt
+            mx = ex + rng.gauss(0.0, noise_px)
+            my = ey + rng.gauss(0.0, noise_px)
+            # Velocity from consecutive frames, as the Kalman filter would report it
+            vel = (0.0, 0.0) if prev_meas is None else ((mx - prev_meas[0]) / frame_dt, (my - prev_meas[1]) / frame_dt)
+            prev_meas = (mx, my)
+            pending.append((t + latency_s, int(mx), int(my), vel))
+
+        while pending and pending[0][0] <= t:
+            _, mx, my, vel = pending.popleft()
+            ticks = controller.ticks
+            t0 = time.perf_counter()
+            controller.update(mx, my, velocity=vel, latency_s=latency_s)
+            update_s += time.perf_counter() - t0
+            updates += 1
+            # update() ticks itself; that tick stands in for this period's
+            ticked = ticked or controller.ticks != ticks
+
+        if t >= next_tick:
+            next_tick += controller.period
+            if not ticked:
+                t0 = time.perf_counter()
+                controller.tick()
+                tick_s += time.perf_counter() - t0
+            ticked = False
+
+        if i % 5 == 0:
+            times.append(t)
+            err_x.append(ex)
+            err_y.append(ey)
+
+    controller.close()
+
+    warm = [i for i, t in enumerate(times) if t >= 0.5]
+    rms = math.sqrt(sum(err_x[i] ** 2 + err_y[i] ** 2 for i in warm) / max(1, len(warm)))
+    result = {
+        "scenario": scenario,
+        "fps": fps,
+        "latency_s": latency_s,
+        "rms_px": rms,
+        "max_px": max(math.hypot(err_x[i], err_y[i]) for i in warm) if warm else 0.0,
+        "update_us": 1e6 * update_s / max(1, updates),
+        "tick_us": 1e6 * tick_s / max(1, controller.ticks),
+        "ticks": controller.ticks,
+        "pigpio_round_trips": pi.round_trips,
+        "writes_skipped": controller.output.skipped,
+    }
+    if scenario == "step":
+        pan = _step_metrics(times, err_x, settle_px)
+        tilt = _step_metrics(times, err_y, settle_px)
+        result.update({
+            "settling_s": max(pan["settling_s"], tilt["settling_s"]),
+            "settled": pan["settled"] and tilt["settled"],
+            "overshoot_pct": max(pan["overshoot_pct"], tilt["overshoot_pct"]),
+        })
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate the pan/tilt controller offline.")
+    parser.add_argument("--scenario", nargs="+", default=["step", "ramp", "sine"], choices=sorted(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--fps", type=float, default=30.0, help="vision rate")
+    parser.add_argument("--latency", type=float, default=0.06, help="capture -> servo update delay (s)")
+    parser.add_argument("--noise", type=float, default=0.5, help="detector jitter (px)")
+    for name in ("kp", "ki", "kd", "kff", "max_speed", "max_accel"):
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=float)
+    args = parser.parse_args(argv)
+
+    gains = {k: getattr(args, k) for k in ("kp", "ki", "kd", "kff", "max_speed", "max_accel")
+             if getattr(args, k) is not None}
+    for scenario in args.scenario:
+        r = simulate(scenario, gains, args.duration, args.fps, args.latency, args.noise)
+        print(json.dumps({k: round(v, 3) if isinstance(v, float) else v for k, v in r.items()}))
+
+
+if __name__ == "__main__":
+    main()
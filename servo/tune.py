@@ -0,0 +1,90 @@
+# servo/tune.py
+"""
+Offline autotune for the pan/tilt PID, using servo.sim.
+
+    python -m servo.tune
+    python -m servo.tune --fps 15 --latency 0.1 --rounds 12
+
+Coordinate search over KP/KI/KD/KFF starting from config.py: each gain is
+nudged up and down in turn and kept if the cost improves; the step halves
+when nothing helps. Cost = step settling time + overshoot penalty +
+ramp/sine tracking error. Prints config lines to paste into config.py.
+"""
+
+import argparse
+
+import config
+from servo.sim import simulate
+
+GAINS = ("kp", "ki", "kd", "kff")
+
+
+def cost(gains, fps, latency_s, duration=2.0):
+    step = simulate("step", gains, duration, fps, latency_s)
+    ramp = simulate("ramp", gains, duration, fps, latency_s)
+    sine = simulate("sine", gains, duration, fps, latency_s)
+    c = step["settling_s"] + 0.01 * step["overshoot_pct"]
+    if not step["settled"]:
+        c += 2.0
+    c += ramp["rms_px"] / 100.0 + sine["rms_px"] / 200.0
+    return c, {"step": step, "ramp": ramp, "sine": sine}
+
+
+def tune(fps, latency_s, rounds=10, step=0.5, start=None, verbose=True):
+    gains = dict(start or {
+        "kp": getattr(config, "SERVO_KP_PAN", 0.6),
+        "ki": getattr(config, "SERVO_KI_PAN", 0.0),
+        "kd": getattr(config, "SERVO_KD_PAN", 0.0),
+        "kff": getattr(config, "SERVO_KFF_PAN", 0.0),
+    })
+    best, detail = cost(gains, fps, latency_s)
+    if verbose:
+        print(f"start  cost {best:.3f}  {_fmt(gains)}")
+
+    for r in range(rounds):
+        improved = False
+        for name in GAINS:
+            for factor in (1.0 + step, 1.0 / (1.0 + step)):
+                trial = dict(gains)
+                # Let zeroed gains come back to life
+                trial[name] = gains[name] * factor if gains[name] > 1e-3 else 0.01 * factor
+                c, d = cost(trial, fps, latency_s)
+                if c < best:
+                    best, detail, gains = c, d, trial
+                    improved = True
+                    break
+        if verbose:
+            print(f"round {r + 1:2d} cost {best:.3f}  {_fmt(gains)}")
+        if not improved:
+            step /= 2.0
+            if step < 0.02:
+                break
+    return gains, best, detail
+
+
+def _fmt(gains):
+    return " ".join(f"{k}={v:.3f}" for k, v in gains.items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Autotune the pan/tilt PID against the simulator.")
+    parser.add_argument("--fps", type=float, default=30.0, help="vision rate to tune for")
+    parser.add_argument("--latency", type=float, default=0.06, help="capture -> servo update delay (s)")
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    gains, best, detail = tune(args.fps, args.latency, args.rounds)
+    s = detail["step"]
+    print(
+        f"\nsettling {s['settling_s']:.2f}s  overshoot {s['overshoot_pct']:.1f}%  "
+        f"ramp rms {detail['ramp']['rms_px']:.1f}px  sine rms {detail['sine']['rms_px']:.1f}px  "
+        f"update {s['update_us']:.0f}us  tick {s['tick_us']:.0f}us"
+    )
+    print("\n# config.py")
+    for axis in ("PAN", "TILT"):
+        for name in GAINS:
+            print(f"SERVO_{name.upper()}_{axis} = {gains[name]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
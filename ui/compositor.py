@@ -0,0 +1,161 @@
+# ui/compositor.py
+"""
+Overlay compositor: builds the image that is shown/streamed, without
+touching the frame the trackers analysed.
+
+    compositor = OverlayCompositor()
+    display = compositor.render(frame, result, PROFILER.summary())
+
+Each frame, the camera frame is copied (or downscaled, OVERLAY_SCALE) into a
+pooled display buffer, then the overlays are blitted into just the
+rectangles they cover. Anything that doesn't change is rendered once and
+kept as a sprite: the crosshair, the centre dot and rendered text labels.
+The timing HUD is rasterised into its own panel every OVERLAY_HUD_REFRESH_S
+and blitted as one opaque patch in between.
+
+main.py only calls render() while a window or stream client wants frames.
+"""
+
+import time
+
+import cv2 as cv
+import numpy as np
+import config
+from vision.buffers import FramePool
+
+
+class Sprite:
+    """A pre-rendered BGR patch plus the mask of the pixels it covers (None = opaque)."""
+
+    def __init__(self, bgr, mask=None):
+        self.bgr = bgr
+        self.mask = mask
+        self.h, self.w = bgr.shape[:2]
+
+    def blit(self, dst, x, y):
+        H, W = dst.shape[:2]
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(W, x + self.w), min(H, y + self.h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        sx, sy = x0 - x, y0 - y
+        src = self.bgr[sy:sy + y1 - y0, sx:sx + x1 - x0]
+        if self.mask is None:
+            dst[y0:y1, x0:x1] = src
+        else:
+            np.copyto(dst[y0:y1, x0:x1], src, where=self.mask[sy:sy + y1 - y0, sx:sx + x1 - x0, None])
+
+
+def render_sprite(w, h, draw, opaque=False):
+    """Sprite of size w x h from draw(canvas) painting on black; black stays see-through unless opaque."""
+    canvas = np.zeros((h, w, 3), np.uint8)
+    draw(canvas)
+    return Sprite(canvas, None if opaque else canvas.max(axis=2) > 0)
+
+
+class TextCache:
+    """
+    Rendered strings kept as sprites, so repeated text is rasterised once.
+    (Blitting per-character glyphs from Python costs more than cv.putText
+    itself, so whole strings are the unit that gets cached.)
+    """
+
+    def __init__(self, font, scale, color, thickness, max_entries=128):
+        self.font, self.scale, self.color, self.thickness = font, scale, color, thickness
+        self.max_entries = max_entries
+        self._sprites = {}  # text -> (sprite, offset of the baseline origin)
+
+    def _sprite(self, text):
+        entry = self._sprites.get(text)
+        if entry is None:
+            (w, h), base = cv.getTextSize(text, self.font, self.scale, self.thickness)
+            p = self.thickness  # strokes reach a little past the text box
+            sprite = render_sprite(w + 2 * p, h + base + 2 * p, lambda c: cv.putText(
+                c, text, (p, h + p), self.font, self.scale, self.color, self.thickness, cv.LINE_AA))
+            if len(self._sprites) >= self.max_entries:
+                # Oldest first (dicts keep insertion order)
+                del self._sprites[next(iter(self._sprites))]
+            entry = self._sprites[text] = (sprite, (p, h + p))
+        return entry
+
+    def draw(self, dst, text, x, y):
+        """Like cv.putText: (x, y) is the left end of the baseline."""
+        sprite, (ox, oy) = self._sprite(text)
+        sprite.blit(dst, x - ox, y - oy)
+
+
+class OverlayCompositor:
+    HUD_WIDTH = 260
+    HUD_LINE_H = 18
+
+    def __init__(self, scale=None):
+        # Display buffer size relative to the camera frame
+        self.scale = float(scale if scale is not None else getattr(config, "OVERLAY_SCALE", 1.0))
+        self.hud_refresh_s = float(getattr(config, "OVERLAY_HUD_REFRESH_S", 0.5))
+        self.pool = FramePool()
+        self.label = TextCache(cv.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+        self._crosshair = render_sprite(24, 24, lambda c: cv.drawMarker(
+            c, (12, 12), (255, 255, 255), markerType=cv.MARKER_CROSS, markerSize=20, thickness=2))
+        self._dot = render_sprite(13, 13, lambda c: cv.circle(c, (6, 6), 6, (255, 0, 0), -1))
+        self._hud = None         # opaque panel sprite with the timing table
+        self._hud_rows = None
+        self._hud_time = 0.0
+
+    def render(self, frame_bgr, result, perf_summary=None):
+        """The display image for this frame; frame_bgr itself is left untouched."""
+        H, W = frame_bgr.shape[:2]
+        s = self.scale
+        dw, dh = max(1, int(W * s)), max(1, int(H * s))
+        display = self.pool.get("display", (dh, dw, 3))
+        if s == 1.0:
+            np.copyto(display, frame_bgr)
+        else:
+            cv.resize(frame_bgr, (dw, dh), dst=display, interpolation=cv.INTER_AREA)
+
+        self._crosshair.blit(display, dw // 2 - 12, dh // 2 - 12)
+        self._draw_target(display, result, s)
+        if perf_summary:
+            self._draw_hud(display, perf_summary)
+        return display
+
+    def _draw_target(self, display, result, s):
+        bbox = result.get("bbox")
+        center = result.get("center")
+        if not result.get("found", False) or bbox is None or center is None:
+            return
+
+        x, y, w, h = (int(v * s) for v in bbox)
+        cv.rectangle(display, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        # Use the raw centre if found or fall back to the regular centre
+        cx, cy = result.get("raw_center", center)
+        self._dot.blit(display, int(cx * s) - 6, int(cy * s) - 6)
+
+        dist_cm = result.get("distance_cm")
+        if dist_cm is not None:
+            # Whole cm: a smoothed distance then keeps hitting the same few
+            # cached labels (tenths changed almost every frame, and a
+            # monocular estimate isn't that precise anyway)
+            self.label.draw(display, f"{dist_cm:.0f} cm", x, y + h + 25)
+
+    def _render_hud(self, summary):
+        lines = [f"{'stage':<16}{'p50':>7}{'p99':>7} ms"]
+        for name, st in summary.items():
+            lines.append(f"{name:<16}{st['p50_ms']:7.1f}{st['p99_ms']:7.1f}")
+
+        def draw(canvas):
+            for i, line in enumerate(lines):
+                cv.putText(canvas, line, (5, self.HUD_LINE_H * (i + 1)),
+                           cv.FONT_HERSHEY_PLAIN, 1.0, (0, 255, 255), 1)
+
+        return render_sprite(self.HUD_WIDTH, self.HUD_LINE_H * len(lines) + 6, draw, opaque=True)
+
+    def _draw_hud(self, display, summary, origin=(10, 10)):
+        # Numbers that change every frame can't be read anyway: redraw the
+        # table a few times a second and blit the same panel in between
+        now = time.monotonic()
+        if self._hud is None or len(summary) != self._hud_rows or now - self._hud_time >= self.hud_refresh_s:
+            self._hud = self._render_hud(summary)
+            self._hud_rows = len(summary)
+            self._hud_time = now
+        self._hud.blit(display, *origin)
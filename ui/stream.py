@@ -0,0 +1,238 @@
+# ui/stream.py
+"""
+Headless preview + control over HTTP.
+
+    http://<pi>:8080/             page with the stream and buttons
+    http://<pi>:8080/stream.mjpg  MJPEG stream
+    POST http://<pi>:8080/cmd/c   calibrate (any key command: c, q, ...)
+
+Commands are POST-only and cross-origin posts are refused, so a link, an
+<img> or a form on another site can't trigger them.
+There is no authentication: STREAM_HOST defaults to 127.0.0.1 (reach it
+over an ssh tunnel, or set "0.0.0.0" on a trusted network).
+
+JPEG encoding happens on its own thread, only while a client is
+connected, and at most STREAM_MAX_FPS times a second.
+"""
+
+import queue
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2 as cv
+import numpy as np
+import config
+
+
+# Named commands accepted besides single keys
+COMMANDS = {"calibrate": "c", "quit": "q"}
+
+
+class ControlChannel:
+    """Non-GUI replacement for cv.waitKey: a queue of single-key commands."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def push(self, command):
+        command = COMMANDS.get(command, command)
+        if len(command) == 1:
+            self._queue.put(command)
+            return True
+        return False
+
+    def poll_key(self):
+        """Like cv.waitKey(1) & 0xFF: next key code, or 255 when there is none."""
+        try:
+            return ord(self._queue.get_nowait())
+        except queue.Empty:
+            return 0xFF
+
+    def start_stdin(self):
+        # Read commands typed into the terminal (e.g. over ssh)
+        if sys.stdin is None or not sys.stdin.isatty():
+            return
+
+        def reader():
+            for line in sys.stdin:
+                self.push(line.strip().lower())
+
+        threading.Thread(target=reader, name="stdin-control", daemon=True).start()
+
+
+_PAGE = b"""<!doctype html>
+<html><head><title>Person Tracker</title></head>
+<body style="background:#111;color:#eee;font-family:sans-serif">
+<img src="/stream.mjpg" style="max-width:100%"><br>
+<button onclick="fetch('/cmd/calibrate', {method: 'POST'})">Calibrate</button>
+<button onclick="fetch('/cmd/quit', {method: 'POST'})">Quit</button>
+</body></html>
+"""
+
+
+class MjpegServer:
+    def __init__(self, port=None, host=None, max_fps=None, quality=None, control=None):
+        self.port = int(port or getattr(config, "STREAM_PORT", 8080))
+        self.host = host or getattr(config, "STREAM_HOST", "127.0.0.1")
+        self.min_interval = 1.0 / float(max_fps or getattr(config, "STREAM_MAX_FPS", 10))
+        self.quality = int(quality or getattr(config, "STREAM_JPEG_QUALITY", 70))
+        self.control = control or ControlChannel()
+
+        self.clients = 0
+        self._lock = threading.Lock()
+        self._frame_ready = threading.Condition(self._lock)  # new raw frame for the encoder
+        self._jpeg_ready = threading.Condition(threading.Lock())  # new JPEG for clients
+
+        self._raw = None          # latest frame copy waiting to be encoded
+        self._raw_pending = False
+        self._jpeg = None
+        self._jpeg_seq = 0
+        self._last_publish = 0.0
+        self._running = False
+
+        self._httpd = None
+        self._threads = []
+
+    # ----------------------------
+    # Producer side (main loop)
+    # ----------------------------
+    @property
+    def wants_frames(self):
+        """True when a client is connected and the rate cap allows another frame."""
+        return self.clients > 0 and time.monotonic() - self._last_publish >= self.min_interval
+
+    def publish(self, frame_bgr):
+        if not self.wants_frames:
+            return
+        self._last_publish = time.monotonic()
+
+        with self._lock:
+            # Copy: the camera ring buffer will reuse frame_bgr
+            if self._raw is None or self._raw.shape != frame_bgr.shape:
+                self._raw = np.empty_like(frame_bgr)
+            np.copyto(self._raw, frame_bgr)
+            self._raw_pending = True
+            self._frame_ready.notify()
+
+    # ----------------------------
+    # Encoder thread
+    # ----------------------------
+    def _encode_loop(self):
+        params = [int(cv.IMWRITE_JPEG_QUALITY), self.quality]
+        encoding = None
+        while self._running:
+            with self._lock:
+                self._frame_ready.wait_for(lambda: self._raw_pending or not self._running, 0.5)
+                if not self._raw_pending:
+                    continue
+                # Swap buffers so publish() never waits on the encoder
+                encoding, self._raw = self._raw, encoding
+                self._raw_pending = False
+
+            ok, buf = cv.imencode(".jpg", encoding, params)
+            if not ok:
+                continue
+            with self._jpeg_ready:
+                self._jpeg = buf.tobytes()
+                self._jpeg_seq += 1
+                self._jpeg_ready.notify_all()
+
+    def _next_jpeg(self, last_seq, timeout=1.0):
+        with self._jpeg_ready:
+            self._jpeg_ready.wait_for(lambda: self._jpeg_seq != last_seq or not self._running, timeout)
+            return self._jpeg, self._jpeg_seq
+
+    # ----------------------------
+    # HTTP
+    # ----------------------------
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass  # keep the console quiet
+
+            def _send(self, code, body, content_type="text/plain"):
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/":
+                    self._send(200, _PAGE, "text/html")
+                elif self.path == "/stream.mjpg":
+                    self._stream()
+                elif self.path.startswith("/cmd/"):
+                    self.send_response(405)
+                    self.send_header("Allow", "POST")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                else:
+                    self._send(404, b"not found\n")
+
+            def do_POST(self):
+                origin = self.headers.get("Origin")
+                if origin and origin.split("://", 1)[-1] != self.headers.get("Host"):
+                    # A form on some other site posting through the browser
+                    self._send(403, b"forbidden\n")
+                elif self.path.startswith("/cmd/"):
+                    ok = server.control.push(self.path[len("/cmd/"):].lower())
+                    self._send(200 if ok else 400, b"ok\n" if ok else b"unknown command\n")
+                else:
+                    self._send(404, b"not found\n")
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.end_headers()
+
+                with server._lock:
+                    server.clients += 1
+                seq = -1
+                try:
+                    while server._running:
+                        jpeg, new_seq = server._next_jpeg(seq)
+                        if jpeg is None or new_seq == seq:
+                            seq = new_seq
+                            continue
+                        seq = new_seq
+                        self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                        self.wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with server._lock:
+                        server.clients -= 1
+
+        return Handler
+
+    def start(self):
+        self._running = True
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._threads = [
+            threading.Thread(target=self._httpd.serve_forever, name="mjpeg-http", daemon=True),
+            threading.Thread(target=self._encode_loop, name="mjpeg-encode", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def close(self):
+        self._running = False
+        with self._lock:
+            self._frame_ready.notify_all()
+        with self._jpeg_ready:
+            self._jpeg_ready.notify_all()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        for t in self._threads:
+            t.join(timeout=1.0)
@@ -0,0 +1,35 @@
+# vision/buffers.py
+"""
+Reusable frame buffers for OpenCV dst= arguments.
+
+Each named buffer is one flat allocation; get() hands out a contiguous
+(h, w[, c]) view of its front, so ROI crops of changing size reuse the
+same memory instead of allocating a new array every frame. A buffer only
+grows, when a larger shape than ever before is requested.
+
+Views stay valid until the next get() of the same name, i.e. one frame.
+"""
+
+import numpy as np
+
+
+class FramePool:
+    def __init__(self):
+        self._bufs = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        dtype = np.dtype(dtype)
+        n = 1
+        for d in shape:
+            n *= int(d)
+
+        buf = self._bufs.get(name)
+        if buf is None or buf.dtype != dtype or buf.size < n:
+            buf = self._bufs[name] = np.empty(n, dtype=dtype)
+        return buf[:n].reshape(shape)
+
+    def like(self, name, arr):
+        return self.get(name, arr.shape, arr.dtype)
+
+    def nbytes(self):
+        return sum(b.nbytes for b in self._bufs.values())
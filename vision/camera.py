@@ -1,31 +1,212 @@
 # Import Libraries
-from picamera2 import Picamera2
+import threading
+import time
+
 import cv2 as cv
+import numpy as np
 import config
 
 # Class for the camera
 class Camera:
-    def __init__(self):
+    """
+    Picamera2 wrapper that hands out BGR frames.
+
+    With config.CAMERA_THREADED the capture + colour conversion runs on a
+    background thread into a small preallocated ring buffer, and read()
+    always returns the newest frame (older unread frames are dropped).
+
+    With config.CAMERA_LORES_SIZE a second low-resolution stream is
+    captured alongside the main one for detection (see read_pair()).
+
+    With config.CAMERA_FORMAT = "RGB888" picamera2 already delivers BGR
+    byte order, so frames need no conversion: they are used as captured, or
+    copied once into the ring in threaded mode.
+    """
+
+    def __init__(self, threaded=None):
+        self.lores_size = getattr(config, "CAMERA_LORES_SIZE", None)
+        self.format = getattr(config, "CAMERA_FORMAT", None)
+        # libcamera "RGB888" is B, G, R in memory: exactly what OpenCV wants
+        self.native_bgr = self.format == "RGB888"
+
+        # Imported here so the rest of the pipeline loads without a camera
+        from picamera2 import Picamera2
+
         # Configure the camera into a class
         self.picam2 = Picamera2()
-        # Configure the output size
-        self.picam2.configure(
-            self.picam2.create_preview_configuration(
-                main={"size": config.PREVIEW_SIZE}
-            )
-        )
+        # Configure the output size (plus the optional lores stream)
+        streams = {"main": {"size": config.PREVIEW_SIZE}}
+        if self.format:
+            streams["main"]["format"] = self.format
+        if self.lores_size:
+            streams["lores"] = {"size": tuple(self.lores_size)}
+        self.picam2.configure(self.picam2.create_preview_configuration(**streams))
         # Start the camera
         self.picam2.start()
 
-    # Call this everytime you need to capture an image from the camera
-    def read(self):
-        # Asks the camera for the most recent frame
-        frame = self.picam2.capture_array()
+        if threaded is None:
+            threaded = getattr(config, "CAMERA_THREADED", False)
+        self.threaded = bool(threaded)
+
+        # Stats (threaded mode)
+        self.frames_captured = 0
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.last_frame_age_s = 0.0
+
+        self._thread = None
+        if self.threaded:
+            self._start_capture_thread()
+
+    # Converts a raw picamera2 array into BGR (optionally into dst)
+    def _to_bgr(self, frame, dst=None):
+        # Native BGR: hand the capture buffer straight through
+        if self.native_bgr and frame.ndim == 3 and frame.shape[2] == 3:
+            return frame
+        # lores is planar YUV420 on most Pis (h * 3/2 rows, one channel)
+        if frame.ndim == 2:
+            return cv.cvtColor(frame, cv.COLOR_YUV2BGR_I420, dst=dst)
         # If the frame is RGBA convert to BGR
         if frame.ndim == 3 and frame.shape[2] == 4:
-            return cv.cvtColor(frame, cv.COLOR_RGBA2BGR)
-        return cv.cvtColor(frame, cv.COLOR_RGB2BGR)
+            return cv.cvtColor(frame, cv.COLOR_RGBA2BGR, dst=dst)
+        return cv.cvtColor(frame, cv.COLOR_RGB2BGR, dst=dst)
+
+    @staticmethod
+    def _bgr_shape(raw):
+        if raw.ndim == 2:
+            return (raw.shape[0] * 2 // 3, raw.shape[1], 3)
+        return (raw.shape[0], raw.shape[1], 3)
+
+    def _capture_raw(self):
+        # Returns (main, lores_or_None) from the same request
+        if self.lores_size:
+            (main, lores), _ = self.picam2.capture_arrays(["main", "lores"])
+            return main, lores
+        return self.picam2.capture_array(), None
+
+    # ----------------------------
+    # Threaded capture
+    # ----------------------------
+    def _start_capture_thread(self):
+        n = max(3, int(getattr(config, "CAMERA_BUFFER_SIZE", 3)))
+        w, h = config.PREVIEW_SIZE
+
+        # Preallocated ring of BGR frames + capture timestamps
+        self._slots = [np.empty((h, w, 3), dtype=np.uint8) for _ in range(n)]
+        self._lores_slots = [None] * n
+        if self.lores_size:
+            lw, lh = self.lores_size
+            self._lores_slots = [np.empty((lh, lw, 3), dtype=np.uint8) for _ in range(n)]
+        self._stamps = [0.0] * n
+        self._latest = -1     # slot holding the newest frame
+        self._held = -1       # slot currently handed to the consumer
+        self._unread = False  # newest frame not yet read
+        self._seq = 0
+
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._running = True
+        self._error = None  # exception that stopped the capture thread
+
+        self._thread = threading.Thread(target=self._capture_loop, name="camera", daemon=True)
+        self._thread.start()
+
+    def _next_write_slot(self):
+        # Never overwrite the newest frame or the one the consumer is using
+        n = len(self._slots)
+        i = (self._latest + 1) % n
+        while i == self._latest or i == self._held:
+            i = (i + 1) % n
+        return i
+
+    def _convert_into(self, slots, i, raw):
+        slot = slots[i]
+        shape = self._bgr_shape(raw)
+        if slot is None or slot.shape != shape:
+            slot = slots[i] = np.empty(shape, dtype=np.uint8)
+        if self.native_bgr and raw.ndim == 3 and raw.shape[2] == 3:
+            # Already BGR: one copy into the ring, no conversion
+            np.copyto(slot, raw)
+            return
+        self._to_bgr(raw, dst=slot)
+
+    def _capture_loop(self):
+        try:
+            self._capture_frames()
+        except Exception as e:
+            # Hand it to the reader instead of dying silently
+            with self._lock:
+                self._error = e
+                self._new_frame.notify_all()
+
+    def _capture_frames(self):
+        while self._running:
+            raw, raw_lores = self._capture_raw()
+            stamp = time.monotonic()
+
+            with self._lock:
+                i = self._next_write_slot()
+
+            # Convert outside the lock: the slot is not visible to the reader yet
+            self._convert_into(self._slots, i, raw)
+            if raw_lores is not None:
+                self._convert_into(self._lores_slots, i, raw_lores)
+
+            with self._lock:
+                if self._unread:
+                    self.frames_dropped += 1
+                self._latest = i
+                self._stamps[i] = stamp
+                self._unread = True
+                self._seq += 1
+                self.frames_captured += 1
+                self._new_frame.notify()
+
+    def _read_latest(self, timeout=1.0):
+        with self._lock:
+            if not self._unread:
+                self._new_frame.wait_for(lambda: self._unread or not self._running or self._error, timeout)
+            if self._error is not None:
+                raise RuntimeError("Camera capture failed") from self._error
+            if self._latest < 0:
+                raise RuntimeError("Camera produced no frames")
+            self._held = self._latest
+            self._unread = False
+            self.frames_read += 1
+            self.last_frame_age_s = time.monotonic() - self._stamps[self._held]
+            return self._slots[self._held], self._lores_slots[self._held]
+
+    # Returns (frame_bgr, lores_bgr_or_None) captured together
+    def read_pair(self):
+        if self.threaded:
+            # Newest frames from the ring; valid until the next read
+            return self._read_latest()
+
+        # Asks the camera for the most recent frame
+        raw, raw_lores = self._capture_raw()
+        lores = self._to_bgr(raw_lores) if raw_lores is not None else None
+        return self._to_bgr(raw), lores
+
+    # Call this everytime you need to capture an image from the camera
+    def read(self):
+        return self.read_pair()[0]
+
+    # Capture stats for logging / HUD
+    def stats(self):
+        return {
+            "threaded": self.threaded,
+            "captured": self.frames_captured,
+            "read": self.frames_read,
+            "dropped": self.frames_dropped,
+            "frame_age_s": self.last_frame_age_s,
+        }
 
     # Closing function
     def close(self):
-        self.picam2.stop()
\ No newline at end of file
+        if self._thread is not None:
+            with self._lock:
+                self._running = False
+                self._new_frame.notify_all()
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.picam2.stop()
@@ -0,0 +1,69 @@
+# vision/colour_lut.py
+"""
+Single-pass colour classification with lookup tables.
+
+Every HSV range in config.COLOR_RANGES gets one bit. Three 256-entry
+tables (H, S, V) give, per channel value, the set of ranges that value
+falls inside; ANDing the three looked-up bytes leaves exactly the ranges
+the pixel matches. Two more tables turn that bit set into a colour label
+and a 0/255 mask. Cost is the same for one colour or eight ranges.
+"""
+
+import cv2 as cv
+import numpy as np
+from vision.buffers import FramePool
+
+MAX_RANGES = 8  # one bit per range in a uint8
+
+
+class ColourLut:
+    def __init__(self, active_colors, color_ranges):
+        self.names = list(active_colors)
+        ranges = []
+        for label, name in enumerate(self.names, start=1):
+            for lower, upper in color_ranges.get(name, []):
+                ranges.append((label, lower, upper))
+        if len(ranges) > MAX_RANGES:
+            raise ValueError(f"ColourLut supports up to {MAX_RANGES} HSV ranges, got {len(ranges)}")
+
+        values = np.arange(256)
+        hsv_lut = np.zeros((256, 3), dtype=np.uint8)
+        for bit, (_, lower, upper) in enumerate(ranges):
+            for ch in range(3):
+                inside = (values >= int(lower[ch])) & (values <= int(upper[ch]))
+                hsv_lut[inside, ch] |= np.uint8(1 << bit)
+        # cv.LUT on a 3-channel image wants a 1x256 3-channel table
+        self._hsv_lut = hsv_lut.reshape(1, 256, 3)
+
+        # Bit set -> label of the first matching colour (0 = none), and -> mask
+        label_lut = np.zeros(256, dtype=np.uint8)
+        for bits in range(1, 256):
+            for bit, (label, _, _) in enumerate(ranges):
+                if bits & (1 << bit):
+                    label_lut[bits] = label
+                    break
+        self._label_lut = label_lut
+        self._mask_lut = np.where(label_lut > 0, 255, 0).astype(np.uint8)
+
+        # Scratch buffers reused across frames (and ROI sizes)
+        self._pool = FramePool()
+
+    def classify(self, hsv):
+        """
+        Returns (mask, labels) for an HSV image. mask is 0/255, labels holds
+        1 + index into self.names (0 = no colour). Both are reused buffers,
+        valid until the next call.
+        """
+        h, w = hsv.shape[:2]
+        bits3 = self._pool.get("bits3", (h, w, 3))
+        bits = self._pool.get("bits", (h, w))
+        labels = self._pool.get("labels", (h, w))
+        mask = self._pool.get("mask", (h, w))
+
+        cv.LUT(hsv, self._hsv_lut, dst=bits3)
+        np.bitwise_and(bits3[..., 0], bits3[..., 1], out=bits)
+        np.bitwise_and(bits, bits3[..., 2], out=bits)
+
+        cv.LUT(bits, self._label_lut, dst=labels)
+        cv.LUT(bits, self._mask_lut, dst=mask)
+        return mask, labels
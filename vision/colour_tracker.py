@@ -2,12 +2,31 @@
 import cv2 as cv
 import numpy as np
 import config
+from perf.profiler import PROFILER
+from vision.blobs import BlobExtractor
+from vision.buffers import FramePool
+from vision.colour_lut import ColourLut, MAX_RANGES
+from vision.roi import crop
 
 class ColourTracker:
-    def __init__(self, active_colors=None):
+    # Runtime quality ladder (0 = best), used by perf.governor
+    # kernel: MASK_KERNEL multiplier, open/close: morphology iterations
+    QUALITY_LEVELS = [
+        {"kernel": 1.0, "open": None, "close": None},  # None = config value
+        {"kernel": 0.7, "open": 1, "close": 1},
+        {"kernel": 0.5, "open": 1, "close": 0},
+    ]
+
+    def __init__(self, active_colors=None, scale=1.0):
+        self._own_colors = active_colors is not None
         self.active_colors = active_colors or config.ACTIVE_COLORS
         self.color_ranges = config.COLOR_RANGES
-        self.min_area = config.MIN_AREA
+        self.quality = 0
+        self.open_iters = config.OPEN_ITERS
+        self.close_iters = config.CLOSE_ITERS
+        self._kernel_factor = 1.0
+        # scale < 1 when running on a downscaled frame (see vision.scaled)
+        self.set_scale(scale)
 
         self.deadband_px = config.DEADBAND_PX
         self.alpha = config.CENTER_SMOOTH_ALPHA
@@ -15,15 +34,71 @@ class ColourTracker:
 
         self._smoothed_center = None
         self._smoothed_error = None
-
-        self.kernel = cv.getStructuringElement(cv.MORPH_ELLIPSE, config.MASK_KERNEL)
+        self._blobs = None  # last frame's blobs, for select()
+
+        # Preallocated blur/HSV/morphology outputs, reused every frame
+        self.pool = FramePool()
+
+        # One-pass LUT classifier, unless there are too many ranges for it
+        n_ranges = sum(len(self.color_ranges.get(c, [])) for c in self.active_colors)
+        self.lut = ColourLut(self.active_colors, self.color_ranges) if n_ranges <= MAX_RANGES else None
+
+        # Blob stats in one pass; "weighted" centres on the most saturated pixels
+        self.blobs = BlobExtractor(max_blobs=getattr(config, "BLOB_MAX", 16))
+        self.centroid_mode = getattr(config, "BLOB_CENTROID", "weighted")
+
+    def reconfigure(self, changed=None):
+        """Re-reads config after a live change (runtime_config); call between frames."""
+        def hit(*names):
+            return changed is None or any(n in changed for n in names)
+
+        if hit("COLOR_RANGES", "ACTIVE_COLORS"):
+            active = self.active_colors if self._own_colors else config.ACTIVE_COLORS
+            ranges = config.COLOR_RANGES
+            n_ranges = sum(len(ranges.get(c, [])) for c in active)
+            # Build the new LUT first; the old one keeps working until the swap
+            lut = ColourLut(active, ranges) if n_ranges <= MAX_RANGES else None
+            self.active_colors, self.color_ranges, self.lut = active, ranges, lut
+        if hit("MIN_AREA", "MASK_KERNEL", "OPEN_ITERS", "CLOSE_ITERS"):
+            self.set_scale(self.scale)
+            self.set_quality(self.quality)
+        if hit("BLOB_MAX", "BLOB_CENTROID"):
+            self.blobs.max_blobs = getattr(config, "BLOB_MAX", 16)
+            self.centroid_mode = getattr(config, "BLOB_CENTROID", "weighted")
+        if hit("CENTER_SMOOTH_ALPHA", "ERROR_SMOOTH_ALPHA"):
+            self.alpha = config.CENTER_SMOOTH_ALPHA
+            self.error_alpha = config.ERROR_SMOOTH_ALPHA
+
+    def set_scale(self, scale):
+        self.scale = float(scale)
+        self.min_area = config.MIN_AREA * self.scale * self.scale
+        self._make_kernel()
+
+    def set_quality(self, level):
+        level = max(0, min(len(self.QUALITY_LEVELS) - 1, int(level)))
+        q = self.QUALITY_LEVELS[level]
+        self.quality = level
+        self._kernel_factor = q["kernel"]
+        self.open_iters = config.OPEN_ITERS if q["open"] is None else q["open"]
+        self.close_iters = config.CLOSE_ITERS if q["close"] is None else q["close"]
+        self._make_kernel()
+
+    def _make_kernel(self):
+        kw, kh = config.MASK_KERNEL
+        k = self.scale * self._kernel_factor
+        kernel_size = (max(1, round(kw * k)), max(1, round(kh * k)))
+        self.kernel = cv.getStructuringElement(cv.MORPH_ELLIPSE, kernel_size)
 
     def _build_mask(self, hsv):
+        # Returns (mask, labels); labels is None on the inRange fallback
+        if self.lut is not None:
+            return self.lut.classify(hsv)
+
         mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
         for color_name in self.active_colors:
             for lower, upper in self.color_ranges.get(color_name, []):
                 mask = cv.bitwise_or(mask, cv.inRange(hsv, lower, upper))
-        return mask
+        return mask, None
 
     def _smooth_center(self, cx, cy):
         if self._smoothed_center is None:
@@ -45,17 +120,34 @@ class ColourTracker:
             self._smoothed_error = (sx, sy)
         return int(self._smoothed_error[0]), int(self._smoothed_error[1])
 
-    def process(self, frame_bgr):
+    def process(self, frame_bgr, roi=None, shared=None):
         H, W = frame_bgr.shape[:2]
 
-        frame_bgr = cv.GaussianBlur(frame_bgr, (5, 5), 0)
-        hsv = cv.cvtColor(frame_bgr, cv.COLOR_BGR2HSV)
+        # Only search inside the ROI (a view, not a copy); mask is ROI-sized
+        search, x0, y0 = crop(frame_bgr, roi)
+
+        with PROFILER.stage("colour.blur_hsv"):
+            if shared is not None:
+                # HSV already made for this frame (vision.shared_frame)
+                hsv = crop(shared.hsv(), roi)[0]
+            else:
+                blurred = cv.GaussianBlur(search, (5, 5), 0, dst=self.pool.like("blur", search))
+                hsv = cv.cvtColor(blurred, cv.COLOR_BGR2HSV, dst=self.pool.like("hsv", search))
 
-        mask = self._build_mask(hsv)
-        mask = cv.morphologyEx(mask, cv.MORPH_OPEN, self.kernel, iterations=config.OPEN_ITERS)
-        mask = cv.morphologyEx(mask, cv.MORPH_CLOSE, self.kernel, iterations=config.CLOSE_ITERS)
+        with PROFILER.stage("colour.mask"):
+            mask, labels = self._build_mask(hsv)
 
-        contours, _ = cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+        with PROFILER.stage("colour.morph"):
+            if self.open_iters > 0:
+                mask = cv.morphologyEx(mask, cv.MORPH_OPEN, self.kernel, iterations=self.open_iters,
+                                       dst=self.pool.like("open", mask))
+            if self.close_iters > 0:
+                mask = cv.morphologyEx(mask, cv.MORPH_CLOSE, self.kernel, iterations=self.close_iters,
+                                       dst=self.pool.like("close", mask))
+
+        with PROFILER.stage("colour.blobs"):
+            weights = hsv[..., 1] if self.centroid_mode == "weighted" else None
+            blobs = self.blobs.extract(mask, self.min_area, weights)
 
         result = {
             "found": False,
@@ -65,23 +157,44 @@ class ColourTracker:
             "error": None,
             "area": 0,
             "mask": mask,
+            "roi": None if search is frame_bgr else (x0, y0, mask.shape[1], mask.shape[0]),
+            "labels": labels,  # per-pixel 1 + index into active_colors (0 = none)
+            "color": None,
+            "detections": [],
         }
 
-        if not contours:
+        # Every blob big enough, largest first
+        self._blobs = None
+        if not blobs:
             self._smoothed_center = None
             self._smoothed_error = None
             return result
-
-        c = max(contours, key=cv.contourArea)
-        area = cv.contourArea(c)
-        if area < self.min_area:
-            self._smoothed_center = None
-            self._smoothed_error = None
-            return result
-
-        x, y, w, h = cv.boundingRect(c)
-        raw_cx = x + w // 2
-        raw_cy = y + h // 2
+        result["detections"] = [(int(bx + x0), int(by + y0), int(bw), int(bh)) for bx, by, bw, bh in (b.bbox for b in blobs)]
+
+        # Kept for select(): another blob may become the target this frame
+        self._blobs = (blobs, x0, y0, (W, H), self._smoothed_center, self._smoothed_error)
+        return self._pick(result, blobs[0], x0, y0, (W, H))
+
+    def select(self, result, index):
+        """Makes detection index of the last process() result the target (multi-target policies)."""
+        blobs, x0, y0, frame_size, center, error = self._blobs
+        # Smooth from where this frame started, not from the largest blob
+        self._smoothed_center, self._smoothed_error = center, error
+        return self._pick(result, blobs[index], x0, y0, frame_size)
+
+    def _pick(self, result, blob, x0, y0, frame_size):
+        W, H = frame_size
+        area = blob.area
+        x, y, w, h = blob.bbox
+        # Back to full-frame coordinates
+        x += x0
+        y += y0
+        if self.centroid_mode == "bbox":
+            raw_cx = x + w // 2
+            raw_cy = y + h // 2
+        else:
+            raw_cx = int(round(blob.centroid[0])) + x0
+            raw_cy = int(round(blob.centroid[1])) + y0
 
         cx, cy = self._smooth_center(raw_cx, raw_cy)
 
@@ -101,5 +214,13 @@ class ColourTracker:
             "raw_center": (int(raw_cx), int(raw_cy)),
             "error": (int(error_x), int(error_y)),
             "area": int(area),
+            "color": self._color_at(result["labels"], raw_cx - x0, raw_cy - y0),
         })
         return result
+
+    def _color_at(self, labels, x, y):
+        # Which active colour the blob is (by its centre pixel)
+        if labels is None or not (0 <= y < labels.shape[0] and 0 <= x < labels.shape[1]):
+            return None
+        label = int(labels[y, x])
+        return self.active_colors[label - 1] if label else None
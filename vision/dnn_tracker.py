@@ -0,0 +1,189 @@
+# vision/dnn_tracker.py
+"""
+DNN face/person detector (TRACK_MODE = "dnn").
+
+Two model families, picked with config.DNN_MODEL:
+
+    "yunet"  OpenCV's YuNet face detector (face_detection_yunet_*.onnx)
+             via cv.FaceDetectorYN.
+    "ssd"    Any SSD-style detector whose output rows are
+             [image_id, class_id, confidence, x1, y1, x2, y2] (normalised),
+             e.g. res10_300x300_ssd face or MobileNet-SSD people.
+             Runs through cv.dnn, or ONNX Runtime with DNN_RUNTIME = "onnxruntime".
+
+Model files are not shipped; point DNN_MODEL_PATH (and DNN_CONFIG_PATH for
+Caffe/TF models) at them.
+"""
+
+import cv2 as cv
+import numpy as np
+import config
+from perf.profiler import PROFILER
+from vision.results import empty_result, bbox_result
+from vision.roi import crop
+
+
+class DnnTracker:
+    # See vision.warmup.warm_up (first forward allocates the layers)
+    STATELESS = True
+
+    def __init__(self, model=None, model_path=None, input_size=None, threads=None, runtime=None):
+        self.deadband_px = config.DEADBAND_PX
+        self._frame_size = None  # last process() call, for select()
+        self._scores = []
+        self.model = (model or getattr(config, "DNN_MODEL", "yunet")).lower()
+        self.model_path = model_path or getattr(config, "DNN_MODEL_PATH", None)
+        self.config_path = getattr(config, "DNN_CONFIG_PATH", None)
+        self.input_size = tuple(input_size or getattr(config, "DNN_INPUT_SIZE", (320, 240)))
+        self.conf_threshold = float(getattr(config, "DNN_CONF_THRESHOLD", 0.6))
+        self.nms_threshold = float(getattr(config, "DNN_NMS_THRESHOLD", 0.3))
+        self.class_id = getattr(config, "DNN_CLASS_ID", None)
+        self.mean = tuple(getattr(config, "DNN_MEAN", (104.0, 177.0, 123.0)))
+        self.pixel_scale = float(getattr(config, "DNN_PIXEL_SCALE", 1.0))
+        self.swap_rb = bool(getattr(config, "DNN_SWAP_RB", False))
+        self.runtime = (runtime or getattr(config, "DNN_RUNTIME", "opencv")).lower()
+        threads = int(threads or getattr(config, "DNN_THREADS", 0))
+
+        if not self.model_path:
+            raise RuntimeError("DNN_MODEL_PATH is not set (download a YuNet/SSD model first)")
+
+        # OpenCV's thread count is process-wide: set it only around inference
+        # (_run_cv), so the rest of the pipeline keeps its own
+        self._cv_threads = max(0, threads)
+
+        self._net = None
+        self._ort = None
+        self._yunet = None
+
+        if self.model == "yunet":
+            if not hasattr(cv, "FaceDetectorYN"):
+                raise RuntimeError("This OpenCV build has no FaceDetectorYN (needs OpenCV >= 4.5.4)")
+            self._yunet = cv.FaceDetectorYN.create(
+                self.model_path, "", self.input_size,
+                self.conf_threshold, self.nms_threshold, 50,
+            )
+            self._yunet_size = self.input_size  # set per crop in _detect_yunet
+        elif self.model == "ssd" and self.runtime == "onnxruntime":
+            try:
+                import onnxruntime as ort
+            except ImportError as e:
+                raise RuntimeError("DNN_RUNTIME = 'onnxruntime' but onnxruntime is not installed") from e
+            opts = ort.SessionOptions()
+            if threads > 0:
+                opts.intra_op_num_threads = threads
+            self._ort = ort.InferenceSession(self.model_path, opts, providers=["CPUExecutionProvider"])
+            self._ort_input = self._ort.get_inputs()[0].name
+        elif self.model == "ssd":
+            self._net = cv.dnn.readNet(self.model_path, self.config_path or "")
+            self._net.setPreferableBackend(cv.dnn.DNN_BACKEND_OPENCV)
+            self._net.setPreferableTarget(cv.dnn.DNN_TARGET_CPU)
+        else:
+            raise ValueError(f"Unknown DNN_MODEL: {self.model}")
+
+    # ----------------------------
+    # Inference
+    # ----------------------------
+    def _run_cv(self, fn, *args):
+        # fn under DNN_THREADS OpenCV threads, then back to the previous count
+        if not self._cv_threads:
+            return fn(*args)
+        previous = cv.getNumThreads()
+        cv.setNumThreads(self._cv_threads)
+        try:
+            return fn(*args)
+        finally:
+            cv.setNumThreads(previous)
+
+    def _detect_yunet(self, image):
+        # Shrink to fit DNN_INPUT_SIZE keeping the aspect ratio (ROI crops
+        # come in any shape), run YuNet at that size, scale boxes back
+        h, w = image.shape[:2]
+        iw, ih = self.input_size
+        k = min(1.0, iw / w, ih / h)
+        size = (max(1, round(w * k)), max(1, round(h * k)))
+        small = image if k == 1.0 else cv.resize(image, size, interpolation=cv.INTER_AREA)
+        if size != self._yunet_size:
+            self._yunet.setInputSize(size)
+            self._yunet_size = size
+        _, faces = self._run_cv(self._yunet.detect, small)
+        if faces is None:
+            return []
+        kx, ky = w / size[0], h / size[1]
+        # Rows: x, y, w, h, 10 landmark coords, score
+        return [(f[0] * kx, f[1] * ky, f[2] * kx, f[3] * ky, float(f[14])) for f in faces]
+
+    def _forward_ssd(self, images):
+        blob = cv.dnn.blobFromImages(
+            images, self.pixel_scale, self.input_size, self.mean, swapRB=self.swap_rb, crop=False
+        )
+        if self._ort is not None:
+            out = self._ort.run(None, {self._ort_input: blob})[0]
+        else:
+            self._net.setInput(blob)
+            out = self._run_cv(self._net.forward)
+        return out.reshape(-1, 7)
+
+    def _ssd_boxes(self, rows, image_index, size):
+        w, h = size
+        boxes, scores = [], []
+        for img_id, class_id, conf, x1, y1, x2, y2 in rows:
+            if int(img_id) != image_index or conf < self.conf_threshold:
+                continue
+            if self.class_id is not None and int(class_id) != int(self.class_id):
+                continue
+            x1, y1 = max(0.0, x1) * w, max(0.0, y1) * h
+            x2, y2 = min(1.0, x2) * w, min(1.0, y2) * h
+            if x2 > x1 and y2 > y1:
+                boxes.append([int(x1), int(y1), int(x2 - x1), int(y2 - y1)])
+                scores.append(float(conf))
+
+        keep = cv.dnn.NMSBoxes(boxes, scores, self.conf_threshold, self.nms_threshold) if boxes else []
+        return [(*boxes[i], scores[i]) for i in np.array(keep).flatten()]
+
+    def _to_result(self, dets, frame_size, x0, y0):
+        self._scores = []
+        if not dets:
+            return empty_result()
+        dets = sorted(dets, key=lambda d: d[2] * d[3], reverse=True)
+        detections = [(int(x + x0), int(y + y0), int(w), int(h)) for x, y, w, h, _ in dets]
+        self._scores = [d[4] for d in dets]
+        result = bbox_result(detections[0], frame_size, self.deadband_px, detections=detections)
+        result["confidence"] = dets[0][4]
+        return result
+
+    def select(self, result, index):
+        """Makes detection index of the last process() result the target (multi-target policies)."""
+        detections = result["detections"]
+        out = bbox_result(detections[index], self._frame_size, self.deadband_px, detections=detections)
+        out["confidence"] = self._scores[index]
+        return out
+
+    # ----------------------------
+    # Tracker API
+    # ----------------------------
+    def process(self, frame_bgr, roi=None):
+        H, W = frame_bgr.shape[:2]
+        self._frame_size = (W, H)
+        search, x0, y0 = crop(frame_bgr, roi)
+
+        with PROFILER.stage("dnn.infer"):
+            if self._yunet is not None:
+                dets = self._detect_yunet(search)
+            else:
+                rows = self._forward_ssd([search])
+                dets = self._ssd_boxes(rows, 0, search.shape[1::-1])
+
+        return self._to_result(dets, (W, H), x0, y0)
+
+    def process_batch(self, frames):
+        """One forward pass for several frames (SSD); YuNet runs them one by one."""
+        if self._yunet is not None:
+            return [self.process(f) for f in frames]
+
+        with PROFILER.stage("dnn.infer_batch"):
+            rows = self._forward_ssd(list(frames))
+        results = []
+        for i, f in enumerate(frames):
+            H, W = f.shape[:2]
+            results.append(self._to_result(self._ssd_boxes(rows, i, (W, H)), (W, H), 0, 0))
+        return results
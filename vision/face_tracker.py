@@ -1,10 +1,30 @@
 # vision/face_tracker.py
 import cv2 as cv
 import config
+from perf.profiler import PROFILER
+from vision.results import empty_result, bbox_result, offset_detections
+from vision.buffers import FramePool
+from vision.roi import crop
 
 class FaceTracker:
-    def __init__(self):
+    # Cascade keeps no per-frame state, so vision.warmup can warm it up
+    STATELESS = True
+
+    # Runtime quality ladder (0 = best), used by perf.governor
+    QUALITY_LEVELS = [
+        {"scale_factor": 1.1, "min_neighbors": 5, "min_size": 30},
+        {"scale_factor": 1.2, "min_neighbors": 4, "min_size": 45},
+        {"scale_factor": 1.3, "min_neighbors": 4, "min_size": 60},
+    ]
+
+    def __init__(self, scale=1.0):
         self.deadband_px = config.DEADBAND_PX
+        self.quality = 0
+        self.scale_factor = 1.1
+        self.min_neighbors = 5
+        self._min_size_px = 30
+        # scale < 1 when running on a downscaled frame (see vision.scaled)
+        self.set_scale(scale)
 
         # Use OpenCV's built-in Haar cascade automatically.
         # This avoids hardcoded /usr/share/... paths that often don't exist.
@@ -13,6 +33,7 @@ class FaceTracker:
             cascade_path = cv.data.haarcascades + "haarcascade_frontalface_default.xml"
 
         self.face_cascade = cv.CascadeClassifier(cascade_path)
+        self.pool = FramePool()
 
         # If the cascade fails to load, give a useful message
         if self.face_cascade.empty():
@@ -22,52 +43,42 @@ class FaceTracker:
                 f"Tip: install opencv-data or use cv.data.haarcascades."
             )
 
-    def process(self, frame_bgr):
-        H, W = frame_bgr.shape[:2]
-
-        gray = cv.cvtColor(frame_bgr, cv.COLOR_BGR2GRAY)
-
-        faces = self.face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(30, 30),
-        )
+    def set_scale(self, scale):
+        self.scale = float(scale)
+        side = max(8, int(self._min_size_px * self.scale))
+        self.min_size = (side, side)
 
-        result = {
-            "found": False,
-            "bbox": None,
-            "center": None,
-            "raw_center": None,
-            "error": None,
-            "area": 0,
-            "mask": None,
-        }
+    def set_quality(self, level):
+        level = max(0, min(len(self.QUALITY_LEVELS) - 1, int(level)))
+        q = self.QUALITY_LEVELS[level]
+        self.quality = level
+        self.scale_factor = q["scale_factor"]
+        self.min_neighbors = q["min_neighbors"]
+        self._min_size_px = q["min_size"]
+        self.set_scale(self.scale)
 
-        if len(faces) == 0:
-            return result
-
-        # Choose largest detected face
-        x, y, w, h = max(faces, key=lambda r: r[2] * r[3])
-
-        cx = x + w // 2
-        cy = y + h // 2
+    def process(self, frame_bgr, roi=None, shared=None):
+        H, W = frame_bgr.shape[:2]
 
-        error_x = cx - (W // 2)
-        error_y = cy - (H // 2)
+        # Only search inside the ROI (a view, not a copy)
+        search, x0, y0 = crop(frame_bgr, roi)
+        with PROFILER.stage("face.gray"):
+            if shared is not None:
+                gray = crop(shared.gray(), roi)[0]
+            else:
+                gray = cv.cvtColor(search, cv.COLOR_BGR2GRAY, dst=self.pool.get("gray", search.shape[:2]))
 
-        if abs(error_x) < self.deadband_px:
-            error_x = 0
-        if abs(error_y) < self.deadband_px:
-            error_y = 0
+        with PROFILER.stage("face.cascade"):
+            faces = self.face_cascade.detectMultiScale(
+                gray,
+                scaleFactor=self.scale_factor,
+                minNeighbors=self.min_neighbors,
+                minSize=self.min_size,
+            )
 
-        result.update({
-            "found": True,
-            "bbox": (int(x), int(y), int(w), int(h)),
-            "center": (int(cx), int(cy)),
-            "raw_center": (int(cx), int(cy)),
-            "error": (int(error_x), int(error_y)),
-            "area": int(w * h),
-        })
+        if len(faces) == 0:
+            return empty_result()
 
-        return result
+        # Back to full-frame coordinates; choose largest detected face
+        detections = offset_detections(faces, x0, y0)
+        return bbox_result(detections[0], (W, H), self.deadband_px, detections=detections)
@@ -0,0 +1,142 @@
+# vision/fused_tracker.py
+"""
+Fused multi-mode tracking (TRACK_MODE = "fused").
+
+The detectors in config.FUSED_CHAIN run in order, cheapest first, and each
+one only searches inside the (padded) detections of the one before it:
+["colour", "face"] looks for faces only inside colour blobs. They all read
+gray/HSV/downscaled images from one SharedFrame, so no conversion is done
+twice per frame, and FUSED_SCALES lets a gate run on a smaller pyramid level.
+
+The result is the best box of the deepest detector that found something,
+with each detector's confidence along the way in result["detector_confidence"]
+(0 for detectors that didn't confirm it) and their mean in result["confidence"].
+"""
+
+import config
+from perf.profiler import PROFILER
+from vision.multi_target import iou
+from vision.results import empty_result, bbox_result
+from vision.shared_frame import SharedFrame
+
+
+def _make_detector(name, scale):
+    if name == "colour":
+        from vision.colour_tracker import ColourTracker
+        return ColourTracker(scale=scale)
+    if name == "face":
+        from vision.face_tracker import FaceTracker
+        return FaceTracker(scale=scale)
+    if name == "person":
+        from vision.person_tracker import PersonTracker
+        return PersonTracker()
+    if name == "dnn":
+        from vision.dnn_tracker import DnnTracker
+        return DnnTracker()
+    raise ValueError(f"Unknown FUSED_CHAIN detector: {name}")
+
+
+class FusedTracker:
+    def __init__(self, chain=None, scale=1.0):
+        chain = chain or getattr(config, "FUSED_CHAIN", ["colour", "face"])
+        levels = getattr(config, "FUSED_SCALES", {})
+        self.names = [n.lower() for n in chain]
+        self.levels = {n: float(levels.get(n, 1.0)) for n in self.names}
+        self.pad = float(getattr(config, "FUSED_PAD", 0.5))
+        self.max_regions = int(getattr(config, "FUSED_MAX_REGIONS", 3))
+        self.require_all = bool(getattr(config, "FUSED_REQUIRE_ALL", False))
+        self.deadband_px = config.DEADBAND_PX
+
+        self.detectors = [_make_detector(n, scale * self.levels[n]) for n in self.names]
+        self.shared = SharedFrame()
+
+        # perf.governor only needs the number of levels; set_quality() forwards
+        n_levels = max((len(d.QUALITY_LEVELS) for d in self.detectors if hasattr(d, "QUALITY_LEVELS")), default=1)
+        self.QUALITY_LEVELS = [{}] * n_levels
+
+    def set_scale(self, scale):
+        for name, det in zip(self.names, self.detectors):
+            if hasattr(det, "set_scale"):
+                det.set_scale(scale * self.levels[name])
+
+    def set_quality(self, level):
+        for det in self.detectors:
+            if hasattr(det, "set_quality"):
+                det.set_quality(level)
+
+    def close(self):
+        for det in self.detectors:
+            close = getattr(det, "close", None)
+            if close is not None:
+                close()
+
+    def _pad_box(self, box, W, H):
+        x, y, w, h = box
+        px, py = int(w * self.pad), int(h * self.pad)
+        x0, y0 = max(0, x - px), max(0, y - py)
+        x1, y1 = min(W, x + w + px), min(H, y + h + py)
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def _run_stage(self, name, det, regions):
+        """Runs one detector over the regions; returns [(box, confidence, parent)] in frame coordinates."""
+        level = self.levels[name]
+        view = self.shared.at(level)
+        found = []
+        extra = {}
+        for region, parent in regions:
+            r = None if region is None else tuple(int(v * level) for v in region)
+            if name == "dnn":
+                res = det.process(view.bgr, roi=r)
+            else:
+                res = det.process(view.bgr, roi=r, shared=view)
+            if name == "colour" and "mask" not in extra:
+                extra = {"mask": res.get("mask"), "color": res.get("color")}
+            conf = float(res.get("confidence", 1.0))
+            for box in res.get("detections") or []:
+                box = tuple(int(v / level) for v in box)
+                # Padded regions overlap: don't count the same target twice
+                if any(iou(box, f[0]) > 0.7 for f in found):
+                    continue
+                found.append((box, conf, parent))
+        found.sort(key=lambda f: f[0][2] * f[0][3], reverse=True)
+        return found, extra
+
+    def process(self, frame_bgr, roi=None):
+        H, W = frame_bgr.shape[:2]
+        self.shared.reset(frame_bgr)
+
+        regions = [(roi, None)]  # (search region, index of the detection it came from)
+        stages = []
+        extra = {}
+        for name, det in zip(self.names, self.detectors):
+            with PROFILER.stage(f"fused.{name}"):
+                found, stage_extra = self._run_stage(name, det, regions)
+            extra.update(stage_extra)
+            if not found:
+                break
+            stages.append(found)
+            regions = [(self._pad_box(f[0], W, H), i) for i, f in enumerate(found[:self.max_regions])]
+
+        confidence = {name: 0.0 for name in self.names}
+        if not stages or (self.require_all and len(stages) < len(self.names)):
+            result = empty_result(extra.get("mask"))
+            result["detector_confidence"] = confidence
+            return result
+
+        # Walk back from the deepest detection through the gates that led to it
+        index = 0
+        for depth in range(len(stages) - 1, -1, -1):
+            _, conf, parent = stages[depth][index]
+            confidence[self.names[depth]] = conf
+            index = parent
+
+        final = stages[-1]
+        result = bbox_result(final[0][0], (W, H), self.deadband_px, mask=extra.get("mask"),
+                             detections=[f[0] for f in final])
+        result.update({
+            "confidence": sum(confidence.values()) / len(confidence),
+            "detector_confidence": confidence,
+            "stage": self.names[len(stages) - 1],
+            "color": extra.get("color"),
+        })
+        return result
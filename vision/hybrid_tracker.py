@@ -0,0 +1,199 @@
+# vision/hybrid_tracker.py
+import cv2 as cv
+import config
+from vision.results import bbox_result
+
+
+def _clip_bbox(bbox, W, H):
+    x, y, w, h = (int(v) for v in bbox)
+    x = max(0, min(W - 1, x))
+    y = max(0, min(H - 1, y))
+    w = max(1, min(W - x, w))
+    h = max(1, min(H - y, h))
+    return x, y, w, h
+
+
+def _make_cv_tracker(kind):
+    # OpenCV moved KCF/CSRT around between versions (cv, cv.legacy, contrib only)
+    name = f"Tracker{kind.upper()}_create"
+    for ns in (cv, getattr(cv, "legacy", None)):
+        factory = getattr(ns, name, None) if ns is not None else None
+        if factory is not None:
+            try:
+                return factory()
+            except cv.error:
+                pass
+    return None
+
+
+class _CvFollower:
+    """OpenCV KCF/CSRT tracker. Reports confidence 1.0 on success, 0.0 on loss."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self._tracker = None
+
+    def init(self, frame_bgr, bbox):
+        self._tracker = _make_cv_tracker(self.kind)
+        self._tracker.init(frame_bgr, tuple(int(v) for v in bbox))
+
+    def update(self, frame_bgr):
+        ok, bbox = self._tracker.update(frame_bgr)
+        if not ok:
+            return None, 0.0
+        return bbox, 1.0
+
+
+class _TemplateFollower:
+    """
+    Normalised cross-correlation template match in a window around the
+    last position. Only the window is converted to gray, so this stays cheap.
+    """
+
+    def __init__(self, search_scale=2.0):
+        self.search_scale = search_scale
+        self._template = None
+        self._bbox = None
+
+    def init(self, frame_bgr, bbox):
+        H, W = frame_bgr.shape[:2]
+        x, y, w, h = _clip_bbox(bbox, W, H)
+        self._template = cv.cvtColor(frame_bgr[y:y + h, x:x + w], cv.COLOR_BGR2GRAY)
+        self._bbox = (x, y, w, h)
+
+    def update(self, frame_bgr):
+        H, W = frame_bgr.shape[:2]
+        x, y, w, h = self._bbox
+
+        # Search window centred on the last bbox
+        pad_x = int(w * (self.search_scale - 1) / 2) + 1
+        pad_y = int(h * (self.search_scale - 1) / 2) + 1
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1, y1 = min(W, x + w + pad_x), min(H, y + h + pad_y)
+        th, tw = self._template.shape[:2]
+        if x1 - x0 < tw or y1 - y0 < th:
+            return None, 0.0
+
+        window = cv.cvtColor(frame_bgr[y0:y1, x0:x1], cv.COLOR_BGR2GRAY)
+        scores = cv.matchTemplate(window, self._template, cv.TM_CCOEFF_NORMED)
+        _, score, _, (mx, my) = cv.minMaxLoc(scores)
+
+        self._bbox = (x0 + mx, y0 + my, tw, th)
+        return self._bbox, float(score)
+
+
+def make_follower(kind=None):
+    kind = (kind or getattr(config, "TRACK_FOLLOWER", "auto")).lower()
+
+    if kind == "auto":
+        for candidate in ("kcf", "csrt"):
+            if _make_cv_tracker(candidate) is not None:
+                return _CvFollower(candidate)
+        return _TemplateFollower()
+
+    if kind in ("kcf", "csrt"):
+        if _make_cv_tracker(kind) is None:
+            raise RuntimeError(f"OpenCV build has no {kind.upper()} tracker (install opencv-contrib-python)")
+        return _CvFollower(kind)
+
+    if kind == "template":
+        return _TemplateFollower()
+
+    raise ValueError(f"Unknown TRACK_FOLLOWER: {kind}")
+
+
+def _observe_chain(tracker, result):
+    # Tell every layer below that supports it where the follower put the target
+    while tracker is not None:
+        observe = getattr(tracker, "observe", None)
+        if observe is not None:
+            observe(result)
+        tracker = getattr(tracker, "tracker", None)
+
+
+class DetectTrackTracker:
+    """
+    Runs an expensive detector (FaceTracker / PersonTracker) every N frames,
+    or as soon as lock is lost, and follows the target with a cheap
+    follower in between. Returns the same result dict as the detector.
+    """
+
+    def __init__(self, detector, detect_every=None, min_confidence=None, follower=None):
+        self.tracker = detector
+        self.detect_every = max(1, int(detect_every or getattr(config, "DETECT_EVERY_N", 5)))
+        self.min_confidence = float(
+            min_confidence if min_confidence is not None
+            else getattr(config, "TRACK_MIN_CONFIDENCE", 0.5)
+        )
+        self.deadband_px = config.DEADBAND_PX
+
+        self.follower = follower or make_follower()
+        self._locked = False
+        self._carry = {}  # per-target fields of the last detection, kept on follower frames
+        self._since_detect = 0
+
+        # Stats
+        self.detect_frames = 0
+        self.track_frames = 0
+        self.last_confidence = 0.0
+
+    @property
+    def detect_ratio(self):
+        total = self.detect_frames + self.track_frames
+        return self.detect_frames / total if total else 0.0
+
+    def _detect(self, frame_bgr, roi=None):
+        self.detect_frames += 1
+        self._since_detect = 0
+
+        result = self.tracker.process(frame_bgr, roi=roi)
+        self._locked = bool(result.get("found"))
+        if self._locked:
+            self.follower.init(frame_bgr, result["bbox"])
+            self.last_confidence = 1.0
+            self._carry = {k: result[k] for k in ("target_id", "color") if result.get(k) is not None}
+        else:
+            self.last_confidence = 0.0
+
+        result["tracking"] = "detect"
+        result["confidence"] = self.last_confidence
+        return result
+
+    def process(self, frame_bgr, roi=None):
+        if not self._locked or self._since_detect >= self.detect_every - 1:
+            return self._detect(frame_bgr, roi)
+
+        bbox, confidence = self.follower.update(frame_bgr)
+        self.last_confidence = confidence
+
+        # Lost lock or low confidence: re-detect on this same frame
+        if bbox is None or confidence < self.min_confidence:
+            self._locked = False
+            return self._detect(frame_bgr, roi)
+
+        self.track_frames += 1
+        self._since_detect += 1
+
+        H, W = frame_bgr.shape[:2]
+        result = bbox_result(_clip_bbox(bbox, W, H), (W, H), self.deadband_px)
+        # Same target as the last detection: keep its id (distance/Kalman state is per id)
+        result.update(self._carry)
+
+        # Keep wrapped layers (ROI window, target tracks) following the target
+        _observe_chain(self.tracker, result)
+
+        result["tracking"] = "track"
+        result["confidence"] = confidence
+        return result
+
+    def rescale(self, k):
+        # The follower's model is in the old pixels: re-detect on the next frame
+        self._locked = False
+
+    def stats(self):
+        return {
+            "detect_frames": self.detect_frames,
+            "track_frames": self.track_frames,
+            "detect_ratio": self.detect_ratio,
+            "confidence": self.last_confidence,
+        }
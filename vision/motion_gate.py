@@ -0,0 +1,129 @@
+# vision/motion_gate.py
+"""
+Motion gating in front of tracker.process().
+
+Each frame is shrunk to MOTION_GATE_SIZE and compared against a
+running-average background, per colour channel (a coloured target can have
+the same brightness as the background, so gray alone would miss it). If
+fewer than MOTION_MIN_PIXELS changed, the detector is skipped and the
+previous result reused (at most MOTION_MAX_SKIP frames in a row, so a
+static target is still re-checked). A locked target that moved more than
+MOTION_LOCK_STILL_PX between its last two detections is never skipped.
+When nothing is locked, the changed region is handed to the detector as
+its ROI instead of searching the whole frame.
+
+Reused results carry "skipped": True; main.py doesn't feed them to the
+servos, the Kalman filter or the distance smoothing, they are not new
+measurements.
+"""
+
+import cv2 as cv
+import numpy as np
+import config
+from perf.profiler import PROFILER
+from vision.buffers import FramePool
+
+
+class MotionGatedTracker:
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.gate_size = tuple(getattr(config, "MOTION_GATE_SIZE", (160, 120)))
+        self.threshold = int(getattr(config, "MOTION_THRESHOLD", 18))
+        self.min_pixels = int(getattr(config, "MOTION_MIN_PIXELS", 20))
+        self.max_skip = int(getattr(config, "MOTION_MAX_SKIP", 15))
+        self.bg_alpha = float(getattr(config, "MOTION_BG_ALPHA", 0.05))
+        self.roi_pad = float(getattr(config, "MOTION_ROI_PAD", 0.5))
+        self.lock_still_px = float(getattr(config, "MOTION_LOCK_STILL_PX", 2.0))
+
+        self.pool = FramePool()
+        self._background = None  # float32 running average
+        self._last = None
+        self._last_shift = 0.0  # how far the target moved between the last two detections (px)
+        self._skipped_in_row = 0
+
+        # Stats
+        self.frames = 0
+        self.skipped = 0
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def _changed_region(self, frame_bgr):
+        """Returns (changed_pixels, bbox of change in frame coordinates or None)."""
+        gw, gh = self.gate_size
+        small = cv.resize(frame_bgr, (gw, gh), dst=self.pool.get("small", (gh, gw, 3)), interpolation=cv.INTER_AREA)
+
+        if self._background is None:
+            self._background = small.astype("float32")
+            return gw * gh, None
+
+        bg = cv.convertScaleAbs(self._background, dst=self.pool.get("bg", (gh, gw, 3)))
+        diff3 = cv.absdiff(small, bg, dst=self.pool.get("diff3", (gh, gw, 3)))
+        # Largest change over B, G, R: catches hue changes at equal brightness
+        diff = np.maximum(diff3[..., 0], diff3[..., 1], out=self.pool.get("diff", (gh, gw)))
+        np.maximum(diff, diff3[..., 2], out=diff)
+        cv.threshold(diff, self.threshold, 255, cv.THRESH_BINARY, dst=diff)
+        changed = cv.countNonZero(diff)
+
+        # Slowly absorb lighting changes and parked objects into the background
+        cv.accumulateWeighted(small, self._background, self.bg_alpha)
+
+        if changed < self.min_pixels:
+            return changed, None
+
+        x, y, w, h = cv.boundingRect(diff)
+        H, W = frame_bgr.shape[:2]
+        kx, ky = W / gw, H / gh
+        pad_w, pad_h = w * self.roi_pad, h * self.roi_pad
+        return changed, (
+            int((x - pad_w) * kx), int((y - pad_h) * ky),
+            int((w + 2 * pad_w) * kx), int((h + 2 * pad_h) * ky),
+        )
+
+    @property
+    def takes_small(self):
+        return getattr(self.tracker, "takes_small", False)
+
+    def process(self, frame_bgr, roi=None, small=None):
+        self.frames += 1
+
+        with PROFILER.stage("motion_gate"):
+            changed, region = self._changed_region(frame_bgr)
+
+        static = changed < self.min_pixels
+        # A locked target that is moving gets detected every frame
+        moving = self._last is not None and self._last.get("found") and self._last_shift > self.lock_still_px
+        if static and not moving and self._last is not None and self._skipped_in_row < self.max_skip:
+            self.skipped += 1
+            self._skipped_in_row += 1
+            result = dict(self._last)
+            result["skipped"] = True
+            result["motion_px"] = changed
+            return result
+        self._skipped_in_row = 0
+
+        # Nothing locked: only look where something moved
+        if roi is None and region is not None and not (self._last and self._last.get("found")):
+            roi = region
+
+        kwargs = {"roi": roi}
+        if small is not None:
+            kwargs["small"] = small
+        result = self.tracker.process(frame_bgr, **kwargs)
+        # A pipelined detector may itself hand back an old result
+        result["skipped"] = bool(result.get("skipped"))
+        result["motion_px"] = changed
+        if result["skipped"]:
+            return result
+        self._last_shift = 0.0
+        if result.get("found") and self._last is not None and self._last.get("found"):
+            (ax, ay), (bx, by) = self._last["center"], result["center"]
+            self._last_shift = max(abs(ax - bx), abs(ay - by))
+        # A copy: main.predict_motion leads the returned dict in place, and
+        # skipped frames must repeat (and compare against) the raw detection
+        self._last = dict(result)
+        return result
+
+    def stats(self):
+        return {"frames": self.frames, "skipped": self.skipped, "skip_ratio": self.skip_ratio}
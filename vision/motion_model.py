@@ -0,0 +1,160 @@
+# vision/motion_model.py
+"""
+Shared target state estimation.
+
+A constant-velocity Kalman filter over the target centre. MotionPredictor
+runs every tracker's result through it, shifts the centre forward by the
+measured pipeline latency (plus KALMAN_LEAD_S) so the servos lead the
+target, and coasts through short detection drop-outs.
+"""
+
+import time
+
+import numpy as np
+import config
+from vision.results import apply_deadband
+
+
+class ConstantVelocityKalman:
+    """State [x, y, vx, vy] in pixels and pixels/second."""
+
+    def __init__(self, process_noise=None, measurement_noise=None):
+        # Process noise: white acceleration (px/s^2), measurement noise: px
+        self.q = float(process_noise if process_noise is not None else getattr(config, "KALMAN_PROCESS_NOISE", 800.0))
+        r = float(measurement_noise if measurement_noise is not None else getattr(config, "KALMAN_MEASUREMENT_NOISE", 6.0))
+
+        self.x = np.zeros(4)
+        self.P = np.eye(4)
+        self.H = np.array([[1.0, 0, 0, 0], [0, 1.0, 0, 0]])
+        self.R = np.eye(2) * (r * r)
+        self.initialized = False
+
+    def reset(self, x=None, y=None):
+        self.initialized = x is not None
+        self.x[:] = 0.0
+        self.P = np.diag([100.0, 100.0, 1e5, 1e5])
+        if x is not None:
+            self.x[0], self.x[1] = x, y
+
+    def predict(self, dt):
+        if dt <= 0:
+            return
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+
+        # Discrete white-noise acceleration model
+        dt2, dt3, dt4 = dt * dt, dt ** 3, dt ** 4
+        q = self.q * self.q
+        Q = np.array([
+            [dt4 / 4, 0, dt3 / 2, 0],
+            [0, dt4 / 4, 0, dt3 / 2],
+            [dt3 / 2, 0, dt2, 0],
+            [0, dt3 / 2, 0, dt2],
+        ]) * q
+
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + Q
+
+    def update(self, zx, zy):
+        z = np.array([zx, zy], dtype=np.float64)
+        y = z - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(4) - K @ self.H) @ self.P
+
+    def position_in(self, ahead_s):
+        """Position ahead_s seconds after the current state, without changing it."""
+        return (
+            self.x[0] + self.x[2] * ahead_s,
+            self.x[1] + self.x[3] * ahead_s,
+        )
+
+    @property
+    def velocity(self):
+        return float(self.x[2]), float(self.x[3])
+
+
+class MotionPredictor:
+    """Filters tracker results and leads the target by the pipeline latency."""
+
+    def __init__(self, lead_s=None, max_coast=None):
+        self.lead_s = float(lead_s if lead_s is not None else getattr(config, "KALMAN_LEAD_S", 0.03))
+        self.max_coast = int(max_coast if max_coast is not None else getattr(config, "KALMAN_MAX_COAST", 5))
+        self.deadband_px = config.DEADBAND_PX
+
+        self.kf = ConstantVelocityKalman()
+        self._t_last = None
+        self._bbox_size = None
+        self._target_id = None
+        self.coasting = 0
+
+    def reconfigure(self, changed=None):
+        """Re-reads the deadband after a live config change (runtime_config)."""
+        self.deadband_px = config.DEADBAND_PX
+
+    def reset(self):
+        self.kf.reset()
+        self._t_last = None
+        self.coasting = 0
+
+    def filter(self, result, frame_size, latency_s=0.0, now=None):
+        """
+        result     tracker result dict (modified in place and returned)
+        frame_size (W, H) of the frame the result is in
+        latency_s  capture -> now delay (frame age + processing time)
+        """
+        now = time.monotonic() if now is None else now
+        t_meas = now - latency_s  # when the frame was captured
+
+        # Multi-target: a new target ID must not inherit the old one's motion
+        target_id = result.get("target_id")
+        if target_id is not None:
+            if target_id != self._target_id:
+                self.reset()
+            self._target_id = target_id
+
+        if result.get("found") and result.get("center") is not None:
+            cx, cy = result.get("raw_center") or result["center"]
+            if not self.kf.initialized:
+                self.kf.reset(cx, cy)
+            else:
+                self.kf.predict(t_meas - self._t_last)
+                self.kf.update(cx, cy)
+            self._t_last = t_meas
+            self._bbox_size = result["bbox"][2:] if result.get("bbox") else self._bbox_size
+            self.coasting = 0
+        elif self.kf.initialized and self.coasting < self.max_coast:
+            # Short drop-out: keep following the predicted motion
+            self.kf.predict(t_meas - self._t_last)
+            self._t_last = t_meas
+            self.coasting += 1
+        else:
+            self.reset()
+            result["coasting"] = False
+            return result
+
+        # Lead the target by the latency since capture plus actuation lead
+        px, py = self.kf.position_in(latency_s + self.lead_s)
+        W, H = frame_size
+        px = int(np.clip(px, 0, W - 1))
+        py = int(np.clip(py, 0, H - 1))
+
+        result["measured_center"] = result.get("center")
+        result["center"] = (px, py)
+        result["velocity"] = self.kf.velocity
+        result["coasting"] = self.coasting > 0
+
+        if self.coasting:
+            # Move the last bbox with the prediction so overlays/distance still work
+            w, h = self._bbox_size or (0, 0)
+            result.update({
+                "found": True,
+                "bbox": (px - w // 2, py - h // 2, int(w), int(h)),
+                "raw_center": (px, py),
+                "area": int(w * h),
+            })
+
+        error_x, error_y = apply_deadband(px - (W // 2), py - (H // 2), self.deadband_px)
+        result["error"] = (int(error_x), int(error_y))
+        return result
@@ -0,0 +1,244 @@
+# vision/multi_target.py
+"""
+Multi-target tracking with persistent IDs.
+
+MultiTargetTracker wraps a base tracker, associates its "detections" to
+existing tracks every frame and picks which track the servos follow, so
+the lock no longer jumps to whichever detection happens to be largest.
+
+Association is greedy on IoU/centroid distance. Candidate pairs come from
+a spatial grid (only tracks in neighbouring cells are compared), then get
+sorted by cost, so a frame costs O((n + m) + k log k) for k nearby pairs
+instead of building the full n x m matrix.
+"""
+
+import math
+
+import config
+from vision.results import bbox_result, empty_result
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _center(b):
+    return b[0] + b[2] / 2.0, b[1] + b[3] / 2.0
+
+
+def _searched(bbox, roi):
+    # Was the track's centre inside the search window (None = full frame)?
+    if roi is None:
+        return True
+    cx, cy = _center(bbox)
+    x, y, w, h = roi
+    return x <= cx < x + w and y <= cy < y + h
+
+
+class Track:
+    __slots__ = ("id", "bbox", "velocity", "hits", "misses", "age", "matched")
+
+    def __init__(self, track_id, bbox):
+        self.id = track_id
+        self.bbox = tuple(bbox)
+        self.velocity = (0.0, 0.0)
+        self.hits = 1
+        self.misses = 0
+        self.age = 1
+        self.matched = True  # detected in the current frame
+
+    def predicted_bbox(self):
+        x, y, w, h = self.bbox
+        vx, vy = self.velocity
+        return (x + vx, y + vy, w, h)
+
+    def correct(self, bbox):
+        (px, py), (nx, ny) = _center(self.bbox), _center(bbox)
+        ovx, ovy = self.velocity
+        self.velocity = (0.5 * ovx + 0.5 * (nx - px), 0.5 * ovy + 0.5 * (ny - py))
+        self.bbox = tuple(bbox)
+        self.hits += 1
+        self.misses = 0
+        self.matched = True
+
+    def rescale(self, k):
+        self.bbox = tuple(v * k for v in self.bbox)
+        self.velocity = (self.velocity[0] * k, self.velocity[1] * k)
+
+    def as_dict(self):
+        return {"id": self.id, "bbox": tuple(int(v) for v in self.bbox), "age": self.age, "hits": self.hits}
+
+
+class MultiTargetTracker:
+    """
+    Policies for which track the servos follow (config.MOT_POLICY):
+        "sticky"   keep the current target while it lives, then the largest
+        "largest"  biggest confirmed track every frame
+        "nearest"  confirmed track closest to the frame centre
+        "oldest"   longest-lived confirmed track
+    """
+
+    def __init__(self, tracker, policy=None):
+        self.tracker = tracker
+        self.policy = (policy or getattr(config, "MOT_POLICY", "sticky")).lower()
+        self.min_iou = float(getattr(config, "MOT_MIN_IOU", 0.2))
+        self.gate_px = float(getattr(config, "MOT_GATE_PX", 120))
+        self.min_hits = int(getattr(config, "MOT_MIN_HITS", 2))
+        self.max_misses = int(getattr(config, "MOT_MAX_MISSES", 10))
+        self.deadband_px = config.DEADBAND_PX
+
+        self.tracks = []
+        self.target_id = None
+        self._next_id = 1
+        self._last_out = None  # repeated when the detector has nothing new
+
+    # ----------------------------
+    # Association
+    # ----------------------------
+    def _candidate_pairs(self, detections):
+        """(cost, track_index, detection_index) for pairs that pass the gate."""
+        cell = max(1.0, self.gate_px)
+        grid = {}
+        for ti, t in enumerate(self.tracks):
+            cx, cy = _center(t.predicted_bbox())
+            grid.setdefault((int(cx // cell), int(cy // cell)), []).append(ti)
+
+        pairs = []
+        for di, d in enumerate(detections):
+            dx, dy = _center(d)
+            gx, gy = int(dx // cell), int(dy // cell)
+            for ox in (-1, 0, 1):
+                for oy in (-1, 0, 1):
+                    for ti in grid.get((gx + ox, gy + oy), ()):
+                        pred = self.tracks[ti].predicted_bbox()
+                        overlap = iou(pred, d)
+                        tx, ty = _center(pred)
+                        dist = math.hypot(dx - tx, dy - ty)
+                        if overlap < self.min_iou and dist > self.gate_px:
+                            continue
+                        # Lower is better: IoU dominates, distance breaks ties
+                        pairs.append((1.0 - overlap + dist / (10.0 * self.gate_px), ti, di))
+        return pairs
+
+    def _associate(self, detections, roi=None):
+        pairs = self._candidate_pairs(detections)
+        pairs.sort()
+        for t in self.tracks:
+            t.matched = False
+
+        used_tracks, used_dets = set(), set()
+        for _, ti, di in pairs:
+            if ti in used_tracks or di in used_dets:
+                continue
+            used_tracks.add(ti)
+            used_dets.add(di)
+            self.tracks[ti].correct(detections[di])
+
+        # Death: unmatched tracks age out (only where the detector looked)
+        for ti, t in enumerate(self.tracks):
+            t.age += 1
+            if ti not in used_tracks and _searched(t.bbox, roi):
+                t.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        # Birth: unmatched detections start new tracks
+        for di, d in enumerate(detections):
+            if di not in used_dets:
+                self.tracks.append(Track(self._next_id, d))
+                self._next_id += 1
+
+    # ----------------------------
+    # Target selection
+    # ----------------------------
+    def _choose(self, frame_size):
+        # Only tracks detected this frame: one outside the search window keeps
+        # misses == 0 but its bbox is stale
+        live = [t for t in self.tracks if t.matched and t.hits >= self.min_hits]
+        if not live:
+            # Nothing confirmed yet: accept a brand-new track so we don't wait on startup
+            live = [t for t in self.tracks if t.matched]
+        if not live:
+            return None
+
+        if self.policy == "sticky":
+            for t in live:
+                if t.id == self.target_id:
+                    return t
+            return max(live, key=lambda t: t.bbox[2] * t.bbox[3])
+        if self.policy == "largest":
+            return max(live, key=lambda t: t.bbox[2] * t.bbox[3])
+        if self.policy == "nearest":
+            W, H = frame_size
+            return min(live, key=lambda t: math.hypot(_center(t.bbox)[0] - W / 2, _center(t.bbox)[1] - H / 2))
+        if self.policy == "oldest":
+            return max(live, key=lambda t: t.age)
+        raise ValueError(f"Unknown MOT_POLICY: {self.policy}")
+
+    # ----------------------------
+    # Tracker API
+    # ----------------------------
+    def process(self, frame_bgr, roi=None):
+        H, W = frame_bgr.shape[:2]
+        result = self.tracker.process(frame_bgr, roi=roi)
+        if result.get("skipped"):
+            # Pipelined detector with no new result: the tracks stay as they are
+            out = dict(self._last_out or result)
+            out["tracks"] = [t.as_dict() for t in self.tracks if t.matched]
+            out["skipped"] = True
+            return out
+
+        detections = result.get("detections")
+        if detections is None:
+            detections = [result["bbox"]] if result.get("found") else []
+        self._associate(detections, roi)
+
+        target = self._choose((W, H))
+        select = getattr(self.tracker, "select", None)
+        self.target_id = target.id if target is not None else None
+
+        tracks = [t.as_dict() for t in self.tracks if t.matched]
+        if target is None:
+            out = empty_result(result.get("mask"))
+        elif tuple(target.bbox) == tuple(result.get("bbox") or ()):
+            # Detector's own pick is the target: keep its (possibly smoothed) fields
+            out = result
+        elif select is not None:
+            # The target was matched this frame, so its bbox should be one of
+            # the detections: let the detector rebuild its fields (colour,
+            # raw centre, smoothing) for it
+            boxes = [tuple(d) for d in detections]
+            if tuple(target.bbox) in boxes:
+                out = select(result, boxes.index(tuple(target.bbox)))
+            else:
+                out = empty_result(result.get("mask"))
+        else:
+            out = bbox_result(target.bbox, (W, H), self.deadband_px,
+                              mask=result.get("mask"), detections=detections)
+
+        for key in ("roi", "labels", "pipeline_delay_s", "frame_seq"):
+            if key in result and key not in out:
+                out[key] = result[key]
+        out["tracks"] = tracks
+        out["target_id"] = self.target_id
+        self._last_out = dict(out)
+        return out
+
+    def observe(self, result):
+        """A follower moved the target between detections: keep its track in step."""
+        if not result.get("found") or self.target_id is None:
+            return
+        for t in self.tracks:
+            if t.id == self.target_id:
+                t.correct(result["bbox"])
+                return
+
+    def rescale(self, k):
+        """Detection image resized by k (ScaledTracker.set_scale): tracks keep their ids."""
+        for t in self.tracks:
+            t.rescale(k)
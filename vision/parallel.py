@@ -0,0 +1,182 @@
+# vision/parallel.py
+"""
+Parallel detection across CPU cores.
+
+ParallelDetector pipelines consecutive frames over worker processes: frame
+N goes to one worker while frame N+1 goes to the next, and results are
+handed back strictly in frame order. Frames travel through a shared-memory
+ring (one memcpy in, nothing pickled); only the small result dicts come
+back over a queue.
+
+Throughput scales with workers for the Haar and HOG modes. Latency stays
+at one detection time, and results lag capture by up to PARALLEL_WORKERS
+frames. "pipeline_delay_s" says how much earlier the result's frame was
+submitted than the frame just passed in, so main.py can date the result
+from its own capture time and the motion predictor can lead the target. A call that finds no new result hands
+back the last one marked "skipped": True, like a motion-gated frame, so it
+isn't counted as a second measurement.
+"""
+
+import multiprocessing as mp
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import config
+from vision.results import empty_result
+
+
+def _make_base_detector(mode, scale):
+    # Stateless detectors only: frames alternate between workers
+    mode = mode.lower()
+    if mode == "face":
+        from vision.face_tracker import FaceTracker
+        return FaceTracker(scale=scale)
+    if mode == "person":
+        from vision.person_tracker import PersonTracker
+        return PersonTracker()
+    raise ValueError(f"Unknown parallel detector mode: {mode}")
+
+
+def _worker(mode, scale, shm_name, slot_bytes, jobs, results):
+    import cv2 as cv
+
+    # One OpenCV thread per process; the processes are the parallelism
+    cv.setNumThreads(1)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    detector = _make_base_detector(mode, scale)
+    frame = None
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            seq, slot, shape, roi, deadband_px, job_scale = job
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+            detector.deadband_px = deadband_px
+            if job_scale != scale and hasattr(detector, "set_scale"):
+                # Governor changed the detection resolution: rescale min sizes
+                scale = job_scale
+                detector.set_scale(scale)
+            result = detector.process(frame, roi=roi)
+            # Masks/label maps are frame-sized: don't ship them back
+            result["mask"] = None
+            result.pop("labels", None)
+            results.put((seq, slot, result))
+    finally:
+        del frame
+        shm.close()
+
+
+class ParallelDetector:
+    def __init__(self, mode, scale=1.0, workers=None, frame_shape=None):
+        self.mode = mode
+        n = workers or getattr(config, "PARALLEL_WORKERS", 0) or max(1, (os.cpu_count() or 2) - 1)
+        self.workers = int(n)
+        self.deadband_px = config.DEADBAND_PX  # sent with every job (0 under ScaledTracker)
+        self.scale = float(scale)              # sent with every job too (set_scale)
+
+        W, H = config.PREVIEW_SIZE
+        self.frame_shape = tuple(frame_shape or (H, W, 3))
+        self.slot_bytes = int(np.prod(self.frame_shape))
+        self.n_slots = self.workers + 1
+
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * self.n_slots)
+        ctx = mp.get_context("spawn")  # don't fork a process that has camera threads
+        self._jobs = ctx.Queue()
+        self._results = ctx.Queue()
+        self._procs = [
+            ctx.Process(
+                target=_worker,
+                args=(mode, scale, self._shm.name, self.slot_bytes, self._jobs, self._results),
+                name=f"detector-{i}",
+                daemon=True,
+            )
+            for i in range(self.workers)
+        ]
+        for p in self._procs:
+            p.start()
+
+        self._free_slots = list(range(self.n_slots))
+        self._submitted = {}  # seq -> submit time
+        self._done = {}       # seq -> result, waiting for earlier frames
+        self._next_seq = 0    # next seq to submit
+        self._emit_seq = 0    # next seq to hand back
+        self._stale_seq = 0   # results for earlier seqs are in old pixel coordinates
+        self._last = empty_result()
+
+    def _collect(self, block):
+        try:
+            seq, slot, result = self._results.get(block=block, timeout=5.0 if block else None)
+        except queue.Empty:
+            if block:
+                raise RuntimeError("Parallel detector workers stopped responding")
+            return False
+        self._free_slots.append(slot)
+        self._done[seq] = result
+        return True
+
+    def process(self, frame_bgr, roi=None):
+        # Frames larger than a slot (e.g. PREVIEW_SIZE changed) can't be shared
+        if frame_bgr.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame {frame_bgr.shape} larger than shared slot {self.frame_shape}")
+
+        # Pipeline full: wait for the oldest frame to come back
+        fresh = False
+        while not self._free_slots or len(self._submitted) >= self.workers:
+            self._collect(block=True)
+            fresh |= self._drain_in_order()
+
+        slot = self._free_slots.pop()
+        shared = np.ndarray(frame_bgr.shape, dtype=np.uint8, buffer=self._shm.buf, offset=slot * self.slot_bytes)
+        np.copyto(shared, frame_bgr)
+
+        seq = self._next_seq
+        self._next_seq += 1
+        submitted = self._submitted[seq] = time.monotonic()
+        self._jobs.put((seq, slot, frame_bgr.shape, roi, self.deadband_px, self.scale))
+
+        # Pick up whatever else has finished without waiting
+        while self._collect(block=False):
+            pass
+        fresh |= self._drain_in_order()
+
+        result = dict(self._last)
+        result["skipped"] = not fresh
+        result["pipeline_delay_s"] = submitted - result.get("submitted_at", submitted)
+        return result
+
+    def _drain_in_order(self):
+        # True when a new result was handed over
+        fresh = False
+        while self._emit_seq in self._done:
+            result = self._done.pop(self._emit_seq)
+            submitted = self._submitted.pop(self._emit_seq)
+            result["submitted_at"] = submitted
+            result["frame_seq"] = self._emit_seq
+            if self._emit_seq >= self._stale_seq:
+                self._last = result
+                fresh = True
+            self._emit_seq += 1
+        return fresh
+
+    def set_scale(self, scale):
+        # Runtime resolution change (ScaledTracker.set_scale): workers pick it up per job
+        self.scale = float(scale)
+
+    def rescale(self, k):
+        # Detection image resized (ScaledTracker.set_scale): drop what is in flight
+        self._stale_seq = self._next_seq
+        self._last = empty_result()
+
+    def close(self):
+        for _ in self._procs:
+            self._jobs.put(None)
+        for p in self._procs:
+            p.join(timeout=2.0)
+            if p.is_alive():
+                p.terminate()
+        self._shm.close()
+        self._shm.unlink()
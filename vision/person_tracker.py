@@ -1,55 +1,54 @@
 # vision/person_tracker.py
 import cv2 as cv
 import config
+from perf.profiler import PROFILER
+from vision.results import empty_result, bbox_result, offset_detections
+from vision.roi import crop
 
 class PersonTracker:
+    # No per-frame state: safe to warm up with a blank frame
+    STATELESS = True
+
+    # Runtime quality ladder (0 = best), used by perf.governor
+    QUALITY_LEVELS = [
+        {"win_stride": (8, 8), "scale": 1.05},
+        {"win_stride": (12, 12), "scale": 1.1},
+        {"win_stride": (16, 16), "scale": 1.2},
+    ]
+
     def __init__(self):
         self.deadband_px = config.DEADBAND_PX
         self.hog = cv.HOGDescriptor()
         self.hog.setSVMDetector(cv.HOGDescriptor_getDefaultPeopleDetector())
-
-    def process(self, frame_bgr):
+        self.quality = 0
+        self.win_stride = (8, 8)
+        self.hog_scale = 1.05
+
+    def set_quality(self, level):
+        level = max(0, min(len(self.QUALITY_LEVELS) - 1, int(level)))
+        q = self.QUALITY_LEVELS[level]
+        self.quality = level
+        self.win_stride = q["win_stride"]
+        self.hog_scale = q["scale"]
+
+    def process(self, frame_bgr, roi=None, shared=None):
         H, W = frame_bgr.shape[:2]
 
-        rects, weights = self.hog.detectMultiScale(
-            frame_bgr, winStride=(8, 8), padding=(8, 8), scale=1.05
-        )
+        # Only search inside the ROI (a view, not a copy)
+        search, x0, y0 = crop(frame_bgr, roi)
+        if shared is not None:
+            # HOG on the shared gray image: one gradient channel instead of three
+            search = crop(shared.gray(), roi)[0]
 
-        # no real mask here; keep None or a blank mask if you prefer
-        mask = None
-
-        result = {
-            "found": False,
-            "bbox": None,
-            "center": None,
-            "raw_center": None,
-            "error": None,
-            "area": 0,
-            "mask": mask,
-        }
+        with PROFILER.stage("person.hog"):
+            rects, weights = self.hog.detectMultiScale(
+                search, winStride=self.win_stride, padding=(8, 8), scale=self.hog_scale
+            )
 
+        # no real mask here
         if len(rects) == 0:
-            return result
-
-        # choose largest
-        x, y, w, h = max(rects, key=lambda r: r[2] * r[3])
-        cx = x + w // 2
-        cy = y + h // 2
-
-        error_x = cx - (W // 2)
-        error_y = cy - (H // 2)
-
-        if abs(error_x) < self.deadband_px:
-            error_x = 0
-        if abs(error_y) < self.deadband_px:
-            error_y = 0
-
-        result.update({
-            "found": True,
-            "bbox": (int(x), int(y), int(w), int(h)),
-            "center": (int(cx), int(cy)),
-            "raw_center": (int(cx), int(cy)),
-            "error": (int(error_x), int(error_y)),
-            "area": int(w * h),
-        })
-        return result
+            return empty_result()
+
+        # Back to full-frame coordinates; choose largest
+        detections = offset_detections(rects, x0, y0)
+        return bbox_result(detections[0], (W, H), self.deadband_px, detections=detections)
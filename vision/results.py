@@ -0,0 +1,57 @@
+# vision/results.py
+"""
+Helpers for the result dict every tracker returns.
+
+Keys: found, bbox, center, raw_center, error, area, mask,
+detections (every bbox the detector accepted, largest first)
+"""
+
+
+def empty_result(mask=None):
+    return {
+        "found": False,
+        "bbox": None,
+        "center": None,
+        "raw_center": None,
+        "error": None,
+        "area": 0,
+        "mask": mask,
+        "detections": [],
+    }
+
+
+def apply_deadband(error_x, error_y, deadband_px):
+    if abs(error_x) < deadband_px:
+        error_x = 0
+    if abs(error_y) < deadband_px:
+        error_y = 0
+    return error_x, error_y
+
+
+def bbox_result(bbox, frame_size, deadband_px, mask=None, detections=None):
+    """Builds a found result from a bbox (x, y, w, h) in full-frame coordinates."""
+    W, H = frame_size
+    x, y, w, h = (int(v) for v in bbox)
+    cx = x + w // 2
+    cy = y + h // 2
+
+    error_x, error_y = apply_deadband(cx - (W // 2), cy - (H // 2), deadband_px)
+
+    result = empty_result(mask)
+    result.update({
+        "found": True,
+        "bbox": (x, y, w, h),
+        "center": (cx, cy),
+        "raw_center": (cx, cy),
+        "error": (int(error_x), int(error_y)),
+        "area": int(w * h),
+        "detections": detections if detections is not None else [(x, y, w, h)],
+    })
+    return result
+
+
+def offset_detections(rects, x0, y0):
+    """Detector rects (crop coordinates) -> full-frame bboxes, largest first."""
+    boxes = [(int(x + x0), int(y + y0), int(w), int(h)) for x, y, w, h in rects]
+    boxes.sort(key=lambda b: b[2] * b[3], reverse=True)
+    return boxes
@@ -0,0 +1,143 @@
+# vision/roi.py
+"""
+Region-of-interest search around the last known target.
+
+Trackers accept process(frame, roi=(x, y, w, h)) and only search inside
+that window, but always return bbox/center/error in full-frame coordinates.
+RoiTracker picks the window from the previous result and recent motion,
+and falls back to a full-frame search after ROI_MAX_MISSES misses (and,
+with full_every, on a fixed schedule).
+"""
+
+import config
+
+
+def clip_roi(roi, W, H):
+    """Clamps roi to the frame. Returns (x0, y0, x1, y1) or None for full frame."""
+    if roi is None:
+        return None
+    x, y, w, h = (int(v) for v in roi)
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(W, x + w), min(H, y + h)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    if x0 == 0 and y0 == 0 and x1 == W and y1 == H:
+        return None
+    return x0, y0, x1, y1
+
+
+def crop(frame, roi):
+    """Returns (view, x0, y0). The view shares memory with frame (no copy)."""
+    H, W = frame.shape[:2]
+    box = clip_roi(roi, W, H)
+    if box is None:
+        return frame, 0, 0
+    x0, y0, x1, y1 = box
+    return frame[y0:y1, x0:x1], x0, y0
+
+
+class SearchWindow:
+    """Tracks the last bbox + velocity and proposes the next search window."""
+
+    def __init__(self, expand=None, motion_gain=None, max_misses=None, min_size=None):
+        self.expand = float(expand if expand is not None else getattr(config, "ROI_EXPAND", 1.0))
+        self.motion_gain = float(motion_gain if motion_gain is not None else getattr(config, "ROI_MOTION_GAIN", 2.0))
+        self.max_misses = int(max_misses if max_misses is not None else getattr(config, "ROI_MAX_MISSES", 3))
+        self.min_size = min_size or getattr(config, "ROI_MIN_SIZE", (192, 192))
+
+        self.reset()
+
+    def reset(self):
+        self._bbox = None
+        self._velocity = (0.0, 0.0)
+        self.misses = 0
+
+    def update(self, result):
+        if not result.get("found"):
+            self.misses += 1
+            if self.misses >= self.max_misses:
+                self.reset()
+                self.misses = self.max_misses
+            return
+
+        bbox = result["bbox"]
+        if self._bbox is not None:
+            px, py, pw, ph = self._bbox
+            x, y, w, h = bbox
+            vx = (x + w / 2) - (px + pw / 2)
+            vy = (y + h / 2) - (py + ph / 2)
+            # Light smoothing so one jumpy frame doesn't blow up the window
+            ovx, ovy = self._velocity
+            self._velocity = (0.5 * ovx + 0.5 * vx, 0.5 * ovy + 0.5 * vy)
+        self._bbox = tuple(bbox)
+        self.misses = 0
+
+    def rescale(self, k):
+        # Detection image resized by k (ScaledTracker.set_scale)
+        if self._bbox is not None:
+            self._bbox = tuple(v * k for v in self._bbox)
+        self._velocity = (self._velocity[0] * k, self._velocity[1] * k)
+
+    def window(self):
+        """Next search window (x, y, w, h), or None for a full-frame search."""
+        if self._bbox is None:
+            return None
+
+        x, y, w, h = self._bbox
+        vx, vy = self._velocity
+
+        # Predict where the target will be and grow with motion and misses
+        cx = x + w / 2 + vx
+        cy = y + h / 2 + vy
+        grow = 1.0 + 0.5 * self.misses
+        half_w = (w / 2) * (1 + self.expand) * grow + self.motion_gain * abs(vx)
+        half_h = (h / 2) * (1 + self.expand) * grow + self.motion_gain * abs(vy)
+        half_w = max(half_w, self.min_size[0] / 2)
+        half_h = max(half_h, self.min_size[1] / 2)
+
+        return (int(cx - half_w), int(cy - half_h), int(2 * half_w), int(2 * half_h))
+
+
+class RoiTracker:
+    """Wraps any tracker whose process() accepts roi=, searching near the last target."""
+
+    def __init__(self, tracker, window=None, full_every=0):
+        self.tracker = tracker
+        self.window = window or SearchWindow()
+        self.full_every = int(full_every)
+        self._since_full = 0
+
+        # Stats
+        self.roi_frames = 0
+        self.full_frames = 0
+
+    def process(self, frame_bgr, roi=None):
+        if roi is None and not (self.full_every and self._since_full >= self.full_every - 1):
+            roi = self.window.window()
+
+        if roi is None:
+            self.full_frames += 1
+            self._since_full = 0
+        else:
+            self.roi_frames += 1
+            self._since_full += 1
+
+        result = self.tracker.process(frame_bgr, roi=roi)
+        if not result.get("skipped"):
+            # A repeated (pipelined) result says nothing new about the target
+            self.window.update(result)
+        return result
+
+    def observe(self, result):
+        # A follower moved the target between detections
+        self.window.update(result)
+
+    def rescale(self, k):
+        self.window.rescale(k)
+
+    def stats(self):
+        return {
+            "roi_frames": self.roi_frames,
+            "full_frames": self.full_frames,
+            "misses": self.window.misses,
+        }
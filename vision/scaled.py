@@ -0,0 +1,107 @@
+# vision/scaled.py
+"""
+Multi-resolution processing: detect on a small image, report in display coordinates.
+
+ScaledTracker downsizes the frame (or takes the camera's lores stream),
+runs the wrapped tracker on it and maps bbox/center/error back to the
+full-resolution frame. Pixel cost drops with the square of the scale.
+"""
+
+import cv2 as cv
+import config
+from vision.results import apply_deadband
+
+
+class ScaledTracker:
+    takes_small = True  # process() accepts the camera's lores frame
+
+    def __init__(self, tracker, scale=None):
+        self.tracker = tracker
+        self.scale = float(scale if scale is not None else getattr(config, "DETECT_SCALE", 1.0))
+        # The deadband is in display pixels: applied once, in _rescale
+        self.deadband_px = config.DEADBAND_PX
+        _no_deadband(tracker)
+        self._small = None  # reused resize buffer
+
+    def set_scale(self, scale):
+        # Runtime resolution change (perf.governor); detectors rescale their sizes
+        scale = float(scale)
+        if scale == self.scale:
+            return
+        k = scale / self.scale
+        self.scale = scale
+        detector_scaled = False
+        inner = self.tracker
+        while inner is not None:
+            if not detector_scaled and hasattr(inner, "set_scale"):
+                inner.set_scale(scale)
+                detector_scaled = True
+            # State kept in detection-image pixels (search window, tracks,
+            # follower, frames in flight) moves to the new resolution
+            rescale = getattr(inner, "rescale", None)
+            if rescale is not None:
+                rescale(k)
+            inner = getattr(inner, "tracker", None)
+
+    def _downscale(self, frame_bgr):
+        H, W = frame_bgr.shape[:2]
+        size = (max(1, int(W * self.scale)), max(1, int(H * self.scale)))
+        if self._small is None or self._small.shape[1::-1] != size:
+            self._small = None
+        self._small = cv.resize(frame_bgr, size, dst=self._small, interpolation=cv.INTER_AREA)
+        return self._small
+
+    def process(self, frame_bgr, roi=None, small=None):
+        H, W = frame_bgr.shape[:2]
+
+        # Use the lores stream when given, otherwise resize ourselves
+        if small is None:
+            small = self._downscale(frame_bgr)
+        sh, sw = small.shape[:2]
+        sx, sy = sw / W, sh / H
+
+        if roi is not None:
+            x, y, w, h = roi
+            roi = (int(x * sx), int(y * sy), int(w * sx), int(h * sy))
+
+        result = self.tracker.process(small, roi=roi)
+        return _rescale(result, 1 / sx, 1 / sy, self.deadband_px)
+
+
+def _no_deadband(tracker):
+    # Layers below report the error in detection-image pixels, undeadbanded
+    while tracker is not None:
+        if hasattr(tracker, "deadband_px"):
+            tracker.deadband_px = 0
+        for det in getattr(tracker, "detectors", ()):
+            _no_deadband(det)
+        tracker = getattr(tracker, "tracker", None)
+
+
+def _rescale(result, kx, ky, deadband_px):
+    """Maps a result from the detection image to the display frame (in place)."""
+    def pt(p):
+        return None if p is None else (int(p[0] * kx), int(p[1] * ky))
+
+    def box(b):
+        return None if b is None else (int(b[0] * kx), int(b[1] * ky), int(b[2] * kx), int(b[3] * ky))
+
+    result["bbox"] = box(result.get("bbox"))
+    if result.get("detections"):
+        result["detections"] = [box(b) for b in result["detections"]]
+    for t in result.get("tracks") or ():
+        t["bbox"] = box(t["bbox"])
+    result["center"] = pt(result.get("center"))
+    result["raw_center"] = pt(result.get("raw_center"))
+    if result.get("roi") is not None:
+        result["roi"] = box(result["roi"])
+    result["area"] = int(result.get("area", 0) * kx * ky)
+
+    # Scale the (possibly smoothed) error and apply the deadband in display px
+    if result.get("error") is not None:
+        ex, ey = result["error"]
+        error_x, error_y = apply_deadband(ex * kx, ey * ky, deadband_px)
+        result["error"] = (int(error_x), int(error_y))
+
+    result["detect_scale"] = (1 / kx, 1 / ky)
+    return result
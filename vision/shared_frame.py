@@ -0,0 +1,64 @@
+# vision/shared_frame.py
+"""
+Derived images of one frame, computed once and shared between detectors.
+
+    shared = SharedFrame()
+    shared.reset(frame_bgr)        # once per frame
+    shared.gray()                  # computed on first use, then reused
+    shared.at(0.5).hsv()           # same, on a half-size pyramid level
+
+Detectors that accept shared= (ColourTracker, FaceTracker, PersonTracker)
+read from it instead of redoing the conversion; see vision.fused_tracker.
+Buffers come from a FramePool, so nothing is allocated per frame.
+"""
+
+import cv2 as cv
+from vision.buffers import FramePool
+
+
+class SharedFrame:
+    def __init__(self, scale=1.0, pool=None):
+        self.scale = float(scale)  # relative to the frame given to reset()
+        self.pool = pool or FramePool()
+        self.bgr = None
+        self._cache = {}
+        self._levels = {}
+
+    def reset(self, frame_bgr):
+        self.bgr = frame_bgr
+        self._cache.clear()
+        for level in self._levels.values():
+            level.bgr = None
+
+    def _get(self, name, make):
+        img = self._cache.get(name)
+        if img is None:
+            img = self._cache[name] = make()
+        return img
+
+    def gray(self):
+        return self._get("gray", lambda: cv.cvtColor(
+            self.bgr, cv.COLOR_BGR2GRAY, dst=self.pool.get("gray", self.bgr.shape[:2])))
+
+    def blurred(self):
+        # Same 5x5 blur ColourTracker uses before HSV
+        return self._get("blur", lambda: cv.GaussianBlur(
+            self.bgr, (5, 5), 0, dst=self.pool.like("blur", self.bgr)))
+
+    def hsv(self):
+        return self._get("hsv", lambda: cv.cvtColor(
+            self.blurred(), cv.COLOR_BGR2HSV, dst=self.pool.like("hsv", self.bgr)))
+
+    def at(self, scale):
+        """The same frame downscaled by scale (pyramid level), as a SharedFrame."""
+        if scale >= 1.0:
+            return self
+        level = self._levels.get(scale)
+        if level is None:
+            level = self._levels[scale] = SharedFrame(self.scale * scale)
+        if level.bgr is None:
+            H, W = self.bgr.shape[:2]
+            w, h = max(1, int(W * scale)), max(1, int(H * scale))
+            level.reset(cv.resize(self.bgr, (w, h), dst=level.pool.get("bgr", (h, w, 3)),
+                                  interpolation=cv.INTER_AREA))
+        return level
@@ -1,18 +1,147 @@
 # vision/tracker.py
-from vision.colour_tracker import ColourTracker
+import config
+
+# Detector modules are imported inside their branch, so startup only pays
+# for the mode that is actually selected.
 
 def make_tracker(mode: str):
+    return _with_motion_gate(_make_tracker(mode))
+
+
+def _make_tracker(mode: str):
     mode = (mode or "").lower()
+    scale = detect_scale()
 
     if mode == "colour":
-        return ColourTracker()
+        from vision.colour_tracker import ColourTracker
+        return _with_scale(_with_roi(_with_mot(ColourTracker(scale=scale))), scale)
 
     if mode == "person":
-        from vision.person_tracker import PersonTracker
-        return PersonTracker()
+        if _parallel():
+            from vision.parallel import ParallelDetector
+            detector = ParallelDetector("person", scale=scale)
+        else:
+            from vision.person_tracker import PersonTracker
+            detector = PersonTracker()
+        return _with_scale(_with_hybrid(_with_roi(_with_mot(detector)), pipelined=_parallel()), scale)
 
     if mode == "face":
-        from vision.face_tracker import FaceTracker
-        return FaceTracker()
+        if _parallel():
+            from vision.parallel import ParallelDetector
+            detector = ParallelDetector("face", scale=scale)
+        else:
+            from vision.face_tracker import FaceTracker
+            detector = FaceTracker(scale=scale)
+        return _with_scale(_with_hybrid(_with_roi(_with_mot(detector)), pipelined=_parallel()), scale)
+
+    if mode == "dnn":
+        # The network resizes to DNN_INPUT_SIZE itself, so no ScaledTracker
+        from vision.dnn_tracker import DnnTracker
+        return _with_hybrid(_with_roi(_with_mot(DnnTracker())))
+
+    if mode == "fused":
+        # Several detectors over one shared frame pipeline (FUSED_CHAIN)
+        from vision.fused_tracker import FusedTracker
+        return _with_scale(_with_hybrid(_with_roi(_with_mot(FusedTracker(scale=scale)))), scale)
 
     raise ValueError(f"Unknown TRACK_MODE: {mode}")
+
+
+def detect_scale():
+    # The lores stream fixes the detection scale; otherwise use DETECT_SCALE
+    lores = getattr(config, "CAMERA_LORES_SIZE", None)
+    if lores:
+        return lores[0] / config.PREVIEW_SIZE[0]
+    return float(getattr(config, "DETECT_SCALE", 1.0))
+
+
+def close_tracker(tracker):
+    # Release resources (worker processes, shared memory) anywhere in the chain
+    while tracker is not None:
+        close = getattr(tracker, "close", None)
+        if close is not None:
+            close()
+        tracker = getattr(tracker, "tracker", None)
+
+
+def reconfigure_tracker(tracker, changed=None):
+    # Live config change: every layer and fused detector that can take one
+    if changed is None or "DEADBAND_PX" in changed:
+        _set_deadband(tracker, config.DEADBAND_PX)
+    while tracker is not None:
+        reconfigure = getattr(tracker, "reconfigure", None)
+        if reconfigure is not None:
+            reconfigure(changed)
+        for det in getattr(tracker, "detectors", ()):
+            reconfigure_tracker(det, changed)
+        tracker = getattr(tracker, "tracker", None)
+
+
+def _set_deadband(tracker, deadband_px):
+    # Each layer keeps its own copy; under a ScaledTracker it stays 0, the
+    # deadband is applied once there, in display pixels
+    from vision.scaled import ScaledTracker
+    while tracker is not None:
+        if hasattr(tracker, "deadband_px"):
+            tracker.deadband_px = deadband_px
+        for det in getattr(tracker, "detectors", ()):
+            _set_deadband(det, deadband_px)
+        if isinstance(tracker, ScaledTracker):
+            deadband_px = 0
+        tracker = getattr(tracker, "tracker", None)
+
+
+def unwrap(tracker):
+    # Follow wrapper chain (.tracker) down to the base detector
+    while hasattr(tracker, "tracker"):
+        tracker = tracker.tracker
+    return tracker
+
+
+def _with_scale(tracker, scale):
+    # Detect on a downscaled frame, report in display coordinates
+    if scale >= 1.0:
+        return tracker
+    from vision.scaled import ScaledTracker
+    return ScaledTracker(tracker, scale)
+
+
+def _with_motion_gate(tracker):
+    # Skip detection on frames where nothing moved
+    if not getattr(config, "MOTION_GATE", False):
+        return tracker
+    from vision.motion_gate import MotionGatedTracker
+    return MotionGatedTracker(tracker)
+
+
+def _parallel():
+    return bool(getattr(config, "PARALLEL_WORKERS", 0))
+
+
+def _with_mot(tracker):
+    # Persistent target IDs instead of "largest detection wins"
+    if not getattr(config, "MULTI_TARGET", False):
+        return tracker
+    from vision.multi_target import MultiTargetTracker
+    return MultiTargetTracker(tracker)
+
+
+def _with_roi(tracker):
+    # Search around the last known target instead of the full frame
+    if not getattr(config, "ROI_SEARCH", False):
+        return tracker
+    from vision.roi import RoiTracker
+    # Target tracks inside: a full-frame search now and then shows them
+    # every candidate, so the policy can switch to one outside the window
+    full_every = getattr(config, "ROI_FULL_EVERY", 10) if getattr(config, "MULTI_TARGET", False) else 0
+    return RoiTracker(tracker, full_every=full_every)
+
+
+def _with_hybrid(detector, pipelined=False):
+    # Detect every N frames, follow with a cheap tracker in between.
+    # Not over ParallelDetector: its boxes belong to a frame one or more
+    # frames older, and the follower would start on the wrong pixels.
+    if not getattr(config, "HYBRID_TRACKING", False) or pipelined:
+        return detector
+    from vision.hybrid_tracker import DetectTrackTracker
+    return DetectTrackTracker(detector)
@@ -0,0 +1,36 @@
+# vision/warmup.py
+"""
+Detector warm-up, so a fresh boot gets to tracking sooner.
+
+warm_up() pushes one blank frame through a stateless base detector, so
+OpenCV's lazy first-call setup (cascade feature tables, DNN layer
+allocation) happens during bring-up instead of on the first camera frame.
+Loading the models themselves is not cached: the HOG SVM is built in
+(microseconds), and the Haar XML / DNN files have no faster form; their
+load overlaps with the camera start in main.bring_up() instead.
+"""
+
+import numpy as np
+import config
+from vision.scaled import ScaledTracker
+
+
+def warm_up(tracker):
+    """
+    Runs one blank frame through the base detector of a tracker chain, at the
+    size it will see (after any ScaledTracker). Only detectors that keep no
+    per-frame state (STATELESS = True) are warmed. Returns True if it ran.
+    """
+    scale = 1.0
+    detector = tracker
+    while hasattr(detector, "tracker"):
+        if isinstance(detector, ScaledTracker):
+            scale = detector.scale
+        detector = detector.tracker
+    if not getattr(detector, "STATELESS", False):
+        return False
+
+    W, H = config.PREVIEW_SIZE
+    blank = np.zeros((max(1, int(H * scale)), max(1, int(W * scale)), 3), dtype=np.uint8)
+    detector.process(blank)
+    return True